@@ -17,6 +17,7 @@ from app.modules.chatbot.models import *
 from app.modules.orders.models.shopping_cart import *
 from app.modules.products.models.brand import *
 from app.modules.promotions.models.promotion import *
+from app.models.embedding_cache import *
 
 
 # this is the Alembic Config object, which provides
@@ -0,0 +1,84 @@
+"""query indexes
+
+Foreign-key and filter indexes for the hot list/lookup queries, plus a
+case-insensitive unique index on users.email.
+
+The tables themselves are created by init_db (Base.metadata.create_all), so
+this is the first revision. Indexes are built CONCURRENTLY outside the
+migration transaction so they can be applied to a live database without
+locking writes; IF NOT EXISTS keeps it safe on databases where create_all
+already built them from the model definitions.
+
+ux_users_email_lower will fail if two accounts differ only by email case.
+Find them first with:
+
+    SELECT lower(email), count(*) FROM users GROUP BY 1 HAVING count(*) > 1;
+
+Before/after numbers: python -m benchmarks.index_migration
+
+Revision ID: 0001_query_indexes
+Revises:
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001_query_indexes"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE = sa.text("active")
+
+# (name, table, columns, extra create_index kwargs)
+INDEXES = [
+    ("ix_orders_user_id_id_active", "orders", ["user_id", "id"], {"postgresql_where": ACTIVE}),
+    ("ix_orders_status_id_active", "orders", ["status", "id"], {"postgresql_where": ACTIVE}),
+    ("ix_order_items_order_id_id", "order_items", ["order_id", "id"], {}),
+    ("ix_payments_order_id", "payments", ["order_id"], {}),
+    ("ix_deliveries_order_id", "deliveries", ["order_id"], {}),
+    ("ix_feedback_order_id_user_id", "feedback", ["order_id", "user_id"], {}),
+    ("ix_feedback_user_id_id", "feedback", ["user_id", "id"], {}),
+    ("ix_shopping_carts_user_id_active", "shopping_carts", ["user_id"], {"postgresql_where": ACTIVE}),
+    ("ix_cart_items_cart_id_product_id", "cart_items", ["cart_id", "product_id"], {}),
+    ("ix_chatbot_sessions_user_id_id_active", "chatbot_sessions", ["user_id", "id"], {"postgresql_where": ACTIVE}),
+    ("ix_chatbot_messages_session_id_id", "chatbot_messages", ["session_id", "id"], {}),
+    ("ix_products_brand_id_id_active", "products", ["brand_id", "id"], {"postgresql_where": ACTIVE}),
+    ("ix_products_category_id_id_active", "products", ["category_id", "id"], {"postgresql_where": ACTIVE}),
+    ("ix_inventory_product_id", "inventory", ["product_id"], {}),
+    ("ix_promotions_start_date_end_date_active", "promotions", ["start_date", "end_date"], {"postgresql_where": ACTIVE}),
+    ("ix_promotion_products_promotion_id_product_id", "promotion_products", ["promotion_id", "product_id"], {}),
+    ("ix_promotion_products_product_id_promotion_id", "promotion_products", ["product_id", "promotion_id"], {}),
+    ("ux_users_email_lower", "users", [sa.text("lower(email)")], {"unique": True}),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns, kwargs in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+                **kwargs,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,55 @@
+"""sort key indexes
+
+Indexes behind the non-id sort keys registered for keyset pagination
+(products by name, promotions by start_date). Built CONCURRENTLY like
+0001_query_indexes.
+
+Revision ID: 0002_sort_key_indexes
+Revises: 0001_query_indexes
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002_sort_key_indexes"
+down_revision: Union[str, None] = "0001_query_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE = sa.text("active")
+
+INDEXES = [
+    ("ix_products_name_id_active", "products", ["name", "id"], {"postgresql_where": ACTIVE}),
+    ("ix_promotions_start_date_id_active", "promotions", ["start_date", "id"], {"postgresql_where": ACTIVE}),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns, kwargs in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+                **kwargs,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
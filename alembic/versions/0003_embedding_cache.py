@@ -0,0 +1,42 @@
+"""embedding cache
+
+Persistent tier of the embedding cache: one row per (model, sha256 of the
+normalised text). Embeddings are stored as real[], about 6 KB per
+1536-dimension vector. Rows are never updated; delete old ones by created_at
+if the table needs trimming.
+
+Revision ID: 0003_embedding_cache
+Revises: 0002_sort_key_indexes
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003_embedding_cache"
+down_revision: Union[str, None] = "0002_sort_key_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "embedding_cache",
+        sa.Column("model", sa.String(length=100), nullable=False),
+        sa.Column("content_hash", sa.String(length=64), nullable=False),
+        sa.Column("embedding", postgresql.ARRAY(postgresql.REAL()), nullable=False),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint("model", "content_hash"),
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("embedding_cache", if_exists=True)
@@ -0,0 +1,55 @@
+"""chatbot session summary
+
+Rolling summary of a chatbot session's older messages. summary covers every
+message up to and including summary_message_id; replies send it in place of
+those messages. Both stay NULL until a session first grows past the
+summarisation threshold. Deleting the message summary_message_id points at
+sets it back to NULL; a summary without it is ignored, and the next
+compaction replaces it with one built from the remaining history.
+
+Written with IF NOT EXISTS / IF EXISTS so it also applies to databases where
+the columns were added by hand or by create_all.
+
+Revision ID: 0004_chatbot_session_summary
+Revises: 0003_embedding_cache
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004_chatbot_session_summary"
+down_revision: Union[str, None] = "0003_embedding_cache"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("ALTER TABLE chatbot_sessions ADD COLUMN IF NOT EXISTS summary TEXT")
+    op.execute("ALTER TABLE chatbot_sessions ADD COLUMN IF NOT EXISTS summary_message_id INTEGER")
+    # Postgres has no ADD CONSTRAINT IF NOT EXISTS.
+    op.execute(
+        """
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1 FROM pg_constraint WHERE conname = 'fk_chatbot_sessions_summary_message_id'
+            ) THEN
+                ALTER TABLE chatbot_sessions
+                    ADD CONSTRAINT fk_chatbot_sessions_summary_message_id
+                    FOREIGN KEY (summary_message_id) REFERENCES chatbot_messages (id) ON DELETE SET NULL;
+            END IF;
+        END $$
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE chatbot_sessions DROP CONSTRAINT IF EXISTS fk_chatbot_sessions_summary_message_id")
+    op.execute("ALTER TABLE chatbot_sessions DROP COLUMN IF EXISTS summary_message_id")
+    op.execute("ALTER TABLE chatbot_sessions DROP COLUMN IF EXISTS summary")
@@ -0,0 +1,278 @@
+import asyncio
+import ipaddress
+import json
+import re
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
+from app.core.config import settings
+from app.core.pool_metrics import LatencyHistogram
+from app.modules.authentication.security import verify_token
+
+# Routes that call OpenAI or Pinecone, or stream whole tables, each get their
+# own concurrency budget so they cannot take every worker thread and database
+# connection away from cheap catalogue reads. Anything unmatched falls into
+# "default". Patterns match the raw path, methods the HTTP verb.
+ROUTE_GROUPS = {
+    "ml": (
+        ("GET", r"^/products/recommendations/\d+$"),
+        ("POST", r"^/products/recommendations/search$"),
+        ("POST", r"^/products/?$"),
+        ("POST", r"^/products/products/bulk-form$"),
+        ("PATCH", r"^/products/\d+$"),
+    ),
+    # Streamed replies hold their slot until the last token is sent, so they
+    # get a budget of their own instead of starving the short ML calls.
+    "chat": (
+        ("POST", r"^/chatbot/sessions/\d+/reply$"),
+    ),
+    "export": (
+        ("GET", r"^/(orders|orders/payments|products|products/inventory)/export$"),
+    ),
+}
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, detail: str):
+        self.status_code = status_code
+        self.detail = detail
+
+class AdmissionLimiter:
+    """
+    At most `concurrency` requests of a group run at once and at most
+    `queue_size` wait for a slot, for up to ADMISSION_QUEUE_TIMEOUT_SECONDS.
+    Waiting requests are queued per client and served round-robin across
+    clients, and no client may hold more than `per_client` running or queued
+    requests, so one busy client cannot starve the others. Limits are per
+    worker process. Only touched from the event loop, so no locking.
+    """
+
+    def __init__(self, name: str, concurrency: int, queue_size: int, per_client: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.per_client = per_client
+        self.active = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected_overloaded = 0
+        self.rejected_client_limit = 0
+        self.timed_out = 0
+        self.queue_wait = LatencyHistogram()
+        self._waiters: "OrderedDict[str, deque]" = OrderedDict()
+        self._per_client: Dict[str, int] = {}
+
+    def _hold(self, client: str) -> None:
+        self._per_client[client] = self._per_client.get(client, 0) + 1
+
+    def _drop(self, client: str) -> None:
+        remaining = self._per_client.get(client, 0) - 1
+        if remaining > 0:
+            self._per_client[client] = remaining
+        else:
+            self._per_client.pop(client, None)
+
+    def _remove_waiter(self, client: str, waiter: asyncio.Future) -> None:
+        waiters = self._waiters.get(client)
+        if waiters is not None and waiter in waiters:
+            waiters.remove(waiter)
+            self.queued -= 1
+            if not waiters:
+                del self._waiters[client]
+
+    async def acquire(self, client: str) -> None:
+        if self.per_client > 0 and self._per_client.get(client, 0) >= self.per_client:
+            self.rejected_client_limit += 1
+            raise AdmissionRejected(429, "Too many concurrent requests from this client")
+
+        if self.active < self.concurrency and not self.queued:
+            self.active += 1
+            self.admitted += 1
+            self._hold(client)
+            self.queue_wait.observe(0)
+            return
+
+        if self.queued >= self.queue_size:
+            self.rejected_overloaded += 1
+            raise AdmissionRejected(503, "Server is busy, try again shortly")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(client, deque()).append(waiter)
+        self.queued += 1
+        self._hold(client)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, settings.ADMISSION_QUEUE_TIMEOUT_SECONDS)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up; pass it on.
+                self.release(client)
+            else:
+                self._remove_waiter(client, waiter)
+                self._drop(client)
+            if isinstance(e, asyncio.TimeoutError):
+                self.timed_out += 1
+                raise AdmissionRejected(503, "Server is busy, try again shortly")
+            raise
+        finally:
+            self.queue_wait.observe((time.perf_counter() - started) * 1000)
+        self.admitted += 1
+
+    def release(self, client: str) -> None:
+        self._drop(client)
+        while self._waiters:
+            next_client, waiters = next(iter(self._waiters.items()))
+            waiter = waiters.popleft()
+            self.queued -= 1
+            if waiters:
+                self._waiters.move_to_end(next_client)
+            else:
+                del self._waiters[next_client]
+            if not waiter.done():
+                # Hand the slot straight to the waiter; active stays the same.
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> dict:
+        return {
+            "group": self.name,
+            "concurrency": self.concurrency,
+            "queue_size": self.queue_size,
+            "per_client": self.per_client,
+            "active": self.active,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected_overloaded": self.rejected_overloaded,
+            "rejected_client_limit": self.rejected_client_limit,
+            "timed_out": self.timed_out,
+            "queue_wait": self.queue_wait.snapshot(),
+        }
+
+def _limiters() -> Dict[str, AdmissionLimiter]:
+    limits = {
+        "ml": (settings.ADMISSION_ML_CONCURRENCY, settings.ADMISSION_ML_QUEUE_SIZE, settings.ADMISSION_ML_PER_CLIENT),
+        "chat": (settings.ADMISSION_CHAT_CONCURRENCY, settings.ADMISSION_CHAT_QUEUE_SIZE, settings.ADMISSION_CHAT_PER_CLIENT),
+        "export": (settings.ADMISSION_EXPORT_CONCURRENCY, settings.ADMISSION_EXPORT_QUEUE_SIZE, settings.ADMISSION_EXPORT_PER_CLIENT),
+        "default": (settings.ADMISSION_DEFAULT_CONCURRENCY, settings.ADMISSION_DEFAULT_QUEUE_SIZE, settings.ADMISSION_DEFAULT_PER_CLIENT),
+    }
+    # A group with no concurrency limit is not admission controlled at all.
+    return {name: AdmissionLimiter(name, *limit) for name, limit in limits.items() if limit[0] > 0}
+
+limiters = _limiters()
+
+_routes = [
+    (group, method, re.compile(pattern))
+    for group, routes in ROUTE_GROUPS.items()
+    for method, pattern in routes
+]
+
+def route_group(method: str, path: str) -> str:
+    for group, route_method, pattern in _routes:
+        if method == route_method and pattern.match(path):
+            return group
+    return "default"
+
+def get_admission_stats() -> List[dict]:
+    return [limiter.stats() for limiter in limiters.values()]
+
+def _trusted_networks():
+    entries = [entry.strip() for entry in settings.ADMISSION_TRUSTED_PROXIES.split(",") if entry.strip()]
+    if "*" in entries:
+        return None
+    return [ipaddress.ip_network(entry, strict=False) for entry in entries]
+
+_trusted_proxies = _trusted_networks()
+
+def _is_trusted_proxy(address: str) -> bool:
+    if not settings.ADMISSION_TRUSTED_PROXIES.strip():
+        return False
+    if _trusted_proxies is None:
+        return True
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in _trusted_proxies)
+
+def _client_address(scope) -> str:
+    """
+    The peer address, or behind a trusted proxy the nearest X-Forwarded-For
+    hop that is not itself a trusted proxy. Without this every anonymous
+    client behind the load balancer would share one per-client quota.
+    Running uvicorn with --proxy-headers and --forwarded-allow-ips fixes
+    scope["client"] instead and works just as well.
+    """
+    client = scope.get("client")
+    address = client[0] if client else "unknown"
+    if not _is_trusted_proxy(address):
+        return address
+    forwarded = [
+        hop.strip()
+        for name, value in scope.get("headers", []) if name == b"x-forwarded-for"
+        for hop in value.decode("latin-1").split(",") if hop.strip()
+    ]
+    for hop in reversed(forwarded):
+        if not _is_trusted_proxy(hop):
+            return hop
+    return forwarded[0] if forwarded else address
+
+def _client_key(scope) -> str:
+    """
+    The user id of a valid bearer token, else the client address. Only a
+    verified token counts: keying on the raw header would hand a new quota
+    to every made-up token.
+    """
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer":
+                token_data = verify_token(token.strip())
+                if token_data is not None:
+                    return f"user:{token_data.user_id}"
+            break
+    return _client_address(scope)
+
+class AdmissionControlMiddleware:
+    """
+    Sheds load per route group before any work is done: requests over a
+    client's share get a 429, requests that find the group's queue full or
+    wait too long get a 503, both with Retry-After.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limiter = limiters.get(route_group(scope["method"], scope["path"]))
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        client = _client_key(scope)
+        try:
+            await limiter.acquire(client)
+        except AdmissionRejected as e:
+            await _reject(send, e)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(client)
+
+async def _reject(send, rejection: AdmissionRejected) -> None:
+    body = json.dumps({"detail": rejection.detail}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": rejection.status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+            (b"retry-after", str(settings.ADMISSION_RETRY_AFTER_SECONDS).encode("latin-1")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -1,7 +1,79 @@
 from pydantic_settings  import BaseSettings
+from typing import Optional
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    ASYNC_DATABASE_URL: Optional[str] = None
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: str = "idle"  # "always", "idle" or "never"
+    DB_POOL_PRE_PING_IDLE_SECONDS: int = 30
+    DB_PGBOUNCER_MODE: bool = False
+    DATABASE_REPLICA_URLS: str = ""  # comma separated
+    DB_READ_YOUR_WRITES_SECONDS: float = 5
+    DEBUG: bool = False
+    AUTH_USER_CACHE_SIZE: int = 10000
+    AUTH_USER_CACHE_SECONDS: float = 60  # 0 disables the user cache
+    AUTH_USER_CACHE_INVALIDATION: str = "local"  # "local" or "postgres" (LISTEN/NOTIFY across workers); claims-only auth needs "postgres"
+    AUTH_TOKEN_CACHE_SIZE: int = 10000  # 0 disables the verified token cache
+    AUTH_TOKEN_DENY_SECONDS: float = 7 * 24 * 3600  # longest access token lifetime (login issues 7 day tokens)
+    PASSWORD_HASH_ROUNDS: int = 12  # bcrypt work factor; hashes with another cost are upgraded at login
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_QUEUE_SIZE: int = 64  # operations waiting beyond this get a 503
+    PASSWORD_HASH_RETRY_AFTER_SECONDS: int = 1
+    ADMISSION_CONTROL: bool = True
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 10
+    ADMISSION_RETRY_AFTER_SECONDS: int = 2
+    ADMISSION_ML_CONCURRENCY: int = 8  # per worker; 0 disables limiting for the group
+    ADMISSION_ML_QUEUE_SIZE: int = 16
+    ADMISSION_ML_PER_CLIENT: int = 2  # running + queued per client; 0 for no per-client cap
+    ADMISSION_CHAT_CONCURRENCY: int = 16  # streamed chatbot replies, held for the whole stream
+    ADMISSION_CHAT_QUEUE_SIZE: int = 16
+    ADMISSION_CHAT_PER_CLIENT: int = 1
+    ADMISSION_EXPORT_CONCURRENCY: int = 2
+    ADMISSION_EXPORT_QUEUE_SIZE: int = 4
+    ADMISSION_EXPORT_PER_CLIENT: int = 1
+    ADMISSION_DEFAULT_CONCURRENCY: int = 200
+    ADMISSION_DEFAULT_QUEUE_SIZE: int = 400
+    ADMISSION_DEFAULT_PER_CLIENT: int = 50
+    ADMISSION_TRUSTED_PROXIES: str = ""  # comma separated IPs/CIDRs whose X-Forwarded-For is believed, or "*"
+    EMBEDDING_CACHE_SIZE: int = 2048  # in-process entries; 0 disables the memory tier
+    EMBEDDING_CACHE_PERSISTENT: bool = True  # embedding_cache table shared by all workers
+    OPENAI_EMBEDDING_BATCH_SIZE: int = 256  # inputs per embeddings request (Azure allows up to 2048)
+    OPENAI_EMBEDDING_BATCH_TOKENS: int = 100000  # tokens per embeddings request
+    EXTERNAL_RETRY_ATTEMPTS: int = 3  # OpenAI, Pinecone and S3 calls, first attempt included
+    EXTERNAL_RETRY_BASE_DELAY: float = 0.5
+    EXTERNAL_RETRY_MAX_DELAY: float = 10  # also the longest Retry-After honoured
+    BREAKER_FAILURE_THRESHOLD: int = 5  # consecutive transient failures before failing fast
+    BREAKER_RESET_SECONDS: float = 30
+    ML_CLIENT_WARMUP: bool = True  # open OpenAI and Pinecone connections at startup
+    OPENAI_MAX_CONNECTIONS: int = 50  # per worker
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    OPENAI_KEEPALIVE_SECONDS: float = 60
+    OPENAI_TIMEOUT_SECONDS: float = 60
+    OPENAI_CONNECT_TIMEOUT_SECONDS: float = 5
+    PINECONE_POOL_SIZE: int = 20  # connections per worker
+    CHATBOT_HISTORY_MESSAGES: int = 20  # most recent messages considered for each reply prompt
+    CHATBOT_PROMPT_TOKENS: int = 3000  # whole prompt: instructions, products, history and question
+    CHATBOT_HISTORY_TOKENS: int = 1200  # share of the prompt history may take before products
+    CHATBOT_RETRIEVAL_TOP_K: int = 8
+    CHATBOT_PRODUCT_TOKENS: int = 200  # longest single product entry
+    CHATBOT_SUMMARY_THRESHOLD_TOKENS: int = 1500  # unsummarised history that triggers compaction; 0 disables
+    CHATBOT_SUMMARY_KEEP_TOKENS: int = 600  # newest history left verbatim when compacting
+    CHATBOT_SUMMARY_TOKENS: int = 300  # longest stored summary
+    AWS_S3_MAX_POOL_CONNECTIONS: int = 20  # shared by every upload thread of a worker
+    SQL_INSTRUMENTATION: bool = True
+    SQL_N_PLUS_ONE_THRESHOLD: int = 5
+    PAGINATION_COUNT_CACHE_SECONDS: float = 30
+    PAGINATION_COUNT_CACHE_SIZE: int = 1000
+    EXPORT_BATCH_SIZE: int = 1000
+    SLOW_QUERY_MS: float = 500  # 0 disables the slow query log
+    SLOW_QUERY_LOG_SIZE: int = 200
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE: float = 0.1
+    SLOW_QUERY_EXPLAIN_CONCURRENCY: int = 2
+    SLOW_QUERY_EXPLAIN_TIMEOUT_MS: int = 10000
     BACKEND_URL: str
     AUTH_SECRET_KEY: str
 
@@ -12,6 +84,7 @@ class Settings(BaseSettings):
 
     PINECONE_INDEX_NAME: str
     PINECONE_API_KEY: str
+    PINECONE_INDEX_HOST: Optional[str] = None  # skips the describe_index lookup when set
 
     OPENAI_BASE_MODEL: str
     OPENAI_THINKING_MODEL: str
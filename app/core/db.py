@@ -1,15 +1,157 @@
-from sqlalchemy import create_engine
+import itertools
+import time
+from uuid import uuid4
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DisconnectionError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from app.models.base_class import Base
 from app.core.config import settings
+from app.core.db_routing import is_read_request, is_pinned_to_primary
+from app.core.pool_metrics import InstrumentedAsyncQueuePool, InstrumentedQueuePool, register_engine
+from app.core.query_metrics import install_query_instrumentation
+from app.core.slow_query_log import install_slow_query_log
 
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
+def to_async_url(database_url: str) -> str:
+    url = make_url(database_url).set(drivername="postgresql+asyncpg")
+    sslmode = url.query.get("sslmode")
+    if sslmode:
+        # asyncpg does not understand libpq's sslmode, it takes the same values as "ssl"
+        url = url.difference_update_query(["sslmode"]).update_query_dict({"ssl": sslmode})
+    return url.render_as_string(hide_password=False)
+
+def get_async_database_url() -> str:
+    return settings.ASYNC_DATABASE_URL or to_async_url(settings.DATABASE_URL)
+
+def get_replica_database_urls() -> list:
+    return [to_async_url(url.strip()) for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+
+def get_pool_options(name: str) -> dict:
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING == "always",
+        "pool_logging_name": name,
+    }
+
+def get_asyncpg_connect_args() -> dict:
+    if not settings.DB_PGBOUNCER_MODE:
+        return {}
+    # PgBouncer in transaction mode hands each transaction a different server
+    # connection, so named prepared statements must be unique and never cached.
+    return {
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+    }
+
+def install_idle_pre_ping(engine) -> None:
+    """Ping only connections that sat idle in the pool, instead of on every checkout."""
+    idle_seconds = settings.DB_POOL_PRE_PING_IDLE_SECONDS
+
+    @event.listens_for(engine, "checkin")
+    def mark_checkin(dbapi_connection, connection_record):
+        connection_record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def ping_if_idle(dbapi_connection, connection_record, connection_proxy):
+        checked_in_at = connection_record.info.get("checked_in_at")
+        if checked_in_at is None or time.monotonic() - checked_in_at < idle_seconds:
+            return
+        try:
+            engine.dialect.do_ping(dbapi_connection)
+        except Exception as e:
+            raise DisconnectionError(f"Idle connection failed pre-ping: {e}")
+
+# Sync engine: used by Alembic and init_db only.
+engine = create_engine(
+    settings.DATABASE_URL,
+    poolclass=InstrumentedQueuePool,
+    **get_pool_options("sync")
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine: used by every request handler.
+async_engine = create_async_engine(
+    get_async_database_url(),
+    poolclass=InstrumentedAsyncQueuePool,
+    connect_args=get_asyncpg_connect_args(),
+    **get_pool_options("primary")
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+# Read replicas: safe-method requests are spread over these round robin.
+replica_engines = [
+    create_async_engine(
+        url,
+        poolclass=InstrumentedAsyncQueuePool,
+        connect_args=get_asyncpg_connect_args(),
+        **get_pool_options(f"replica-{i}")
+    )
+    for i, url in enumerate(get_replica_database_urls())
+]
+ReplicaSessionLocals = [
+    async_sessionmaker(bind=replica, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+    for replica in replica_engines
+]
+_replica_cycle = itertools.cycle(ReplicaSessionLocals) if ReplicaSessionLocals else None
+
+if settings.DB_POOL_PRE_PING == "idle":
+    install_idle_pre_ping(engine)
+    install_idle_pre_ping(async_engine.sync_engine)
+    for replica in replica_engines:
+        install_idle_pre_ping(replica.sync_engine)
+
+register_engine("primary", async_engine)
+register_engine("sync", engine)
+for i, replica in enumerate(replica_engines):
+    register_engine(f"replica-{i}", replica)
+
+if settings.SQL_INSTRUMENTATION or settings.SLOW_QUERY_MS > 0:
+    install_query_instrumentation(async_engine.sync_engine)
+    for replica in replica_engines:
+        install_query_instrumentation(replica.sync_engine)
+
+if settings.SLOW_QUERY_MS > 0:
+    install_slow_query_log(async_engine)
+    for replica in replica_engines:
+        install_slow_query_log(replica)
+
+def get_session_factory(request: Request) -> async_sessionmaker:
+    """
+    Picks the engine for a request: reads go to a replica, writes and clients
+    inside their read-your-writes window go to the primary.
+    """
+    if _replica_cycle is None or not is_read_request(request) or is_pinned_to_primary(request):
+        return AsyncSessionLocal
+    return next(_replica_cycle)
+
 def init_db():
     from app.modules.authentication.models.user import User
     from app.modules.products.models import Brand, Product, Inventory, Warranty, ProductCategory
     from app.modules.orders.models import Order, OrderItem, Feedback, Payment, ShoppingCart, CartItem
     from app.modules.chatbot.models import ChatbotMessage, ChatbotSession
     from app.modules.promotions.models import Promotion, PromotionProduct
+    from app.models.embedding_cache import EmbeddingCacheEntry
     Base.metadata.create_all(bind=engine)
+
+async def get_db(request: Request):
+    """
+    The one request-scoped session. FastAPI caches dependencies per request,
+    so the auth dependencies, access checks and the handler all share this
+    session, its pooled connection and its identity map.
+    """
+    db = get_session_factory(request)()
+    try:
+        yield db
+    finally:
+        await db.close()
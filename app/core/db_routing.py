@@ -0,0 +1,81 @@
+import hashlib
+import time
+from typing import Dict, Optional
+from fastapi import Request
+from app.core.config import settings
+
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+PRIMARY_PIN_COOKIE = "db_primary_until"
+MAX_TRACKED_CLIENTS = 10000
+
+# Clients that wrote recently, keyed by a fingerprint of their bearer token.
+# The cookie covers browsers across workers, this covers API clients that
+# come back to the same worker without a cookie jar.
+_pinned_until: Dict[str, float] = {}
+
+def is_read_request(request: Request) -> bool:
+    return request.method in READ_METHODS
+
+def _client_key(authorization: Optional[str]) -> Optional[str]:
+    if not authorization:
+        return None
+    return hashlib.sha1(authorization.encode("utf-8")).hexdigest()
+
+def is_pinned_to_primary(request: Request) -> bool:
+    now = time.time()
+
+    cookie = request.cookies.get(PRIMARY_PIN_COOKIE)
+    if cookie:
+        try:
+            if float(cookie) > now:
+                return True
+        except ValueError:
+            pass
+
+    key = _client_key(request.headers.get("authorization"))
+    return key is not None and _pinned_until.get(key, 0) > now
+
+def pin_to_primary(authorization: Optional[str]) -> float:
+    until = time.time() + settings.DB_READ_YOUR_WRITES_SECONDS
+    key = _client_key(authorization)
+    if key is not None:
+        if len(_pinned_until) >= MAX_TRACKED_CLIENTS:
+            now = time.time()
+            for stale in [k for k, v in _pinned_until.items() if v <= now]:
+                del _pinned_until[stale]
+            if len(_pinned_until) >= MAX_TRACKED_CLIENTS:
+                _pinned_until.clear()
+        _pinned_until[key] = until
+    return until
+
+class ReadYourWritesMiddleware:
+    """
+    Pins a client to the primary for DB_READ_YOUR_WRITES_SECONDS after any
+    successful write so its next reads do not hit a lagging replica.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in READ_METHODS or settings.DB_READ_YOUR_WRITES_SECONDS <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                authorization = None
+                for name, value in scope.get("headers", []):
+                    if name == b"authorization":
+                        authorization = value.decode("latin-1")
+                        break
+                until = pin_to_primary(authorization)
+                cookie = (
+                    f"{PRIMARY_PIN_COOKIE}={until:.3f}; "
+                    f"Max-Age={int(settings.DB_READ_YOUR_WRITES_SECONDS) + 1}; Path=/; HttpOnly; SameSite=Lax"
+                )
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"set-cookie", cookie.encode("latin-1"))]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,59 @@
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from fastapi import HTTPException, Response, status
+from pydantic import ConfigDict, create_model
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only, raiseload
+from app.core.pagination import PagedResponse
+from app.core.serialization import json_response
+
+def parse_fields(fields: Optional[str], schema: Any) -> Optional[Tuple[str, ...]]:
+    """Validates a fields= value against the response schema. id is always included."""
+    if not fields:
+        return None
+    requested = ["id"] + [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in schema.model_fields]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}"
+        )
+    return tuple(dict.fromkeys(requested))
+
+def sparse_load_options(
+    entity: Any,
+    fields: Iterable[str],
+    relationship_options: Dict[str, tuple],
+    extra_columns: Iterable[str] = ()
+) -> List[Any]:
+    """
+    Loader options that fetch only the requested columns and relationships.
+    Foreign keys behind a requested relationship are loaded with it; every
+    other relationship is set to raise, so nothing is loaded by accident.
+    """
+    mapper = inspect(entity)
+    columns = set(extra_columns)
+    options = []
+    for name in fields:
+        if name in mapper.relationships:
+            columns.update(column.key for column in mapper.relationships[name].local_columns)
+            options.extend(relationship_options[name])
+        elif name in mapper.column_attrs:
+            columns.add(name)
+    return [load_only(*[getattr(entity, column) for column in sorted(columns)]), *options, raiseload("*")]
+
+@lru_cache(maxsize=256)
+def sparse_model(schema: Any, fields: Tuple[str, ...]) -> Any:
+    """The response schema cut down to `fields`, so validation only touches loaded attributes."""
+    definitions = {name: (schema.model_fields[name].annotation, schema.model_fields[name]) for name in fields}
+    return create_model(
+        f"{schema.__name__}Fields",
+        __config__=ConfigDict(from_attributes=True),
+        **definitions
+    )
+
+def sparse_response(obj: Any, schema: Any, fields: Tuple[str, ...]) -> Response:
+    return json_response(obj, sparse_model(schema, fields))
+
+def sparse_page_response(page: Any, schema: Any, fields: Tuple[str, ...]) -> Response:
+    return json_response(dict(page), PagedResponse[sparse_model(schema, fields)])
@@ -2,6 +2,7 @@ from fastapi import UploadFile, HTTPException, status
 from app.core.storage import PublicMediaStorage
 from typing import Optional, List, BinaryIO
 from io import BytesIO
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
@@ -62,8 +63,10 @@ async def upload_product_file(file: UploadFile, product_id: int, file_type: str)
         
         storage = PublicMediaStorage(custom_path=custom_path)
         
-        url = storage.save(
-            file_obj, 
+        # boto3 and the retry backoff both block; keep them off the event loop.
+        url = await asyncio.to_thread(
+            storage.save,
+            file_obj,
             name=file.filename, 
             content_type=file.content_type,
             allowed_extensions=allowed_extensions,
@@ -71,6 +74,8 @@ async def upload_product_file(file: UploadFile, product_id: int, file_type: str)
         )
         
         return url
+    except HTTPException:
+        raise
     except ValueError as e:
         logger.error(f"Validation error when uploading file: {str(e)}")
         raise HTTPException(
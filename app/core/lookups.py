@@ -0,0 +1,44 @@
+from typing import Optional
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.modules.authentication.models.user import User
+from app.modules.chatbot.models import ChatbotSession
+from app.modules.orders.models import Order
+from app.modules.products.models import Product
+from app.modules.products.loaders import product_detail_options
+
+# Hot-path lookups are built once at import time with bind parameters. Reusing
+# the same statement object skips building the select and lets SQLAlchemy
+# reuse its memoized cache key, so each call only binds parameters before
+# hitting the compiled cache. See benchmarks/lookup_statements.py.
+
+_ACTIVE_USER_BY_ID = select(User).where(User.id == bindparam("user_id"), User.active == True)
+_ACTIVE_USER_BY_EMAIL = select(User).where(func.lower(User.email) == func.lower(bindparam("email")), User.active == True)
+_ACTIVE_PRODUCT_BY_ID = select(Product).where(Product.id == bindparam("product_id"), Product.active == True)
+_ACTIVE_PRODUCT_FOR_RESPONSE_BY_ID = (
+    select(Product)
+    .options(*product_detail_options())
+    .where(Product.id == bindparam("product_id"), Product.active == True)
+)
+_ACTIVE_ORDER_BY_ID = select(Order).where(Order.id == bindparam("order_id"), Order.active == True)
+_ACTIVE_CHATBOT_SESSION_BY_ID = select(ChatbotSession).where(
+    ChatbotSession.id == bindparam("session_id"), ChatbotSession.active == True
+)
+
+async def get_active_user(db: AsyncSession, user_id: int) -> Optional[User]:
+    return await db.scalar(_ACTIVE_USER_BY_ID, {"user_id": user_id})
+
+async def get_active_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
+    return await db.scalar(_ACTIVE_USER_BY_EMAIL, {"email": email})
+
+async def get_active_product(db: AsyncSession, product_id: int) -> Optional[Product]:
+    return await db.scalar(_ACTIVE_PRODUCT_BY_ID, {"product_id": product_id})
+
+async def get_active_product_for_response(db: AsyncSession, product_id: int) -> Optional[Product]:
+    return await db.scalar(_ACTIVE_PRODUCT_FOR_RESPONSE_BY_ID, {"product_id": product_id})
+
+async def get_active_order(db: AsyncSession, order_id: int) -> Optional[Order]:
+    return await db.scalar(_ACTIVE_ORDER_BY_ID, {"order_id": order_id})
+
+async def get_active_chatbot_session(db: AsyncSession, session_id: int) -> Optional[ChatbotSession]:
+    return await db.scalar(_ACTIVE_CHATBOT_SESSION_BY_ID, {"session_id": session_id})
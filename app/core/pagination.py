@@ -1,57 +1,267 @@
-from fastapi import Query
+import base64
+import hashlib
+import json
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from fastapi import HTTPException, Query, status
 from typing import Generic, TypeVar, Optional, List, Dict, Any
 from pydantic import BaseModel
-from sqlalchemy.orm import Query as SQLAlchemyQuery
+from sqlalchemy import Select, func, inspect, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.serialization import json_response
 
 T = TypeVar('T')
 
+COUNT_EXACT = "exact"        # separate SELECT count(*) over the filtered query
+COUNT_WINDOW = "window"      # count(*) OVER () folded into the page query
+COUNT_ESTIMATE = "estimate"  # planner row estimate, no scan
+COUNT_CACHED = "cached"      # exact count cached for PAGINATION_COUNT_CACHE_SECONDS
+COUNT_NONE = "none"          # no total, has_next only
+COUNT_STRATEGIES = (COUNT_EXACT, COUNT_WINDOW, COUNT_ESTIMATE, COUNT_CACHED, COUNT_NONE)
+
 class PaginationParams:
     def __init__(
-        self, 
+        self,
         page: int = Query(1, ge=1, description="Page number"),
         page_size: int = Query(20, ge=1, le=100, description="Items per page"),
         sort_by: Optional[str] = Query(None, description="Field to sort by"),
-        sort_order: str = Query("asc", description="Sort order (asc or desc)")
+        sort_order: str = Query("asc", description="Sort order (asc or desc)"),
+        cursor: Optional[str] = Query(None, description="next_cursor from the previous page; switches to keyset pagination"),
+        include_total: bool = Query(True, description="Set to false to skip counting; only has_next is returned"),
+        count_strategy: Optional[str] = Query(None, description="exact, window, estimate, cached or none")
     ):
         self.page = page
         self.page_size = page_size
         self.sort_by = sort_by
         self.sort_order = sort_order.lower()
+        self.cursor = cursor
+        self.include_total = include_total
+        self.count_strategy = count_strategy
         self.offset = (page - 1) * page_size
 
 class PagedResponse(BaseModel, Generic[T]):
     items: List[T]
-    total: int
+    total: Optional[int]
     page: int
     page_size: int
-    pages: int
+    pages: Optional[int]
     has_next: bool
     has_prev: bool
-    
+    next_cursor: Optional[str] = None
+    count_strategy: str = COUNT_EXACT  # estimate totals are approximate, none leaves total/pages empty
+
     class Config:
         from_attributes = True
 
-def paginate(query: SQLAlchemyQuery, params: PaginationParams, schema: Any) -> PagedResponse:
-    total = query.count()
-    
-    if params.sort_by:
-        sort_field = getattr(query.column_descriptions[0]['entity'], params.sort_by, None)
-        if sort_field:
-            if params.sort_order == "desc":
-                query = query.order_by(sort_field.desc())
-            else:
-                query = query.order_by(sort_field.asc())
-    
-    items = query.offset(params.offset).limit(params.page_size).all()
-    
-    pages = (total + params.page_size - 1) // params.page_size
-    
-    return PagedResponse(
+def sort_keys(*columns) -> Dict[str, Any]:
+    """
+    Registry of the columns an endpoint may sort on, keyed by attribute name.
+    Only register NOT NULL columns with an index whose leading columns match
+    the endpoint's filters, so both ORDER BY and the keyset seek on
+    (column, id) can walk the index.
+    """
+    return {column.key: column for column in columns}
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+def _decode_value(column, value):
+    """
+    Turns a cursor value back into the sort column's Python type. Anything
+    else (a tampered or stale cursor) raises ValueError rather than reaching
+    the database as a mistyped bind parameter.
+    """
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        python_type = None
+    if python_type in (datetime, date, Decimal):
+        if not isinstance(value, str):
+            raise ValueError(f"expected a string for {column.key}")
+        if python_type is datetime:
+            return datetime.fromisoformat(value)
+        if python_type is date:
+            return date.fromisoformat(value)
+        return Decimal(value)
+    if python_type is int and (not isinstance(value, int) or isinstance(value, bool)):
+        raise ValueError(f"expected an integer for {column.key}")
+    if python_type is float and (not isinstance(value, (int, float)) or isinstance(value, bool)):
+        raise ValueError(f"expected a number for {column.key}")
+    if python_type is str and not isinstance(value, str):
+        raise ValueError(f"expected a string for {column.key}")
+    if python_type is bool and not isinstance(value, bool):
+        raise ValueError(f"expected a boolean for {column.key}")
+    if python_type is None and not isinstance(value, (str, int, float)):
+        raise ValueError(f"unexpected value for {column.key}")
+    return value
+
+def encode_cursor(sort_by: str, sort_order: str, value, row_id) -> str:
+    payload = json.dumps({"k": sort_by, "o": sort_order, "v": _encode_value(value), "id": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(payload, dict) or not {"k", "o", "v", "id"} <= payload.keys():
+            raise ValueError
+        return payload
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+_count_cache: Dict[str, tuple] = {}
+
+def _count_cache_key(db: AsyncSession, query: Select) -> str:
+    compiled = query.compile(dialect=db.bind.dialect, compile_kwargs={"render_postcompile": True})
+    params = sorted((key, repr(value)) for key, value in compiled.params.items())
+    return hashlib.sha1(f"{compiled}|{params}".encode("utf-8")).hexdigest()
+
+async def exact_count(db: AsyncSession, query: Select) -> int:
+    return await db.scalar(select(func.count()).select_from(query.order_by(None).subquery()))
+
+async def cached_count(db: AsyncSession, query: Select) -> int:
+    key = _count_cache_key(db, query.order_by(None))
+    now = time.monotonic()
+    hit = _count_cache.get(key)
+    if hit and hit[0] > now:
+        return hit[1]
+
+    total = await exact_count(db, query)
+    if len(_count_cache) >= settings.PAGINATION_COUNT_CACHE_SIZE:
+        for stale in [k for k, (expires, _) in _count_cache.items() if expires <= now]:
+            del _count_cache[stale]
+        if len(_count_cache) >= settings.PAGINATION_COUNT_CACHE_SIZE:
+            _count_cache.clear()
+    _count_cache[key] = (now + settings.PAGINATION_COUNT_CACHE_SECONDS, total)
+    return total
+
+async def estimated_count(db: AsyncSession, query: Select) -> int:
+    """Postgres' row estimate for the filtered query, read from EXPLAIN without executing it."""
+    conn = await db.connection()
+    compiled = query.order_by(None).compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    params = tuple(compiled.params[name] for name in compiled.positiontup) if compiled.positiontup else compiled.params
+    plan = (await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params)).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+def _resolve_count_strategy(params: PaginationParams, default: str) -> str:
+    if not params.include_total:
+        return COUNT_NONE
+    strategy = params.count_strategy or default
+    if strategy not in COUNT_STRATEGIES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"count_strategy must be one of: {', '.join(COUNT_STRATEGIES)}"
+        )
+    return strategy
+
+async def paginate(
+    db: AsyncSession,
+    query: Select,
+    params: PaginationParams,
+    schema: Any,
+    allowed_sort_keys: Optional[Dict[str, Any]] = None,
+    count_strategy: str = COUNT_EXACT,
+    raw: bool = False
+):
+    """
+    Returns the page as a ready JSON response validated once against
+    PagedResponse[schema], or, with raw=True, as an unvalidated PagedResponse
+    holding the ORM rows for callers that post-process it.
+    """
+    entity = query.column_descriptions[0]['entity']
+    id_column = getattr(entity, inspect(entity).primary_key[0].key)
+    allowed_sort_keys = allowed_sort_keys or sort_keys(id_column)
+
+    sort_by = params.sort_by or "id"
+    sort_field = allowed_sort_keys.get(sort_by)
+    if sort_field is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Cannot sort by '{sort_by}'. Allowed: {', '.join(sorted(allowed_sort_keys))}"
+        )
+    if params.sort_order not in ("asc", "desc"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="sort_order must be asc or desc")
+
+    base_query = query
+    strategy = _resolve_count_strategy(params, count_strategy)
+    if strategy == COUNT_WINDOW and params.cursor:
+        # The window would only count the rows after the cursor.
+        strategy = COUNT_EXACT
+
+    total = None
+    if strategy == COUNT_EXACT:
+        total = await exact_count(db, query)
+    elif strategy == COUNT_CACHED:
+        total = await cached_count(db, query)
+    elif strategy == COUNT_ESTIMATE:
+        total = await estimated_count(db, query)
+    elif strategy == COUNT_WINDOW:
+        query = query.add_columns(func.count().over().label("total_count"))
+
+    descending = params.sort_order == "desc"
+    seek_on_id_only = sort_field.key == id_column.key
+    order_columns = [id_column] if seek_on_id_only else [sort_field, id_column]
+    query = query.order_by(*[column.desc() if descending else column.asc() for column in order_columns])
+
+    if params.cursor:
+        position = decode_cursor(params.cursor)
+        if position["k"] != sort_by or position["o"] != params.sort_order:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor does not match sort_by/sort_order")
+        try:
+            row_id = _decode_value(id_column, position["id"])
+            values = [row_id] if seek_on_id_only else [_decode_value(sort_field, position["v"]), row_id]
+        except (TypeError, ValueError, ArithmeticError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        key = tuple_(*order_columns)
+        query = query.where(key < tuple_(*values) if descending else key > tuple_(*values))
+    else:
+        query = query.offset(params.offset)
+
+    # One extra row tells us whether there is a next page without relying on the count.
+    result = await db.execute(query.limit(params.page_size + 1))
+    if strategy == COUNT_WINDOW:
+        rows = result.all()
+        items = [row[0] for row in rows]
+        if rows:
+            total = rows[0].total_count
+        elif params.offset:
+            # Past the last page there is no row to carry the window count.
+            total = await exact_count(db, base_query)
+        else:
+            total = 0
+    else:
+        items = result.scalars().all()
+    has_next = len(items) > params.page_size
+    items = items[:params.page_size]
+
+    next_cursor = None
+    if has_next and items:
+        last = items[-1]
+        next_cursor = encode_cursor(
+            sort_by, params.sort_order, getattr(last, sort_field.key), getattr(last, id_column.key)
+        )
+
+    pages = (total + params.page_size - 1) // params.page_size if total is not None else None
+
+    page = dict(
         items=items,
         total=total,
         page=params.page,
         page_size=params.page_size,
         pages=pages,
-        has_next=params.page < pages,
-        has_prev=params.page > 1
-    )
\ No newline at end of file
+        has_next=has_next,
+        has_prev=params.page > 1 or params.cursor is not None,
+        next_cursor=next_cursor,
+        count_strategy=strategy
+    )
+    if raw:
+        return PagedResponse(**page)
+    return json_response(page, PagedResponse[schema])
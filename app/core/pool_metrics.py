@@ -0,0 +1,110 @@
+import threading
+import time
+from typing import Dict, List, Optional
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+WAIT_BUCKETS_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+class LatencyHistogram:
+    def __init__(self, buckets_ms: List[float] = WAIT_BUCKETS_MS):
+        self.buckets_ms = list(buckets_ms)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counts = [0] * (len(self.buckets_ms) + 1)
+            self.count = 0
+            self.sum_ms = 0.0
+
+    def observe(self, elapsed_ms: float):
+        index = len(self.buckets_ms)
+        for i, bound in enumerate(self.buckets_ms):
+            if elapsed_ms <= bound:
+                index = i
+                break
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum_ms += elapsed_ms
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            bounds = self.buckets_ms + [None]
+            return {
+                "buckets": [{"le_ms": bound, "count": count} for bound, count in zip(bounds, self.counts)],
+                "count": self.count,
+                "sum_ms": round(self.sum_ms, 3),
+            }
+
+class PoolMetrics:
+    def __init__(self, name: str):
+        self.name = name
+        self.wait = LatencyHistogram()
+        self.timeouts = 0
+        self._lock = threading.Lock()
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+_engines: Dict[str, object] = {}
+_metrics: Dict[str, PoolMetrics] = {}
+
+def register_engine(name: str, engine) -> None:
+    """Track an engine so its pool shows up in the admin pool stats."""
+    _engines[name] = engine
+    _metrics.setdefault(name, PoolMetrics(name))
+
+def get_pool_metrics(name: Optional[str]) -> Optional[PoolMetrics]:
+    return _metrics.get(name)
+
+def get_pool_stats() -> List[dict]:
+    stats = []
+    for name, engine in _engines.items():
+        pool = engine.pool
+        metrics = _metrics[name]
+        entry = {
+            "name": name,
+            "pool_class": type(pool).__name__,
+            "pool_size": None,
+            "max_overflow": None,
+            "checked_out": None,
+            "checked_in": None,
+            "overflow": None,
+            "timeouts": metrics.timeouts,
+            "wait": metrics.wait.snapshot(),
+        }
+        if isinstance(pool, QueuePool):
+            entry.update(
+                pool_size=pool.size(),
+                max_overflow=pool._max_overflow,
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                overflow=max(pool.overflow(), 0),
+            )
+        stats.append(entry)
+    return stats
+
+class _InstrumentedPoolMixin:
+    """Times every connection checkout so pool starvation is visible before it turns into QueuePool timeouts."""
+
+    def _do_get(self):
+        metrics = get_pool_metrics(self.logging_name)
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            if metrics:
+                metrics.record_timeout()
+            raise
+        finally:
+            if metrics:
+                metrics.wait.observe((time.perf_counter() - start) * 1000)
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
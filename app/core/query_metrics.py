@@ -0,0 +1,160 @@
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+from sqlalchemy import event
+from app.core.config import settings
+
+logger = logging.getLogger("app.sql")
+
+# Expanded IN lists and literals would give every call its own fingerprint.
+_IN_LIST = re.compile(r"\bIN\s*\((?:[^()]|\([^()]*\))*\)", re.IGNORECASE)
+_NUMBER = re.compile(r"\b\d+\b")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_statement(statement: str) -> str:
+    statement = _STRING.sub("?", statement)
+    statement = _IN_LIST.sub("IN (...)", statement)
+    statement = _NUMBER.sub("?", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+def fingerprint(statement: str) -> str:
+    return hashlib.sha1(normalize_statement(statement).encode("utf-8")).hexdigest()[:12]
+
+class RequestQueryStats:
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.statements = 0
+        self.db_time_ms = 0.0
+        self.fingerprints = Counter()
+        self.samples = {}
+
+    @property
+    def route(self) -> str:
+        return _route_path(self.scope)
+
+    def record(self, statement: str, elapsed_ms: float):
+        key = fingerprint(statement)
+        self.statements += 1
+        self.db_time_ms += elapsed_ms
+        self.fingerprints[key] += 1
+        self.samples.setdefault(key, normalize_statement(statement))
+
+    def repeated(self) -> List[dict]:
+        return [
+            {"fingerprint": key, "count": count, "statement": self.samples[key][:300]}
+            for key, count in self.fingerprints.most_common()
+            if count > 1
+        ]
+
+    def n_plus_one(self) -> List[dict]:
+        """SELECTs repeated often enough in one request to look like a per-row lazy load."""
+        return [
+            entry for entry in self.repeated()
+            if entry["count"] >= settings.SQL_N_PLUS_ONE_THRESHOLD
+            and entry["statement"].upper().startswith("SELECT")
+        ]
+
+    def as_log_record(self, method: str, status: Optional[int], elapsed_ms: float) -> dict:
+        return {
+            "event": "request_sql",
+            "method": method,
+            "route": self.route,
+            "status": status,
+            "duration_ms": round(elapsed_ms, 3),
+            "statements": self.statements,
+            "db_time_ms": round(self.db_time_ms, 3),
+            "repeated": self.repeated()[:10],
+            "n_plus_one": self.n_plus_one(),
+        }
+
+_current_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("request_query_stats", default=None)
+
+# Called after every timed statement as
+# observer(conn, statement, parameters, context, elapsed_ms, stats).
+_observers: List[Callable] = []
+
+def get_request_query_stats() -> Optional[RequestQueryStats]:
+    return _current_stats.get()
+
+def add_query_observer(observer: Callable) -> None:
+    _observers.append(observer)
+
+def install_query_instrumentation(engine) -> None:
+    """Times every cursor execution and attributes it to the current request, if any."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info["query_start"].pop()) * 1000
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.record(statement, elapsed_ms)
+        for observer in _observers:
+            observer(conn, statement, parameters, context, elapsed_ms, stats)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
+
+def _route_path(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or scope.get("path", "")
+
+class QueryMetricsMiddleware:
+    """
+    Counts the statements and DB time of each request. In DEBUG they are
+    returned as X-DB-* and Server-Timing headers; otherwise one JSON line is
+    logged per request. Requests with likely N+1 patterns are logged at
+    WARNING either way.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats(scope)
+        token = _current_stats.set(stats)
+        start = time.perf_counter()
+        status = None
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if settings.DEBUG:
+                    headers = [
+                        (b"x-db-query-count", str(stats.statements).encode("latin-1")),
+                        (b"x-db-time-ms", f"{stats.db_time_ms:.3f}".encode("latin-1")),
+                        (b"server-timing", f"db;dur={stats.db_time_ms:.3f}".encode("latin-1")),
+                    ]
+                    suspects = stats.n_plus_one()
+                    if suspects:
+                        value = ",".join(f"{entry['fingerprint']}x{entry['count']}" for entry in suspects)
+                        headers.append((b"x-db-n-plus-one", value.encode("latin-1")))
+                    message["headers"] = list(message.get("headers", [])) + headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_stats.reset(token)
+            record = stats.as_log_record(scope["method"], status, (time.perf_counter() - start) * 1000)
+            if record["n_plus_one"]:
+                logger.warning(json.dumps(record))
+            elif not settings.DEBUG and stats.statements:
+                logger.info(json.dumps(record))
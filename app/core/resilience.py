@@ -0,0 +1,257 @@
+import asyncio
+import logging
+import math
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional
+from fastapi import HTTPException, status
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth another attempt: timeouts, throttling and server-side failures.
+# Any other status means the request itself was wrong and will fail again.
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+# S3 reports some throttling and transient faults through the error code.
+RETRYABLE_ERROR_CODES = {"Throttling", "ThrottlingException", "SlowDown", "RequestTimeout", "InternalError", "ServiceUnavailable"}
+# Transport failures carry no status; the SDKs' exception names are the common ground
+# (openai.APIConnectionError/APITimeoutError, botocore EndpointConnectionError/ReadTimeoutError,
+# aiohttp ServerDisconnectedError, urllib3 ProtocolError/MaxRetryError, ...).
+TRANSIENT_NAME_PARTS = ("Timeout", "Connection", "Disconnected", "Protocol", "MaxRetry")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(HTTPException):
+    """Raised instead of calling a dependency whose breaker is open. Surfaces as a 503."""
+
+    def __init__(self, dependency: str, retry_after: float):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"{dependency} is temporarily unavailable, try again shortly",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+        self.dependency = dependency
+
+class CircuitBreaker:
+    """
+    Opens after BREAKER_FAILURE_THRESHOLD consecutive transient failures and
+    fails every call fast for BREAKER_RESET_SECONDS. After that one probe call
+    is let through: success closes the breaker, failure opens it again. Used
+    from both the event loop and worker threads, hence the lock.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.calls = 0
+        self.failures = 0
+        self.retries = 0
+        self.short_circuited = 0
+        self.times_opened = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self.state == OPEN:
+                remaining = self.opened_at + self.reset_seconds - time.monotonic()
+                if remaining > 0:
+                    self.short_circuited += 1
+                    raise CircuitOpenError(self.name, remaining)
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == HALF_OPEN:
+                if self._probing:
+                    self.short_circuited += 1
+                    raise CircuitOpenError(self.name, self.reset_seconds)
+                self._probing = True
+            self.calls += 1
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info(f"[{self.name}] circuit closed")
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self._probing = False
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.times_opened += 1
+                    logger.warning(f"[{self.name}] circuit opened after {self.consecutive_failures} consecutive failures")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def abandon_call(self) -> None:
+        """A call ended without a verdict (cancelled or interrupted): free the probe slot, keep the state."""
+        with self._lock:
+            self._probing = False
+
+    def record_retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            open_for = None
+            if self.state == OPEN:
+                open_for = max(0.0, self.opened_at + self.reset_seconds - time.monotonic())
+            return {
+                "dependency": self.name,
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "open_for_seconds": round(open_for, 3) if open_for is not None else None,
+                "calls": self.calls,
+                "failures": self.failures,
+                "retries": self.retries,
+                "short_circuited": self.short_circuited,
+                "times_opened": self.times_opened,
+            }
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+def circuit_breaker(name: str) -> CircuitBreaker:
+    if name not in _breakers:
+        _breakers[name] = CircuitBreaker(name, settings.BREAKER_FAILURE_THRESHOLD, settings.BREAKER_RESET_SECONDS)
+    return _breakers[name]
+
+def get_breaker_stats() -> List[dict]:
+    return [breaker.stats() for breaker in _breakers.values()]
+
+def _error_response(exc: Exception):
+    return getattr(exc, "response", None)
+
+def _status_code(exc: Exception) -> Optional[int]:
+    response = _error_response(exc)
+    if isinstance(response, dict):  # botocore ClientError
+        return response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    for attr in ("status_code", "status"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+def _headers(exc: Exception):
+    response = _error_response(exc)
+    if isinstance(response, dict):
+        return response.get("ResponseMetadata", {}).get("HTTPHeaders") or {}
+    return getattr(response, "headers", None) or getattr(exc, "headers", None) or {}
+
+def retry_after_seconds(exc: Exception) -> Optional[float]:
+    cause = exc.__cause__ or exc.__context__
+    if _status_code(exc) is None and cause is not None:
+        return retry_after_seconds(cause)
+    headers = _headers(exc)
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0), ("Retry-After", 1.0)):
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return max(0.0, float(value) * scale)
+        except ValueError:
+            pass
+        try:
+            return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            pass
+    return None
+
+def is_retryable(exc: Exception) -> bool:
+    status_code = _status_code(exc)
+    if status_code is not None:
+        if status_code in RETRYABLE_STATUSES:
+            return True
+        response = _error_response(exc)
+        return isinstance(response, dict) and response.get("Error", {}).get("Code") in RETRYABLE_ERROR_CODES
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    if any(part in type(exc).__name__ for part in TRANSIENT_NAME_PARTS):
+        return True
+    # Wrappers such as boto3's S3UploadFailedError keep the real error as the cause.
+    cause = exc.__cause__ or exc.__context__
+    return cause is not None and is_retryable(cause)
+
+def backoff_delay(attempt: int, exc: Exception) -> Optional[float]:
+    """
+    Seconds to wait before the next attempt: the server's Retry-After when it
+    sent one, otherwise exponential backoff with full jitter. None when the
+    server asks for longer than EXTERNAL_RETRY_MAX_DELAY; not worth holding
+    the request for.
+    """
+    retry_after = retry_after_seconds(exc)
+    if retry_after is not None:
+        return retry_after if retry_after <= settings.EXTERNAL_RETRY_MAX_DELAY else None
+    ceiling = min(settings.EXTERNAL_RETRY_MAX_DELAY, settings.EXTERNAL_RETRY_BASE_DELAY * 2 ** attempt)
+    return random.uniform(0, ceiling)
+
+def _on_failure(breaker: CircuitBreaker, attempt: int, exc: Exception) -> Optional[float]:
+    if not is_retryable(exc):
+        # The dependency answered; the request itself was bad.
+        breaker.record_success()
+        return None
+    breaker.record_failure()
+    if attempt + 1 >= settings.EXTERNAL_RETRY_ATTEMPTS:
+        return None
+    delay = backoff_delay(attempt, exc)
+    if delay is not None:
+        breaker.record_retry()
+        logger.info(f"[{breaker.name}] attempt {attempt + 1} failed ({exc}); retrying in {delay:.2f}s")
+    return delay
+
+def call_with_retries(breaker: CircuitBreaker, fn, *args, **kwargs):
+    attempt = 0
+    while True:
+        breaker.before_call()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            delay = _on_failure(breaker, attempt, e)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            attempt += 1
+            continue
+        except BaseException:
+            breaker.abandon_call()
+            raise
+        breaker.record_success()
+        return result
+
+async def acall_with_retries(breaker: CircuitBreaker, fn, *args, **kwargs):
+    attempt = 0
+    while True:
+        breaker.before_call()
+        try:
+            result = await fn(*args, **kwargs)
+        except Exception as e:
+            delay = _on_failure(breaker, attempt, e)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+        except BaseException:
+            # Cancelled (client gone, timeout, shutdown); a probe left marked
+            # as running would keep the breaker short-circuiting for good.
+            breaker.abandon_call()
+            raise
+        breaker.record_success()
+        return result
+
+openai_breaker = circuit_breaker("openai")
+pinecone_breaker = circuit_breaker("pinecone")
+s3_breaker = circuit_breaker("s3")
@@ -0,0 +1,23 @@
+from functools import lru_cache
+from typing import Any
+from fastapi import Response
+from pydantic import TypeAdapter
+
+# FastAPI validates a returned value against response_model, runs it through
+# jsonable_encoder and then json.dumps, and when the handler already built a
+# pydantic model it dumps and re-validates that first. For hot endpoints we do
+# one from_attributes validation against a prebuilt adapter and let
+# pydantic-core write the JSON bytes directly. Returning a Response makes
+# FastAPI skip its own pass; response_model stays on the route for the docs.
+
+@lru_cache(maxsize=None)
+def type_adapter(tp: Any) -> TypeAdapter:
+    return TypeAdapter(tp)
+
+def validate(value: Any, tp: Any) -> Any:
+    return type_adapter(tp).validate_python(value, from_attributes=True)
+
+def json_response(value: Any, tp: Any, status_code: int = 200) -> Response:
+    adapter = type_adapter(tp)
+    body = adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+    return Response(content=body, status_code=status_code, media_type="application/json")
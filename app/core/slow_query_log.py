@@ -0,0 +1,146 @@
+import asyncio
+import contextvars
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import List, Optional
+from app.core.config import settings
+from app.core.query_metrics import add_query_observer
+
+logger = logging.getLogger("app.sql.slow")
+
+SKIP_OPTION = "skip_slow_query_log"
+MAX_PARAM_LENGTH = 200
+_EXPLAINABLE = ("SELECT", "WITH")
+_REDACT_MARKERS = ("password",)
+
+_explain_tasks = set()
+
+def _explain_done(task: asyncio.Task) -> None:
+    _explain_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"EXPLAIN sample failed: {task.exception()!r}")
+
+class SlowQueryLog:
+    """
+    Ring buffer of the last SLOW_QUERY_LOG_SIZE statements that took longer
+    than SLOW_QUERY_MS. A SLOW_QUERY_EXPLAIN_SAMPLE_RATE fraction of the slow
+    read-only ones is re-run under EXPLAIN (ANALYZE, BUFFERS) on a separate
+    connection, off the request path, and the plan is attached to the entry.
+    """
+
+    def __init__(self, size: int):
+        self._entries = deque(maxlen=size)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._explains_running = 0
+
+    def entries(self, limit: Optional[int] = None) -> List[dict]:
+        with self._lock:
+            entries = list(reversed(self._entries))
+        return entries[:limit] if limit else entries
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def add(self, entry: dict) -> dict:
+        with self._lock:
+            entry["id"] = next(self._ids)
+            self._entries.append(entry)
+        return entry
+
+    def observe(self, async_engine, conn, statement, parameters, context, elapsed_ms, stats) -> None:
+        if elapsed_ms < settings.SLOW_QUERY_MS:
+            return
+        if context is not None and context.execution_options.get(SKIP_OPTION):
+            return
+
+        entry = self.add({
+            "captured_at": datetime.now(timezone.utc),
+            "duration_ms": round(elapsed_ms, 3),
+            "statement": statement,
+            "parameters": format_parameters(statement, parameters),
+            "route": stats.route if stats is not None else None,
+            "method": stats.scope.get("method") if stats is not None else None,
+            "engine": conn.engine.pool.logging_name,
+            "explain": None,
+        })
+        logger.warning(json.dumps({
+            "event": "slow_query",
+            "duration_ms": entry["duration_ms"],
+            "route": entry["route"],
+            "statement": statement[:500],
+        }))
+
+        if self._should_explain(statement, parameters, context):
+            self._explains_running += 1
+            # A fresh context so the EXPLAIN is not counted against the request that triggered it.
+            task = contextvars.Context().run(
+                asyncio.get_running_loop().create_task,
+                self._explain(async_engine, entry, statement, parameters),
+            )
+            # The loop only keeps weak references to tasks; hold on until it finishes.
+            _explain_tasks.add(task)
+            task.add_done_callback(_explain_done)
+
+    def _should_explain(self, statement, parameters, context) -> bool:
+        if context is not None and context.executemany:
+            return False
+        if not statement.lstrip().upper().startswith(_EXPLAINABLE):
+            return False
+        if " FOR UPDATE" in statement.upper() or " FOR SHARE" in statement.upper():
+            return False
+        if self._explains_running >= settings.SLOW_QUERY_EXPLAIN_CONCURRENCY:
+            return False
+        return random.random() < settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE
+
+    async def _explain(self, async_engine, entry: dict, statement: str, parameters) -> None:
+        start = time.perf_counter()
+        try:
+            async with async_engine.connect() as conn:
+                conn = await conn.execution_options(**{SKIP_OPTION: True})
+                await conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(settings.SLOW_QUERY_EXPLAIN_TIMEOUT_MS)}")
+                result = await conn.exec_driver_sql("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement, parameters)
+                plan = result.scalar()
+                await conn.rollback()
+            entry["explain"] = {
+                "plan": json.loads(plan) if isinstance(plan, str) else plan,
+                "explain_ms": round((time.perf_counter() - start) * 1000, 3),
+            }
+        except Exception as e:
+            entry["explain"] = {"error": str(e)}
+        finally:
+            self._explains_running -= 1
+
+def format_parameters(statement: str, parameters):
+    if parameters is None:
+        return None
+    if any(marker in statement.lower() for marker in _REDACT_MARKERS):
+        return "<redacted>"
+
+    def clip(value):
+        text = repr(value)
+        return text if len(text) <= MAX_PARAM_LENGTH else text[:MAX_PARAM_LENGTH] + "..."
+
+    if isinstance(parameters, dict):
+        return {str(key): clip(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [clip(value) for value in parameters[:50]]
+    return clip(parameters)
+
+slow_query_log = SlowQueryLog(settings.SLOW_QUERY_LOG_SIZE)
+
+def install_slow_query_log(async_engine) -> None:
+    """Feeds the engine's timed statements into the slow query log."""
+
+    def observer(conn, statement, parameters, context, elapsed_ms, stats):
+        if conn.engine is async_engine.sync_engine:
+            slow_query_log.observe(async_engine, conn, statement, parameters, context, elapsed_ms, stats)
+
+    add_query_observer(observer)
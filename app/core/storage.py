@@ -1,21 +1,46 @@
 import os
 import boto3
-from botocore.exceptions import ClientError
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
 from app.core.config import settings
+from app.core.resilience import call_with_retries, s3_breaker
+import threading
 import uuid
 from typing import Optional, BinaryIO, List, Dict, Any, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+_s3_client = None
+_s3_client_lock = threading.Lock()
+
+def get_s3_client():
+    """
+    The worker's S3 client. Building one loads botocore's service model and
+    each new client opens its own connections, so every storage instance
+    shares this one; boto3 clients are thread-safe.
+    """
+    global _s3_client
+    if _s3_client is None:
+        with _s3_client_lock:
+            if _s3_client is None:
+                _s3_client = boto3.client(
+                    's3',
+                    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                    region_name=settings.AWS_S3_REGION_NAME,
+                    config=Config(
+                        max_pool_connections=settings.AWS_S3_MAX_POOL_CONNECTIONS,
+                        tcp_keepalive=True,
+                        # Retries and backoff come from app.core.resilience, not botocore.
+                        retries={"total_max_attempts": 1, "mode": "standard"}
+                    )
+                )
+    return _s3_client
+
 class S3Storage:
     def __init__(self, location: str = '', default_acl: str = 'public-read', file_overwrite: bool = False, custom_domain: Optional[str] = None):
-        self.s3_client = boto3.client(
-            's3',
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_S3_REGION_NAME
-        )
+        self.s3_client = get_s3_client()
         self.bucket_name = settings.AWS_STORAGE_BUCKET_NAME
         self.location = location
         self.default_acl = default_acl
@@ -72,11 +97,16 @@ class S3Storage:
         
         try:
             logger.info(f"Uploading file {name} to S3 bucket {self.bucket_name} at path {full_path}")
-            self.s3_client.upload_fileobj(file, self.bucket_name, full_path, ExtraArgs=extra_args)
+            def upload():
+                # A retried attempt has to send the file from the start again.
+                file.seek(0)
+                self.s3_client.upload_fileobj(file, self.bucket_name, full_path, ExtraArgs=extra_args)
+
+            call_with_retries(s3_breaker, upload)
             url = self.get_url(full_path)
             logger.info(f"File uploaded successfully. URL: {url}")
             return url
-        except ClientError as e:
+        except (ClientError, BotoCoreError) as e:
             logger.error(f"Failed to upload file to S3: {str(e)}")
             raise Exception(f"Failed to upload file to S3: {str(e)}")
 
@@ -89,10 +119,10 @@ class S3Storage:
     def delete(self, name: str) -> bool:
         try:
             logger.info(f"Deleting file {name} from S3 bucket {self.bucket_name}")
-            self.s3_client.delete_object(Bucket=self.bucket_name, Key=self._get_full_path(name))
+            call_with_retries(s3_breaker, self.s3_client.delete_object, Bucket=self.bucket_name, Key=self._get_full_path(name))
             logger.info(f"File deleted successfully")
             return True
-        except ClientError as e:
+        except (ClientError, BotoCoreError) as e:
             logger.error(f"Failed to delete file from S3: {str(e)}")
             return False
 
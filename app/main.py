@@ -1,13 +1,39 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from app.modules.admin.urls import admin
 from app.modules.authentication.urls import authentication
 from app.modules.chatbot.urls import chatbot
 from app.modules.orders.urls import orders
 from app.modules.products.urls import products
 from app.modules.promotions.urls import promotions
+from app.core.admission import AdmissionControlMiddleware
 from app.core.config import settings
+from app.core.db import replica_engines
+from app.core.db_routing import ReadYourWritesMiddleware
+from app.core.query_metrics import QueryMetricsMiddleware
+from app.modules.authentication.user_cache import start_invalidation_listener, stop_invalidation_listener
+from app.services.ml.clients import start_ml_clients, stop_ml_clients
 
-app = FastAPI(title="E-commerce Backend", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    listen_for_invalidations = settings.AUTH_USER_CACHE_INVALIDATION == "postgres"
+    if listen_for_invalidations:
+        await start_invalidation_listener()
+    await start_ml_clients()
+    try:
+        yield
+    finally:
+        await stop_ml_clients()
+        if listen_for_invalidations:
+            await stop_invalidation_listener()
+
+app = FastAPI(title="E-commerce Backend", version="1.0.0", default_response_class=ORJSONResponse, lifespan=lifespan)
+
+# Added first so it sits inside CORS and rejections still carry CORS headers.
+if settings.ADMISSION_CONTROL:
+    app.add_middleware(AdmissionControlMiddleware)
 
 origins = [
     "http://localhost:4200",
@@ -23,6 +49,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if replica_engines:
+    app.add_middleware(ReadYourWritesMiddleware)
+
+if settings.SQL_INSTRUMENTATION:
+    app.add_middleware(QueryMetricsMiddleware)
+
 for router in authentication:
     app.include_router(router)
 
@@ -36,4 +68,7 @@ for router in orders:
     app.include_router(router)
     
 for router in promotions:
-    app.include_router(router)
\ No newline at end of file
+    app.include_router(router)
+
+for router in admin:
+    app.include_router(router)
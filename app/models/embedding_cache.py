@@ -0,0 +1,11 @@
+from sqlalchemy import Column, DateTime, String, func
+from sqlalchemy.dialects.postgresql import ARRAY, REAL
+from app.models.base_class import Base
+
+class EmbeddingCacheEntry(Base):
+    __tablename__ = "embedding_cache"
+
+    model = Column(String(100), primary_key=True)
+    content_hash = Column(String(64), primary_key=True)  # sha256 hex of the normalised text
+    embedding = Column(ARRAY(REAL), nullable=False)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
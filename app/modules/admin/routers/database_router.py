@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, Query, status
+from typing import List
+from app.core.pool_metrics import get_pool_stats
+from app.core.slow_query_log import slow_query_log
+from app.modules.authentication.models.user import User
+from app.modules.admin.schemas.pool_schema import PoolStatsResponse
+from app.modules.admin.schemas.slow_query_schema import SlowQueryResponse
+from app.modules.authentication.dependencies import get_admin_user
+
+router = APIRouter(prefix="/admin/db", tags=["admin"])
+
+@router.get("/pools", response_model=List[PoolStatsResponse])
+async def get_pools(current_user: User = Depends(get_admin_user)):
+    return get_pool_stats()
+
+@router.get("/slow-queries", response_model=List[SlowQueryResponse])
+async def get_slow_queries(
+    limit: int = Query(50, ge=1, le=1000),
+    current_user: User = Depends(get_admin_user)
+):
+    return slow_query_log.entries(limit)
+
+@router.delete("/slow-queries", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_slow_queries(current_user: User = Depends(get_admin_user)):
+    slow_query_log.clear()
+    return None
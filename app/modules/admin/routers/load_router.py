@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends
+from typing import List
+from app.core.admission import get_admission_stats
+from app.core.resilience import get_breaker_stats
+from app.modules.authentication.models.user import User
+from app.modules.authentication.passwords import password_hasher
+from app.modules.admin.schemas.load_schema import AdmissionGroupStatsResponse, CircuitBreakerStatsResponse, PasswordHashingStatsResponse
+from app.modules.authentication.dependencies import get_admin_user
+
+router = APIRouter(prefix="/admin/load", tags=["admin"])
+
+@router.get("/admission", response_model=List[AdmissionGroupStatsResponse])
+async def get_admission(current_user: User = Depends(get_admin_user)):
+    return get_admission_stats()
+
+@router.get("/password-hashing", response_model=PasswordHashingStatsResponse)
+async def get_password_hashing(current_user: User = Depends(get_admin_user)):
+    return password_hasher.stats()
+
+@router.get("/dependencies", response_model=List[CircuitBreakerStatsResponse])
+async def get_dependencies(current_user: User = Depends(get_admin_user)):
+    return get_breaker_stats()
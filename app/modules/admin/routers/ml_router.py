@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Depends
+from typing import List
+from app.modules.authentication.models.user import User
+from app.modules.admin.schemas.ml_schema import ChatPipelineStageStatsResponse, EmbeddingCacheStatsResponse
+from app.modules.authentication.dependencies import get_admin_user
+from app.services.ml.chat_service import get_pipeline_stats
+from app.services.ml.embedding_cache import embedding_cache
+
+router = APIRouter(prefix="/admin/ml", tags=["admin"])
+
+@router.get("/embedding-cache", response_model=EmbeddingCacheStatsResponse)
+async def get_embedding_cache(current_user: User = Depends(get_admin_user)):
+    return embedding_cache.stats()
+
+@router.get("/chat-pipeline", response_model=List[ChatPipelineStageStatsResponse])
+async def get_chat_pipeline(current_user: User = Depends(get_admin_user)):
+    return get_pipeline_stats()
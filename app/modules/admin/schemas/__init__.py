@@ -0,0 +1,4 @@
+from .pool_schema import HistogramBucket, LatencyHistogramResponse, PoolStatsResponse
+from .slow_query_schema import SlowQueryResponse
+from .load_schema import AdmissionGroupStatsResponse, CircuitBreakerStatsResponse, PasswordHashingStatsResponse
+from .ml_schema import ChatPipelineStageStatsResponse, EmbeddingCacheStatsResponse
@@ -0,0 +1,37 @@
+from pydantic import BaseModel
+from typing import Optional
+from .pool_schema import LatencyHistogramResponse
+
+class AdmissionGroupStatsResponse(BaseModel):
+    group: str
+    concurrency: int
+    queue_size: int
+    per_client: int
+    active: int
+    queued: int
+    admitted: int
+    rejected_overloaded: int  # 503: queue full or queue wait timed out
+    rejected_client_limit: int  # 429: client over its per-group share
+    timed_out: int
+    queue_wait: LatencyHistogramResponse
+
+class PasswordHashingStatsResponse(BaseModel):
+    rounds: int
+    workers: int
+    max_queue: int
+    in_flight: int
+    queued: int
+    rejected: int
+    queue_wait: LatencyHistogramResponse
+    hash_time: LatencyHistogramResponse
+
+class CircuitBreakerStatsResponse(BaseModel):
+    dependency: str
+    state: str  # closed, open or half_open
+    consecutive_failures: int
+    open_for_seconds: Optional[float] = None
+    calls: int
+    failures: int
+    retries: int
+    short_circuited: int  # calls failed fast while open
+    times_opened: int
@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from typing import Optional
+from .pool_schema import LatencyHistogramResponse
+
+class EmbeddingCacheStatsResponse(BaseModel):
+    size: int
+    entries: int
+    memory_hits: int
+    persistent_hits: int
+    misses: int
+    persistent_errors: int
+    hit_rate: Optional[float]  # None until the first lookup
+
+class ChatPipelineStageStatsResponse(BaseModel):
+    stage: str  # context is the whole prompt build, first_token runs from the model call
+    latency: LatencyHistogramResponse
@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+class HistogramBucket(BaseModel):
+    le_ms: Optional[float]  # None is the +Inf bucket
+    count: int
+
+class LatencyHistogramResponse(BaseModel):
+    buckets: List[HistogramBucket]
+    count: int
+    sum_ms: float
+
+class PoolStatsResponse(BaseModel):
+    name: str
+    pool_class: str
+    pool_size: Optional[int]
+    max_overflow: Optional[int]
+    checked_out: Optional[int]
+    checked_in: Optional[int]
+    overflow: Optional[int]
+    timeouts: int
+    wait: LatencyHistogramResponse
@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from typing import Any, Optional
+from datetime import datetime
+
+class SlowQueryResponse(BaseModel):
+    id: int
+    captured_at: datetime
+    duration_ms: float
+    statement: str
+    parameters: Optional[Any]
+    route: Optional[str]
+    method: Optional[str]
+    engine: Optional[str]
+    explain: Optional[dict]  # {"plan", "explain_ms"} or {"error"}; None if not sampled or still running
@@ -0,0 +1,5 @@
+from app.modules.admin.routers.database_router import router as database_router
+from app.modules.admin.routers.load_router import router as load_router
+from app.modules.admin.routers.ml_router import router as ml_router
+
+admin = (database_router, load_router, ml_router)
@@ -1,11 +1,13 @@
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from app.core.db import SessionLocal
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from app.core.db import get_db
+from app.modules.authentication.user_cache import load_active_user
 from app.modules.authentication.models.user import User
 from app.modules.orders.models import Order
-from app.modules.authentication.security import verify_token
+from app.modules.authentication.schemas.auth_schema import TokenPrincipal
+from app.modules.authentication.security import denied_tokens, verify_token
 import logging
 from jose import JWTError, jwt
 from app.core.config import settings
@@ -20,14 +22,7 @@ logger = logging.getLogger(__name__)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -39,10 +34,7 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         if token_data is None:
             raise credentials_exception
         
-        user = db.query(User).filter(
-            User.id == token_data.user_id, 
-            User.active == True
-        ).first()
+        user = await load_active_user(db, token_data.user_id)
         
         if not user:
             raise credentials_exception
@@ -52,6 +44,51 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         logger.error(f"Authentication error: {str(e)}")
         raise credentials_exception
 
+def _claims_trusted(token_data) -> bool:
+    """
+    Claims stand in for the user row only when AUTH_USER_CACHE_INVALIDATION
+    is "postgres": then every worker's deny list hears about deactivations,
+    role changes and password resets. With "local" invalidation it only hears
+    about those made in this worker, so every token is checked against the
+    (cached) user row instead.
+    """
+    if settings.AUTH_USER_CACHE_INVALIDATION != "postgres":
+        return False
+    if token_data.token_type != "access" or token_data.issued_at is None:
+        return False
+    return not denied_tokens.is_revoked(token_data.user_id, token_data.issued_at)
+
+async def get_token_principal(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+    """
+    Claims-only authentication for read-only endpoints that need no more than
+    the caller's id and role. With "postgres" invalidation a verified access
+    token is trusted without a database lookup; with "local" invalidation,
+    for users revoked since the token was issued and for tokens that predate
+    the iat/type claims, the caller is the active user from the user cache
+    or database, as with get_current_user.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+    token_data = verify_token(token)
+    if token_data is None:
+        raise credentials_exception
+
+    if _claims_trusted(token_data):
+        return TokenPrincipal(id=token_data.user_id, email=token_data.email, role=token_data.role)
+
+    try:
+        user = await load_active_user(db, token_data.user_id)
+    except Exception as e:
+        logger.error(f"Authentication error: {str(e)}")
+        raise credentials_exception
+    if not user:
+        raise credentials_exception
+    return TokenPrincipal.model_validate(user)
+
 async def get_current_active_user(current_user: User = Depends(get_current_user)):
     if not current_user.active:
         raise HTTPException(status_code=400, detail="Inactive user")
@@ -96,16 +133,15 @@ def verify_order_access(order_id_param: str = "order_id"):
         order_id_param: The name of the path parameter containing the order ID
     """
     async def dependency(
-        db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user),
-        **path_params
+        request: Request,
+        db: AsyncSession = Depends(get_db),
+        current_user: User = Depends(get_current_user)
     ):
-        order_id = int(path_params[order_id_param])
-        order = db.query(Order).filter(
-            and_(Order.id == order_id, Order.active == True)
-        ).first()
+        order_id = int(request.path_params[order_id_param])
+        # Session.get() checks the shared identity map before going to the database.
+        order = await db.get(Order, order_id)
         
-        if not order:
+        if not order or not order.active:
             raise HTTPException(status_code=404, detail="Order not found or inactive")
         
         if current_user.id != order.user_id and current_user.role != "admin":
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean
+from sqlalchemy import Column, Integer, String, Boolean, Index, func
 from app.models.timestamped import TimestampedModel
 from app.models.base_class import Base
 
@@ -12,3 +12,7 @@ class User(Base, TimestampedModel):
     last_name = Column(String(40))
     role = Column(String(10), nullable=False)  # "admin", "customer"
     active = Column(Boolean, default=True, nullable=False)
+
+    __table_args__ = (
+        Index("ux_users_email_lower", func.lower(email), unique=True),
+    )
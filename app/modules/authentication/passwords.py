@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+from fastapi import HTTPException, status
+from sqlalchemy import update
+from sqlalchemy.exc import SQLAlchemyError
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal
+from app.core.pool_metrics import LatencyHistogram
+from app.modules.authentication.models.user import User
+from app.modules.authentication.user_cache import invalidate_user
+
+logger = logging.getLogger(__name__)
+
+class PasswordHasher:
+    """
+    Runs bcrypt on its own small thread pool instead of the shared anyio one,
+    so a burst of logins cannot starve other requests of threads. bcrypt
+    releases the GIL, so threads give real parallelism here. At most
+    `max_queue` operations wait behind the busy workers; beyond that callers
+    get a 503 straight away rather than joining an ever longer queue.
+    """
+
+    def __init__(self, workers: int, max_queue: int, rounds: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.rounds = rounds
+        self.queue_wait = LatencyHistogram()
+        self.hash_time = LatencyHistogram()
+        self.rejected = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many password operations in progress, try again shortly",
+                    headers={"Retry-After": str(settings.PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+                )
+            self._pending += 1
+
+        submitted = time.perf_counter()
+
+        def timed():
+            started = time.perf_counter()
+            self.queue_wait.observe((started - submitted) * 1000)
+            try:
+                return fn(*args)
+            finally:
+                self.hash_time.observe((time.perf_counter() - started) * 1000)
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, timed)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        hashed = await self._run(bcrypt.hashpw, password.encode("utf-8"), bcrypt.gensalt(rounds=self.rounds))
+        return hashed.decode("utf-8")
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._run(bcrypt.checkpw, password.encode("utf-8"), hashed.encode("utf-8"))
+
+    def needs_rehash(self, hashed: str) -> bool:
+        """True when `hashed` was made with a different work factor ($2b$<rounds>$...)."""
+        try:
+            return int(hashed.split("$")[2]) != self.rounds
+        except (IndexError, ValueError):
+            return False
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = self._pending
+        return {
+            "rounds": self.rounds,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": min(pending, self.workers),
+            "queued": max(pending - self.workers, 0),
+            "rejected": self.rejected,
+            "queue_wait": self.queue_wait.snapshot(),
+            "hash_time": self.hash_time.snapshot(),
+        }
+
+password_hasher = PasswordHasher(
+    settings.PASSWORD_HASH_WORKERS,
+    settings.PASSWORD_HASH_QUEUE_SIZE,
+    settings.PASSWORD_HASH_ROUNDS,
+)
+
+async def rehash_password(user_id: int, old_hash: str, password: str) -> None:
+    """
+    Re-hashes a password stored with a different work factor than
+    PASSWORD_HASH_ROUNDS. Runs as a background task after the login response
+    on its own session; a failed attempt is simply retried at the next login.
+    """
+    try:
+        new_hash = await password_hasher.hash(password)
+    except HTTPException:
+        return
+
+    async with AsyncSessionLocal() as db:
+        try:
+            async with db.begin_nested():
+                # Only replace the hash we verified, not one set by a password change since.
+                result = await db.execute(
+                    update(User)
+                    .where(User.id == user_id, User.password == old_hash)
+                    .values(password=new_hash)
+                )
+                if result.rowcount:
+                    await invalidate_user(db, user_id)
+            await db.commit()
+        except SQLAlchemyError as e:
+            await db.rollback()
+            logger.error(f"Password rehash failed for user {user_id}: {str(e)}")
@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 from datetime import datetime, timedelta
-import bcrypt
 from typing import List, Optional
-from app.core.db import SessionLocal
+from app.core.db import get_db
+from app.core.lookups import get_active_user, get_active_user_by_email
 from app.modules.authentication.models.user import User
 from app.modules.authentication.schemas.auth_schema import *
 from app.modules.authentication.security import (
@@ -13,32 +14,35 @@ from app.modules.authentication.security import (
     verify_token, ACCESS_TOKEN_EXPIRE_MINUTES
 )
 from app.modules.authentication.dependencies import get_current_user, get_admin_user
+from app.modules.authentication.passwords import password_hasher, rehash_password
+from app.modules.authentication.user_cache import invalidate_user
 from app.modules.authentication.schemas.user_schema import UserResponse, UserCreate
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-def authenticate_user(db: Session, email: str, password: str):
-    user = db.query(User).filter(User.email == email, User.active == True).first()
+async def authenticate_user(
+    db: AsyncSession,
+    email: str,
+    password: str,
+    background_tasks: Optional[BackgroundTasks] = None
+):
+    user = await get_active_user_by_email(db, email)
     if not user:
         return False
-    if not verify_password(password, user.password):
+    if not await password_hasher.verify(password, user.password):
         return False
+    if background_tasks is not None and password_hasher.needs_rehash(user.password):
+        background_tasks.add_task(rehash_password, user.id, user.password, password)
     return user
 
-def verify_password(plain_password, hashed_password):
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
-
 @router.post("/login", response_model=TokenResponse)
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = authenticate_user(db, form_data.username, form_data.password)
+async def login_for_access_token(
+    background_tasks: BackgroundTasks,
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: AsyncSession = Depends(get_db)
+):
+    user = await authenticate_user(db, form_data.username, form_data.password, background_tasks)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -63,8 +67,12 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db:
     }
 
 @router.post("/login/email", response_model=TokenResponse)
-def login_with_email(login_data: UserLogin, db: Session = Depends(get_db)):
-    user = authenticate_user(db, login_data.email, login_data.password)
+async def login_with_email(
+    login_data: UserLogin,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db)
+):
+    user = await authenticate_user(db, login_data.email, login_data.password, background_tasks)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -89,7 +97,7 @@ def login_with_email(login_data: UserLogin, db: Session = Depends(get_db)):
     }
 
 @router.post("/refresh-token", response_model=TokenResponse)
-def refresh_access_token(request: RefreshTokenRequest, db: Session = Depends(get_db)):
+async def refresh_access_token(request: RefreshTokenRequest, db: AsyncSession = Depends(get_db)):
     token_data = verify_token(request.refresh_token)
     if not token_data:
         raise HTTPException(
@@ -98,7 +106,7 @@ def refresh_access_token(request: RefreshTokenRequest, db: Session = Depends(get
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = db.query(User).filter(User.id == token_data.user_id, User.active == True).first()
+    user = await get_active_user(db, token_data.user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -123,7 +131,7 @@ def refresh_access_token(request: RefreshTokenRequest, db: Session = Depends(get
     }
 
 @router.get("/me", response_model=dict)
-def read_users_me(current_user: User = Depends(get_current_user)):
+async def read_users_me(current_user: User = Depends(get_current_user)):
     return {
         "id": current_user.id,
         "email": current_user.email,
@@ -133,7 +141,7 @@ def read_users_me(current_user: User = Depends(get_current_user)):
     }
 
 @router.get("/protected-admin")
-def protected_admin_route(current_user: User = Depends(get_current_user)):
+async def protected_admin_route(current_user: User = Depends(get_current_user)):
     if current_user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -142,38 +150,38 @@ def protected_admin_route(current_user: User = Depends(get_current_user)):
     return {"message": "This is protected data for admin only"}
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
-    existing = db.query(User).filter(User.email == user_data.email).first()
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
+    existing = await db.scalar(select(User).where(func.lower(User.email) == user_data.email.lower()))
     if existing:
         raise HTTPException(status_code=400, detail="Email already exists.")
     
+    hashed_pw = await password_hasher.hash(user_data.password)
+    
     try:
-        with db.begin_nested():
-            hashed_pw = bcrypt.hashpw(user_data.password.encode("utf-8"), bcrypt.gensalt())
+        async with db.begin_nested():
             user = User(
                 email=user_data.email,
-                password=hashed_pw.decode("utf-8"),
+                password=hashed_pw,
                 first_name=user_data.first_name,
                 last_name=user_data.last_name,
                 role="customer",
                 active=True
             )
             db.add(user)
-            db.flush()
-        db.commit()
+            await db.flush()
+        await db.commit()
         return user
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
     
 @router.post("/change-password", status_code=status.HTTP_200_OK)
-def change_password(
+async def change_password(
     password_data: PasswordChange,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    if not bcrypt.checkpw(password_data.old_password.encode("utf-8"), 
-                        current_user.password.encode("utf-8")):
+    if not await password_hasher.verify(password_data.old_password, current_user.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="The current password is incorrect"
@@ -185,16 +193,17 @@ def change_password(
             detail="The new password and confirmation do not match"
         )
     
-    hashed_pw = bcrypt.hashpw(password_data.new_password.encode("utf-8"), bcrypt.gensalt())
+    hashed_pw = await password_hasher.hash(password_data.new_password)
     
     try:
-        with db.begin_nested():
-            current_user.password = hashed_pw.decode("utf-8")
-            db.flush()
-        db.commit()
+        async with db.begin_nested():
+            current_user.password = hashed_pw
+            await db.flush()
+            await invalidate_user(db, current_user.id, revoke_tokens=True)
+        await db.commit()
         return {"message": "Password updated successfully"}
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, 
             detail=f"Database error: {str(e)}"
@@ -10,6 +10,16 @@ class TokenData(BaseModel):
     user_id: Optional[int] = None
     email: Optional[str] = None
     role: Optional[str] = None
+    token_type: Optional[str] = None
+    issued_at: Optional[float] = None
+
+class TokenPrincipal(BaseModel):
+    id: int
+    email: Optional[str] = None
+    role: Optional[str] = None
+
+    class Config:
+        from_attributes = True
     
 class UserLogin(BaseModel):
     email: EmailStr
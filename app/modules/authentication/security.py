@@ -1,33 +1,42 @@
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from pydantic import BaseModel
 from .schemas.auth_schema import TokenData
 from app.core.config import settings
+from app.modules.authentication.token_cache import TokenDenyList, VerifiedTokenCache
 
 SECRET_KEY = settings.AUTH_SECRET_KEY
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
+verified_tokens = VerifiedTokenCache(settings.AUTH_TOKEN_CACHE_SIZE)
+denied_tokens = TokenDenyList(settings.AUTH_TOKEN_DENY_SECONDS)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.now() + expires_delta
     else:
         expire = datetime.now() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": int(time.time()), "type": "access"})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 def create_refresh_token(data: dict):
     to_encode = data.copy()
     expire = datetime.now() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": int(time.time()), "type": "refresh"})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 def verify_token(token: str):
+    cached = verified_tokens.get(token)
+    if cached is not None:
+        return cached
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         
@@ -40,7 +49,15 @@ def verify_token(token: str):
             
         user_id = int(user_id)
         
-        return TokenData(user_id=user_id, email=email, role=role)
+        token_data = TokenData(
+            user_id=user_id,
+            email=email,
+            role=role,
+            token_type=payload.get("type"),
+            issued_at=payload.get("iat")
+        )
+        verified_tokens.put(token, token_data, payload.get("exp"))
+        return token_data
     except JWTError:
         return None
     except ValueError:
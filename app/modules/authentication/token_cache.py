@@ -0,0 +1,72 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+from app.modules.authentication.schemas.auth_schema import TokenData
+
+class VerifiedTokenCache:
+    """
+    LRU of tokens whose signature and claims have already been checked, each
+    kept until its exp claim, so a repeat token skips the HMAC and JSON decode.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[TokenData]:
+        if self.size <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            expires, token_data = entry
+            if expires <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return token_data
+
+    def put(self, token: str, token_data: TokenData, expires: Optional[float]) -> None:
+        # A token without exp never expires on its own; keep verifying it.
+        if self.size <= 0 or expires is None:
+            return
+        with self._lock:
+            self._entries[token] = (expires, token_data)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+class TokenDenyList:
+    """
+    Users whose claims can no longer be trusted for tokens issued up to the
+    time they were revoked (deactivation, role or password change). An entry
+    only has to outlive the access tokens issued before it, so it is dropped
+    after `ttl` seconds.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+
+    def revoke(self, user_id: int) -> None:
+        now = time.time()
+        with self._lock:
+            for stale in [key for key, (_, expires) in self._entries.items() if expires <= now]:
+                del self._entries[stale]
+            self._entries[user_id] = (int(now), now + self.ttl)
+
+    def is_revoked(self, user_id: int, issued_at: Optional[float]) -> bool:
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if entry is None or entry[1] <= time.time():
+            return False
+        # iat has one second resolution, so a token from the same second counts as revoked.
+        return issued_at is None or issued_at <= entry[0]
@@ -0,0 +1,152 @@
+import asyncio
+import asyncpg
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from sqlalchemy import func, inspect, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from app.core.config import settings
+from app.core.lookups import get_active_user
+from app.modules.authentication.models.user import User
+from app.modules.authentication.security import denied_tokens
+
+logger = logging.getLogger(__name__)
+
+USER_CACHE_CHANNEL = "user_cache_invalidate"
+REVOKE_PREFIX = "revoke:"
+
+class UserCache:
+    """
+    Bounded LRU of active users' column values keyed by id, each entry valid
+    for AUTH_USER_CACHE_SECONDS. The TTL bounds staleness for changes made
+    outside the invalidating endpoints.
+    """
+
+    def __init__(self, size: int, ttl: float):
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0 and self.ttl > 0
+
+    def get(self, user_id: int) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires, values = entry
+            if expires <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return values
+
+    def put(self, user: User) -> None:
+        values = {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+        with self._lock:
+            self._entries[user.id] = (time.monotonic() + self.ttl, values)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+user_cache = UserCache(settings.AUTH_USER_CACHE_SIZE, settings.AUTH_USER_CACHE_SECONDS)
+
+async def load_active_user(db: AsyncSession, user_id: int) -> Optional[User]:
+    """
+    The active user for an authenticated request. A cache hit is attached to
+    the session with merge(load=False), which issues no SELECT, so handlers can
+    still modify and flush current_user as usual.
+    """
+    if not user_cache.enabled:
+        return await get_active_user(db, user_id)
+
+    values = user_cache.get(user_id)
+    if values is None:
+        user = await get_active_user(db, user_id)
+        if user:
+            user_cache.put(user)
+        return user
+
+    user = User(**values)
+    make_transient_to_detached(user)
+    return await db.merge(user, load=False)
+
+async def invalidate_user(db: AsyncSession, user_id: int, revoke_tokens: bool = False) -> None:
+    """
+    Drops a user from this worker's cache, and with revoke_tokens stops
+    claims-only authentication from trusting the tokens already issued to
+    them. With AUTH_USER_CACHE_INVALIDATION set to "postgres", it also queues
+    a NOTIFY in the caller's transaction, so the other workers do the same
+    once the change commits. Call it inside the write transaction.
+    """
+    user_cache.invalidate(user_id)
+    if revoke_tokens:
+        denied_tokens.revoke(user_id)
+    if settings.AUTH_USER_CACHE_INVALIDATION == "postgres":
+        payload = f"{REVOKE_PREFIX}{user_id}" if revoke_tokens else str(user_id)
+        await db.execute(select(func.pg_notify(USER_CACHE_CHANNEL, payload)))
+
+_listener_task: Optional[asyncio.Task] = None
+
+def _on_notification(connection, pid, channel, payload):
+    revoke_tokens = payload.startswith(REVOKE_PREFIX)
+    try:
+        user_id = int(payload[len(REVOKE_PREFIX):] if revoke_tokens else payload)
+    except ValueError:
+        logger.warning(f"Ignoring malformed user cache invalidation: {payload!r}")
+        return
+    user_cache.invalidate(user_id)
+    if revoke_tokens:
+        denied_tokens.revoke(user_id)
+
+async def _listen_for_invalidations():
+    # LISTEN needs a session-level connection, so this goes straight to
+    # Postgres rather than through the pool (or PgBouncer in transaction mode).
+    dsn = make_url(settings.DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+    while True:
+        try:
+            connection = await asyncpg.connect(dsn)
+            try:
+                await connection.add_listener(USER_CACHE_CHANNEL, _on_notification)
+                # Anything sent while we were not listening is lost.
+                user_cache.clear()
+                while not connection.is_closed():
+                    await asyncio.sleep(5)
+            finally:
+                await connection.close()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"User cache invalidation listener error: {str(e)}")
+        user_cache.clear()
+        await asyncio.sleep(1)
+
+async def start_invalidation_listener():
+    global _listener_task
+    if _listener_task is None:
+        _listener_task = asyncio.create_task(_listen_for_invalidations())
+
+async def stop_invalidation_listener():
+    global _listener_task
+    if _listener_task is not None:
+        _listener_task.cancel()
+        try:
+            await _listener_task
+        except asyncio.CancelledError:
+            pass
+        _listener_task = None
@@ -1,14 +1,17 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, Index
 from app.models.timestamped import TimestampedModel
 from sqlalchemy.orm import relationship
 from app.models.base_class import Base
 
 class ChatbotMessage(Base, TimestampedModel):
     __tablename__ = "chatbot_messages"
+    __table_args__ = (
+        Index("ix_chatbot_messages_session_id_id", "session_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True)
     session_id = Column(Integer, ForeignKey("chatbot_sessions.id", ondelete="CASCADE"), nullable=False)
     sender = Column(String(5), nullable=False)  # "user" or "bot"
     message = Column(Text, nullable=False)
 
-    session = relationship("ChatbotSession", back_populates="messages")
+    session = relationship("ChatbotSession", back_populates="messages", foreign_keys=[session_id])
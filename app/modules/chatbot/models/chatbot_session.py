@@ -1,14 +1,26 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, Boolean, Index, text
 from app.models.timestamped import TimestampedModel
 from sqlalchemy.orm import relationship
 from app.models.base_class import Base
 
 class ChatbotSession(Base, TimestampedModel):
     __tablename__ = "chatbot_sessions"
+    __table_args__ = (
+        Index("ix_chatbot_sessions_user_id_id_active", "user_id", "id", postgresql_where=text("active")),
+    )
     
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     session_token = Column(String(255), unique=True, nullable=False)
     active = Column(Boolean, default=True, nullable=False)
+    summary = Column(Text, nullable=True)  # rolling summary of messages up to summary_message_id
+    # use_alter: chatbot_messages references this table too, so the FK is added after both exist.
+    summary_message_id = Column(
+        Integer,
+        ForeignKey("chatbot_messages.id", ondelete="SET NULL", name="fk_chatbot_sessions_summary_message_id", use_alter=True),
+        nullable=True,
+    )
 
-    messages = relationship("ChatbotMessage", back_populates="session", cascade="all, delete-orphan")
+    messages = relationship(
+        "ChatbotMessage", back_populates="session", cascade="all, delete-orphan", foreign_keys="ChatbotMessage.session_id"
+    )
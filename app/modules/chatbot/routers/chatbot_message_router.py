@@ -1,35 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+import logging
+import time
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, select
 from sqlalchemy.exc import SQLAlchemyError
 from typing import List, Optional
-from app.core.db import SessionLocal
+from app.core.db import get_db, get_session_factory
+from app.core.lookups import get_active_chatbot_session
 from app.modules.authentication.models.user import User
 from app.modules.chatbot.models import ChatbotMessage, ChatbotSession
-from app.modules.chatbot.schemas import ChatbotMessageCreate, ChatbotMessageResponse
+from app.modules.chatbot.schemas import ChatbotMessageCreate, ChatbotMessageResponse, ChatbotReplyRequest
 from app.core.pagination import PaginationParams, PagedResponse, paginate
 from app.modules.authentication.dependencies import get_current_user, get_admin_user
+from app.services.ml.chat_service import ChatService, stream_reply
 
+logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/chatbot", tags=["chatbot"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 def verify_session_access():
     async def dependency(
         session_id: int,
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_db),
         current_user: User = Depends(get_current_user)
     ):
-        session = db.query(ChatbotSession).filter(
-            and_(ChatbotSession.id == session_id, ChatbotSession.active == True)
-        ).first()
+        session = await db.get(ChatbotSession, session_id)
         
-        if not session:
+        if not session or not session.active:
             raise HTTPException(status_code=404, detail="Chatbot session not found or inactive.")
         
         if session.user_id and current_user.id != session.user_id and current_user.role != "admin":
@@ -42,14 +39,12 @@ def verify_session_access():
     return dependency
 
 @router.post("/messages", response_model=ChatbotMessageResponse, status_code=status.HTTP_201_CREATED)
-def create_message(
+async def create_message(
     message_data: ChatbotMessageCreate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    session = db.query(ChatbotSession).filter(
-        and_(ChatbotSession.id == message_data.session_id, ChatbotSession.active == True)
-    ).first()
+    session = await get_active_chatbot_session(db, message_data.session_id)
     
     if not session:
         raise HTTPException(status_code=404, detail="Chatbot session not found or inactive.")
@@ -64,47 +59,91 @@ def create_message(
         raise HTTPException(status_code=400, detail="Sender must be 'user' or 'bot'.")
     
     try:
-        with db.begin_nested():
+        async with db.begin_nested():
             message = ChatbotMessage(
                 session_id=message_data.session_id,
                 sender=message_data.sender,
                 message=message_data.message
             )
             db.add(message)
-            db.flush()
-        db.commit()
+            await db.flush()
+        await db.commit()
         return message
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @router.get("/sessions/{session_id}/messages", response_model=PagedResponse[ChatbotMessageResponse])
-def get_session_messages(
+async def get_session_messages(
     session: ChatbotSession = Depends(verify_session_access()),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     sort_by: Optional[str] = Query("id"),
-    sort_order: str = Query("asc")
+    sort_order: str = Query("asc"),
+    cursor: Optional[str] = Query(None),
+    include_total: bool = Query(True),
+    count_strategy: Optional[str] = Query(None)
 ):
-    query = db.query(ChatbotMessage).filter(ChatbotMessage.session_id == session.id)
-    pagination = PaginationParams(page, page_size, sort_by, sort_order)
+    query = select(ChatbotMessage).where(ChatbotMessage.session_id == session.id)
+    pagination = PaginationParams(page, page_size, sort_by, sort_order, cursor, include_total, count_strategy)
     
-    return paginate(query, pagination, ChatbotMessageResponse)
+    return await paginate(db, query, pagination, ChatbotMessageResponse)
+
+@router.post("/sessions/{session_id}/reply")
+async def reply(
+    request: Request,
+    reply_data: ChatbotReplyRequest,
+    session: ChatbotSession = Depends(verify_session_access()),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Streams the bot's reply as Server-Sent Events: `data` frames with
+    {"delta": text} as tokens arrive, then a `done` event with the ids of the
+    stored user and bot messages, or an `error` event. The prompt carries
+    relevant catalog products and recent history within
+    CHATBOT_PROMPT_TOKENS; its stage timings come back as Server-Timing.
+    """
+    text = reply_data.message.strip()
+    if not text:
+        raise HTTPException(status_code=400, detail="Message is required")
+
+    session_id = session.id
+    summary, summary_message_id = session.summary, session.summary_message_id
+    # The context stages use their own sessions and the stream can run for a
+    # while; give the request's pooled connection back first.
+    await db.close()
+
+    started = time.perf_counter()
+    service = ChatService(get_session_factory(request))
+    context = await service.build_context(session_id, text, summary, summary_message_id)
+
+    try:
+        stream = await service.start_reply(context)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"[Chatbot] Could not start reply for session {session_id}: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="The assistant is unavailable, try again shortly")
+
+    return StreamingResponse(
+        stream_reply(stream, session_id, text, started),
+        media_type="text/event-stream",
+        # Proxies must pass each frame on as it comes rather than buffer the body.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "Server-Timing": context.server_timing()},
+    )
 
 @router.get("/messages/{message_id}", response_model=ChatbotMessageResponse)
-def get_message(
+async def get_message(
     message_id: int, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    message = db.query(ChatbotMessage).filter(ChatbotMessage.id == message_id).first()
+    message = await db.scalar(select(ChatbotMessage).where(ChatbotMessage.id == message_id))
     if not message:
         raise HTTPException(status_code=404, detail="Message not found.")
     
-    session = db.query(ChatbotSession).filter(
-        and_(ChatbotSession.id == message.session_id, ChatbotSession.active == True)
-    ).first()
+    session = await get_active_chatbot_session(db, message.session_id)
     
     if not session:
         raise HTTPException(status_code=404, detail="Associated chatbot session not found or inactive.")
@@ -118,19 +157,17 @@ def get_message(
     return message
 
 @router.patch("/messages/{message_id}", response_model=ChatbotMessageResponse)
-def update_message(
+async def update_message(
     message_id: int, 
     message_data: ChatbotMessageCreate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    message = db.query(ChatbotMessage).filter(ChatbotMessage.id == message_id).first()
+    message = await db.scalar(select(ChatbotMessage).where(ChatbotMessage.id == message_id))
     if not message:
         raise HTTPException(status_code=404, detail="Message not found.")
     
-    session = db.query(ChatbotSession).filter(
-        and_(ChatbotSession.id == message.session_id, ChatbotSession.active == True)
-    ).first()
+    session = await get_active_chatbot_session(db, message.session_id)
     
     if not session:
         raise HTTPException(status_code=404, detail="Associated chatbot session not found or inactive.")
@@ -145,9 +182,7 @@ def update_message(
         raise HTTPException(status_code=400, detail="Sender must be 'user' or 'bot'.")
     
     if message_data.session_id != message.session_id:
-        new_session = db.query(ChatbotSession).filter(
-            and_(ChatbotSession.id == message_data.session_id, ChatbotSession.active == True)
-        ).first()
+        new_session = await get_active_chatbot_session(db, message_data.session_id)
         
         if not new_session:
             raise HTTPException(status_code=404, detail="Target chatbot session not found or inactive.")
@@ -159,30 +194,28 @@ def update_message(
             )
     
     try:
-        with db.begin_nested():
+        async with db.begin_nested():
             message.session_id = message_data.session_id
             message.sender = message_data.sender
             message.message = message_data.message
-            db.flush()
-        db.commit()
+            await db.flush()
+        await db.commit()
         return message
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @router.delete("/messages/{message_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_message(
+async def delete_message(
     message_id: int, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    message = db.query(ChatbotMessage).filter(ChatbotMessage.id == message_id).first()
+    message = await db.scalar(select(ChatbotMessage).where(ChatbotMessage.id == message_id))
     if not message:
         raise HTTPException(status_code=404, detail="Message not found.")
     
-    session = db.query(ChatbotSession).filter(
-        and_(ChatbotSession.id == message.session_id, ChatbotSession.active == True)
-    ).first()
+    session = await get_active_chatbot_session(db, message.session_id)
     
     if session and session.user_id and current_user.id != session.user_id and current_user.role != "admin":
         raise HTTPException(
@@ -191,10 +224,10 @@ def delete_message(
         )
     
     try:
-        with db.begin_nested():
-            db.delete(message)
-            db.flush()
-        db.commit()
+        async with db.begin_nested():
+            await db.delete(message)
+            await db.flush()
+        await db.commit()
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
\ No newline at end of file
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, select
 from sqlalchemy.exc import SQLAlchemyError
 from typing import List, Optional
-from app.core.db import SessionLocal
+from app.core.db import get_db
+from app.core.lookups import get_active_chatbot_session
 from app.modules.authentication.models.user import User
 from app.modules.chatbot.models import ChatbotSession
 from app.modules.chatbot.schemas import ChatbotSessionCreate, ChatbotSessionResponse
@@ -12,17 +13,10 @@ from app.modules.authentication.dependencies import get_current_user, get_admin_
 
 router = APIRouter(prefix="/chatbot", tags=["chatbot"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/sessions", response_model=ChatbotSessionResponse, status_code=status.HTTP_201_CREATED)
-def create_session(
+async def create_session(
     session_data: ChatbotSessionCreate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     if session_data.user_id and session_data.user_id != current_user.id and current_user.role != "admin":
@@ -31,69 +25,73 @@ def create_session(
             detail="Cannot create sessions for other users"
         )
     
-    existing = db.query(ChatbotSession).filter(ChatbotSession.session_token == session_data.session_token).first()
+    existing = await db.scalar(select(ChatbotSession).where(ChatbotSession.session_token == session_data.session_token))
     if existing:
         raise HTTPException(status_code=400, detail="Session token already exists.")
     
     try:
-        with db.begin_nested():
+        async with db.begin_nested():
             session = ChatbotSession(
                 user_id=session_data.user_id or current_user.id,
                 session_token=session_data.session_token,
                 active=True
             )
             db.add(session)
-            db.flush()
-        db.commit()
+            await db.flush()
+        await db.commit()
         return session
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @router.get("/sessions", response_model=PagedResponse[ChatbotSessionResponse])
-def get_sessions(
-    db: Session = Depends(get_db),
+async def get_sessions(
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_admin_user),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     sort_by: Optional[str] = Query(None),
     sort_order: str = Query("asc"),
+    cursor: Optional[str] = Query(None),
+    include_total: bool = Query(True),
+    count_strategy: Optional[str] = Query(None),
     user_id: Optional[int] = Query(None)
 ):
-    query = db.query(ChatbotSession).filter(ChatbotSession.active == True)
+    query = select(ChatbotSession).where(ChatbotSession.active == True)
     
     if user_id:
-        query = query.filter(ChatbotSession.user_id == user_id)
+        query = query.where(ChatbotSession.user_id == user_id)
     
-    pagination = PaginationParams(page, page_size, sort_by, sort_order)
-    return paginate(query, pagination, ChatbotSessionResponse)
+    pagination = PaginationParams(page, page_size, sort_by, sort_order, cursor, include_total, count_strategy)
+    return await paginate(db, query, pagination, ChatbotSessionResponse)
 
 @router.get("/sessions/user/{user_id}", response_model=PagedResponse[ChatbotSessionResponse])
-def get_user_sessions(
+async def get_user_sessions(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(verify_user_access()),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     sort_by: Optional[str] = Query("id"),
-    sort_order: str = Query("desc")
+    sort_order: str = Query("desc"),
+    cursor: Optional[str] = Query(None),
+    include_total: bool = Query(True),
+    count_strategy: Optional[str] = Query(None)
 ):
-    query = db.query(ChatbotSession).filter(
+    query = select(ChatbotSession).where(
         and_(ChatbotSession.user_id == user_id, ChatbotSession.active == True)
     )
     
-    pagination = PaginationParams(page, page_size, sort_by, sort_order)
-    return paginate(query, pagination, ChatbotSessionResponse)
+    pagination = PaginationParams(page, page_size, sort_by, sort_order, cursor, include_total, count_strategy)
+    return await paginate(db, query, pagination, ChatbotSessionResponse)
 
 @router.get("/sessions/{session_id}", response_model=ChatbotSessionResponse)
-def get_session(
+async def get_session(
     session_id: int, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    session = db.query(ChatbotSession).filter(
-        and_(ChatbotSession.id == session_id, ChatbotSession.active == True)
-    ).first()
+    session = await get_active_chatbot_session(db, session_id)
     
     if not session:
         raise HTTPException(status_code=404, detail="Chatbot session not found.")
@@ -107,15 +105,13 @@ def get_session(
     return session
 
 @router.patch("/sessions/{session_id}", response_model=ChatbotSessionResponse)
-def update_session(
+async def update_session(
     session_id: int, 
     session_data: ChatbotSessionCreate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    session = db.query(ChatbotSession).filter(
-        and_(ChatbotSession.id == session_id, ChatbotSession.active == True)
-    ).first()
+    session = await get_active_chatbot_session(db, session_id)
     
     if not session:
         raise HTTPException(status_code=404, detail="Chatbot session not found.")
@@ -127,34 +123,32 @@ def update_session(
         )
     
     if session_data.session_token != session.session_token:
-        existing = db.query(ChatbotSession).filter(
+        existing = await db.scalar(select(ChatbotSession).where(
             ChatbotSession.session_token == session_data.session_token, 
             ChatbotSession.id != session_id
-        ).first()
+        ))
         if existing:
             raise HTTPException(status_code=400, detail="Session token already exists.")
     
     try:
-        with db.begin_nested():
+        async with db.begin_nested():
             session.session_token = session_data.session_token
             if session_data.user_id is not None and current_user.role == "admin":
                 session.user_id = session_data.user_id
-            db.flush()
-        db.commit()
+            await db.flush()
+        await db.commit()
         return session
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @router.delete("/sessions/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_session(
+async def delete_session(
     session_id: int, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    session = db.query(ChatbotSession).filter(
-        and_(ChatbotSession.id == session_id, ChatbotSession.active == True)
-    ).first()
+    session = await get_active_chatbot_session(db, session_id)
     
     if not session:
         raise HTTPException(status_code=404, detail="Chatbot session not found.")
@@ -166,10 +160,10 @@ def delete_session(
         )
     
     try:
-        with db.begin_nested():
+        async with db.begin_nested():
             session.active = False
-            db.flush()
-        db.commit()
+            await db.flush()
+        await db.commit()
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
\ No newline at end of file
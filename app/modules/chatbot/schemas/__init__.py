@@ -1,2 +1,2 @@
 from .chatbot_session_schema import ChatbotSessionCreate, ChatbotSessionResponse
-from .chatbot_message_schema import ChatbotMessageCreate, ChatbotMessageResponse
\ No newline at end of file
+from .chatbot_message_schema import ChatbotMessageCreate, ChatbotMessageResponse, ChatbotReplyRequest
\ No newline at end of file
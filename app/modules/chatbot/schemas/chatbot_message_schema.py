@@ -6,6 +6,9 @@ class ChatbotMessageCreate(BaseModel):
     sender: str
     message: str
 
+class ChatbotReplyRequest(BaseModel):
+    message: str
+
 class ChatbotMessageResponse(BaseModel):
     id: int
     session_id: int
@@ -1,10 +1,13 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from app.models.timestamped import TimestampedModel
 from sqlalchemy.orm import relationship
 from app.models.base_class import Base
 
 class Delivery(Base, TimestampedModel):
     __tablename__ = "deliveries"
+    __table_args__ = (
+        Index("ix_deliveries_order_id", "order_id"),
+    )
     
     id = Column(Integer, primary_key=True)
     order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), nullable=False)
@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from app.models.timestamped import TimestampedModel
 from sqlalchemy.orm import relationship
 from app.models.base_class import Base
 
 class Feedback(Base, TimestampedModel):
     __tablename__ = "feedback"
+    __table_args__ = (
+        Index("ix_feedback_order_id_user_id", "order_id", "user_id"),
+        Index("ix_feedback_user_id_id", "user_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True)
     order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), nullable=False)
@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, Numeric, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Numeric, ForeignKey, Boolean, Index, text
 from app.models.timestamped import TimestampedModel
 from sqlalchemy.orm import relationship
 from app.models.base_class import Base
 
 class Order(Base, TimestampedModel):
     __tablename__ = "orders"
+    __table_args__ = (
+        Index("ix_orders_user_id_id_active", "user_id", "id", postgresql_where=text("active")),
+        Index("ix_orders_status_id_active", "status", "id", postgresql_where=text("active")),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -21,6 +25,9 @@ class Order(Base, TimestampedModel):
 
 class OrderItem(Base, TimestampedModel):
     __tablename__ = "order_items"
+    __table_args__ = (
+        Index("ix_order_items_order_id_id", "order_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True)
     order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), nullable=False)
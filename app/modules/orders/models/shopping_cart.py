@@ -1,10 +1,13 @@
-from sqlalchemy import Column, Integer, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, ForeignKey, Boolean, Index, text
 from app.models.timestamped import TimestampedModel
 from sqlalchemy.orm import relationship
 from app.models.base_class import Base
 
 class ShoppingCart(Base, TimestampedModel):
     __tablename__ = "shopping_carts"
+    __table_args__ = (
+        Index("ix_shopping_carts_user_id_active", "user_id", postgresql_where=text("active")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
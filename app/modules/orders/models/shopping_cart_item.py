@@ -1,10 +1,13 @@
-from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy import Column, Integer, ForeignKey, Index
 from app.models.timestamped import TimestampedModel
 from sqlalchemy.orm import relationship
 from app.models.base_class import Base
 
 class CartItem(Base, TimestampedModel):
     __tablename__ = "cart_items"
+    __table_args__ = (
+        Index("ix_cart_items_cart_id_product_id", "cart_id", "product_id"),
+    )
 
     id = Column(Integer, primary_key=True)
     cart_id = Column(Integer, ForeignKey("shopping_carts.id", ondelete="CASCADE"), nullable=False)
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, select
 from sqlalchemy.exc import SQLAlchemyError
 from typing import List, Optional
-from app.core.db import SessionLocal
+from app.core.db import get_db
+from app.core.lookups import get_active_order
 from app.modules.authentication.models.user import User
 from app.modules.orders.models import Delivery, Order
 from app.modules.orders.schemas.delivery_schema import DeliveryCreate, DeliveryResponse
@@ -12,22 +13,13 @@ from app.modules.authentication.dependencies import get_current_user, get_admin_
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/deliveries", response_model=DeliveryResponse, status_code=status.HTTP_201_CREATED)
-def create_delivery(
+async def create_delivery(
     delivery_data: DeliveryCreate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_admin_user)
 ):
-    order = db.query(Order).filter(
-        and_(Order.id == delivery_data.order_id, Order.active == True)
-    ).first()
+    order = await get_active_order(db, delivery_data.order_id)
     
     if not order:
         raise HTTPException(status_code=404, detail="Order not found or inactive.")
@@ -35,12 +27,12 @@ def create_delivery(
     if order.status not in ["paid", "shipped"]:
         raise HTTPException(status_code=400, detail="Order must be paid before creating delivery.")
     
-    existing_delivery = db.query(Delivery).filter(Delivery.order_id == delivery_data.order_id).first()
+    existing_delivery = await db.scalar(select(Delivery).where(Delivery.order_id == delivery_data.order_id))
     if existing_delivery:
         raise HTTPException(status_code=400, detail="Delivery already exists for this order.")
     
     try:
-        with db.begin_nested():
+        async with db.begin_nested():
             delivery = Delivery(
                 order_id=delivery_data.order_id,
                 delivery_address=delivery_data.delivery_address,
@@ -53,56 +45,59 @@ def create_delivery(
             if order.status == "paid":
                 order.status = "shipped"
             
-            db.flush()
-        db.commit()
+            await db.flush()
+        await db.commit()
         return delivery
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @router.get("/deliveries", response_model=PagedResponse[DeliveryResponse])
-def get_deliveries(
-    db: Session = Depends(get_db),
+async def get_deliveries(
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_admin_user),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     sort_by: Optional[str] = Query(None),
     sort_order: str = Query("asc"),
+    cursor: Optional[str] = Query(None),
+    include_total: bool = Query(True),
+    count_strategy: Optional[str] = Query(None),
     status: Optional[str] = Query(None)
 ):
-    query = db.query(Delivery)
+    query = select(Delivery)
     
     if status:
-        query = query.filter(Delivery.delivery_status == status)
+        query = query.where(Delivery.delivery_status == status)
     
-    pagination = PaginationParams(page, page_size, sort_by, sort_order)
-    return paginate(query, pagination, DeliveryResponse)
+    pagination = PaginationParams(page, page_size, sort_by, sort_order, cursor, include_total, count_strategy)
+    return await paginate(db, query, pagination, DeliveryResponse)
 
 @router.get("/deliveries/order/{order_id}", response_model=DeliveryResponse)
-def get_order_delivery(
+async def get_order_delivery(
     order: Order = Depends(verify_order_access()),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    delivery = db.query(Delivery).filter(Delivery.order_id == order.id).first()
+    delivery = await db.scalar(select(Delivery).where(Delivery.order_id == order.id))
     if not delivery:
         raise HTTPException(status_code=404, detail="Delivery not found for this order.")
     return delivery
 
 @router.patch("/deliveries/{delivery_id}", response_model=DeliveryResponse)
-def update_delivery(
+async def update_delivery(
     delivery_id: int, 
     status: Optional[str] = None, 
     tracking_info: Optional[str] = None, 
     estimated_arrival: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_admin_user)
 ):
-    delivery = db.query(Delivery).filter(Delivery.id == delivery_id).first()
+    delivery = await db.scalar(select(Delivery).where(Delivery.id == delivery_id))
     if not delivery:
         raise HTTPException(status_code=404, detail="Delivery not found.")
     
     try:
-        with db.begin_nested():
+        async with db.begin_nested():
             if status is not None:
                 valid_statuses = ["pending", "in_transit", "delivered", "cancelled"]
                 if status not in valid_statuses:
@@ -110,7 +105,7 @@ def update_delivery(
                 
                 delivery.delivery_status = status
                 
-                order = db.query(Order).filter(Order.id == delivery.order_id).first()
+                order = await db.scalar(select(Order).where(Order.id == delivery.order_id))
                 if order:
                     if status == "delivered":
                         order.status = "delivered"
@@ -123,9 +118,9 @@ def update_delivery(
             if estimated_arrival is not None:
                 delivery.estimated_arrival = estimated_arrival
             
-            db.flush()
-        db.commit()
+            await db.flush()
+        await db.commit()
         return delivery
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
\ No newline at end of file
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, select
 from sqlalchemy.exc import SQLAlchemyError
 from typing import List, Optional
-from app.core.db import SessionLocal
+from app.core.db import get_db
+from app.core.lookups import get_active_order
 from app.modules.authentication.models.user import User
 from app.modules.orders.models import Feedback, Order
 from app.modules.orders.schemas.feedback_schema import FeedbackCreate, FeedbackResponse
@@ -12,17 +13,10 @@ from app.modules.authentication.dependencies import get_current_user, get_admin_
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/feedback", response_model=FeedbackResponse, status_code=status.HTTP_201_CREATED)
-def create_feedback(
+async def create_feedback(
     feedback_data: FeedbackCreate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     if feedback_data.user_id != current_user.id and current_user.role != "admin":
@@ -31,9 +25,7 @@ def create_feedback(
             detail="Cannot create feedback for other users"
         )
     
-    order = db.query(Order).filter(
-        and_(Order.id == feedback_data.order_id, Order.active == True)
-    ).first()
+    order = await get_active_order(db, feedback_data.order_id)
     
     if not order:
         raise HTTPException(status_code=404, detail="Order not found or inactive.")
@@ -41,9 +33,9 @@ def create_feedback(
     if order.status != "delivered":
         raise HTTPException(status_code=400, detail="Feedback can only be left for delivered orders.")
     
-    existing_feedback = db.query(Feedback).filter(
+    existing_feedback = await db.scalar(select(Feedback).where(
         and_(Feedback.order_id == feedback_data.order_id, Feedback.user_id == feedback_data.user_id)
-    ).first()
+    ))
     
     if existing_feedback:
         raise HTTPException(status_code=400, detail="Feedback already exists for this order from this user.")
@@ -52,7 +44,7 @@ def create_feedback(
         raise HTTPException(status_code=400, detail="Rating must be between 1 and 5.")
     
     try:
-        with db.begin_nested():
+        async with db.begin_nested():
             feedback = Feedback(
                 order_id=feedback_data.order_id,
                 user_id=feedback_data.user_id,
@@ -60,69 +52,78 @@ def create_feedback(
                 comment=feedback_data.comment
             )
             db.add(feedback)
-            db.flush()
-        db.commit()
+            await db.flush()
+        await db.commit()
         return feedback
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @router.get("/feedback", response_model=PagedResponse[FeedbackResponse])
-def get_feedback(
-    db: Session = Depends(get_db),
+async def get_feedback(
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_admin_user),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     sort_by: Optional[str] = Query("id"),
     sort_order: str = Query("desc"),
+    cursor: Optional[str] = Query(None),
+    include_total: bool = Query(True),
+    count_strategy: Optional[str] = Query(None),
     rating: Optional[int] = Query(None)
 ):
-    query = db.query(Feedback)
+    query = select(Feedback)
     
     if rating:
         if rating < 1 or rating > 5:
             raise HTTPException(status_code=400, detail="Rating filter must be between 1 and 5.")
-        query = query.filter(Feedback.rating == rating)
+        query = query.where(Feedback.rating == rating)
     
-    pagination = PaginationParams(page, page_size, sort_by, sort_order)
-    return paginate(query, pagination, FeedbackResponse)
+    pagination = PaginationParams(page, page_size, sort_by, sort_order, cursor, include_total, count_strategy)
+    return await paginate(db, query, pagination, FeedbackResponse)
 
 @router.get("/feedback/order/{order_id}", response_model=PagedResponse[FeedbackResponse])
-def get_order_feedback(
+async def get_order_feedback(
     order: Order = Depends(verify_order_access()),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     sort_by: Optional[str] = Query("id"),
-    sort_order: str = Query("desc")
+    sort_order: str = Query("desc"),
+    cursor: Optional[str] = Query(None),
+    include_total: bool = Query(True),
+    count_strategy: Optional[str] = Query(None)
 ):
-    query = db.query(Feedback).filter(Feedback.order_id == order.id)
-    pagination = PaginationParams(page, page_size, sort_by, sort_order)
-    return paginate(query, pagination, FeedbackResponse)
+    query = select(Feedback).where(Feedback.order_id == order.id)
+    pagination = PaginationParams(page, page_size, sort_by, sort_order, cursor, include_total, count_strategy)
+    return await paginate(db, query, pagination, FeedbackResponse)
 
 @router.get("/feedback/user/{user_id}", response_model=PagedResponse[FeedbackResponse])
-def get_user_feedback(
+async def get_user_feedback(
     user_id: int, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(verify_user_access()),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     sort_by: Optional[str] = Query("id"),
-    sort_order: str = Query("desc")
+    sort_order: str = Query("desc"),
+    cursor: Optional[str] = Query(None),
+    include_total: bool = Query(True),
+    count_strategy: Optional[str] = Query(None)
 ):
-    query = db.query(Feedback).filter(Feedback.user_id == user_id)
-    pagination = PaginationParams(page, page_size, sort_by, sort_order)
-    return paginate(query, pagination, FeedbackResponse)
+    query = select(Feedback).where(Feedback.user_id == user_id)
+    pagination = PaginationParams(page, page_size, sort_by, sort_order, cursor, include_total, count_strategy)
+    return await paginate(db, query, pagination, FeedbackResponse)
 
 @router.patch("/feedback/{feedback_id}", response_model=FeedbackResponse)
-def update_feedback(
+async def update_feedback(
     feedback_id: int, 
     rating: Optional[int] = None, 
     comment: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    feedback = db.query(Feedback).filter(Feedback.id == feedback_id).first()
+    feedback = await db.scalar(select(Feedback).where(Feedback.id == feedback_id))
     if not feedback:
         raise HTTPException(status_code=404, detail="Feedback not found.")
     
@@ -133,7 +134,7 @@ def update_feedback(
         )
     
     try:
-        with db.begin_nested():
+        async with db.begin_nested():
             if rating is not None:
                 if rating < 1 or rating > 5:
                     raise HTTPException(status_code=400, detail="Rating must be between 1 and 5.")
@@ -142,20 +143,20 @@ def update_feedback(
             if comment is not None:
                 feedback.comment = comment
             
-            db.flush()
-        db.commit()
+            await db.flush()
+        await db.commit()
         return feedback
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @router.delete("/feedback/{feedback_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_feedback(
+async def delete_feedback(
     feedback_id: int, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    feedback = db.query(Feedback).filter(Feedback.id == feedback_id).first()
+    feedback = await db.scalar(select(Feedback).where(Feedback.id == feedback_id))
     if not feedback:
         raise HTTPException(status_code=404, detail="Feedback not found.")
     
@@ -166,10 +167,10 @@ def delete_feedback(
         )
     
     try:
-        with db.begin_nested():
-            db.delete(feedback)
-            db.flush()
-        db.commit()
+        async with db.begin_nested():
+            await db.delete(feedback)
+            await db.flush()
+        await db.commit()
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
\ No newline at end of file
@@ -1,28 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, select
 from sqlalchemy.exc import SQLAlchemyError
 from typing import List, Optional
-from app.core.db import SessionLocal
+from app.core.db import get_db
+from app.core.export import export_format, stream_export
 from app.modules.authentication.models.user import User
 from app.modules.orders.models import Order, OrderItem
 from app.modules.orders.schemas.order_schema import OrderCreate, OrderResponse, OrderItemResponse
-from app.core.pagination import PaginationParams, PagedResponse, paginate
+from app.core.pagination import COUNT_ESTIMATE, COUNT_WINDOW, PaginationParams, PagedResponse, paginate
 from app.modules.authentication.dependencies import get_current_user, get_admin_user, verify_user_access, verify_order_access
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
-def create_order(
+async def create_order(
     order_data: OrderCreate, 
-    db: Session = Depends(get_db), 
+    db: AsyncSession = Depends(get_db), 
     current_user: User = Depends(get_current_user)
 ):
     if order_data.user_id != current_user.id and current_user.role != "admin":
@@ -32,7 +26,7 @@ def create_order(
         )
         
     try:
-        with db.begin_nested():
+        async with db.begin_nested():
             order = Order(
                 user_id=order_data.user_id,
                 total_amount=order_data.total_amount,
@@ -42,72 +36,94 @@ def create_order(
                 active=True
             )
             db.add(order)
-            db.flush()
-        db.commit()
+            await db.flush()
+        await db.commit()
         return order
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
+def orders_query(status: Optional[str], user_id: Optional[int]):
+    query = select(Order).where(Order.active == True)
+    
+    if status:
+        query = query.where(Order.status == status)
+    
+    if user_id:
+        query = query.where(Order.user_id == user_id)
+    
+    return query
+
 @router.get("/", response_model=PagedResponse[OrderResponse])
-def get_orders(
-    db: Session = Depends(get_db),
+async def get_orders(
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_admin_user),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     sort_by: Optional[str] = Query(None),
     sort_order: str = Query("asc"),
+    cursor: Optional[str] = Query(None),
+    include_total: bool = Query(True),
+    count_strategy: Optional[str] = Query(None),
     status: Optional[str] = Query(None),
     user_id: Optional[int] = Query(None)
 ):
-    query = db.query(Order).filter(Order.active == True)
-    
-    if status:
-        query = query.filter(Order.status == status)
-    
-    if user_id:
-        query = query.filter(Order.user_id == user_id)
-    
-    pagination = PaginationParams(page, page_size, sort_by, sort_order)
-    return paginate(query, pagination, OrderResponse)
+    query = orders_query(status, user_id)
+    pagination = PaginationParams(page, page_size, sort_by, sort_order, cursor, include_total, count_strategy)
+    # The unfiltered admin listing spans the whole table; an estimate is enough there.
+    default_count = COUNT_WINDOW if status or user_id else COUNT_ESTIMATE
+    return await paginate(db, query, pagination, OrderResponse, count_strategy=default_count)
+
+@router.get("/export")
+async def export_orders(
+    request: Request,
+    current_user: User = Depends(get_admin_user),
+    format: str = Depends(export_format),
+    status: Optional[str] = Query(None),
+    user_id: Optional[int] = Query(None)
+):
+    return stream_export(request, orders_query(status, user_id), OrderResponse, format, "orders")
 
 @router.get("/{order_id}", response_model=OrderResponse)
-def get_order(
+async def get_order(
     order: Order = Depends(verify_order_access()),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     return order
 
 @router.get("/user/{user_id}", response_model=PagedResponse[OrderResponse])
-def get_user_orders(
+async def get_user_orders(
     user_id: int, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(verify_user_access()),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     sort_by: Optional[str] = Query("id"),
     sort_order: str = Query("desc"),
+    cursor: Optional[str] = Query(None),
+    include_total: bool = Query(True),
+    count_strategy: Optional[str] = Query(None),
     status: Optional[str] = Query(None)
 ):
-    query = db.query(Order).filter(
+    query = select(Order).where(
         and_(Order.user_id == user_id, Order.active == True)
     )
     
     if status:
-        query = query.filter(Order.status == status)
+        query = query.where(Order.status == status)
     
-    pagination = PaginationParams(page, page_size, sort_by, sort_order)
-    return paginate(query, pagination, OrderResponse)
+    pagination = PaginationParams(page, page_size, sort_by, sort_order, cursor, include_total, count_strategy)
+    return await paginate(db, query, pagination, OrderResponse)
 
 @router.patch("/{order_id}", response_model=OrderResponse)
-def update_order(
+async def update_order(
     order: Order = Depends(verify_order_access()),
     status: Optional[str] = None, 
     payment_method: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     try:
-        with db.begin_nested():
+        async with db.begin_nested():
             if status is not None:
                 valid_statuses = ["pending", "paid", "shipped", "delivered", "cancelled"]
                 if status not in valid_statuses:
@@ -120,37 +136,37 @@ def update_order(
                     raise HTTPException(status_code=400, detail=f"Invalid payment method. Must be one of: {', '.join(valid_methods)}")
                 order.payment_method = payment_method
             
-            db.flush()
-        db.commit()
+            await db.flush()
+        await db.commit()
         return order
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @router.delete("/{order_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_order(
+async def delete_order(
     order: Order = Depends(verify_order_access()),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     try:
-        with db.begin_nested():
+        async with db.begin_nested():
             order.active = False
-            db.flush()
-        db.commit()
+            await db.flush()
+        await db.commit()
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @router.post("/{order_id}/items", response_model=OrderItemResponse, status_code=status.HTTP_201_CREATED)
-def add_order_item(
+async def add_order_item(
     order: Order = Depends(verify_order_access()),
     product_id: int = None, 
     quantity: int = None, 
     unit_price: float = None, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     try:
-        with db.begin_nested():
+        async with db.begin_nested():
             order_item = OrderItem(
                 order_id=order.id,
                 product_id=product_id,
@@ -158,22 +174,25 @@ def add_order_item(
                 unit_price=unit_price
             )
             db.add(order_item)
-            db.flush()
-        db.commit()
+            await db.flush()
+        await db.commit()
         return order_item
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @router.get("/{order_id}/items", response_model=PagedResponse[OrderItemResponse])
-def get_order_items(
+async def get_order_items(
     order: Order = Depends(verify_order_access()),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     sort_by: Optional[str] = Query(None),
-    sort_order: str = Query("asc")
+    sort_order: str = Query("asc"),
+    cursor: Optional[str] = Query(None),
+    include_total: bool = Query(True),
+    count_strategy: Optional[str] = Query(None)
 ):
-    query = db.query(OrderItem).filter(OrderItem.order_id == order.id)
-    pagination = PaginationParams(page, page_size, sort_by, sort_order)
-    return paginate(query, pagination, OrderItemResponse)
\ No newline at end of file
+    query = select(OrderItem).where(OrderItem.order_id == order.id)
+    pagination = PaginationParams(page, page_size, sort_by, sort_order, cursor, include_total, count_strategy)
+    return await paginate(db, query, pagination, OrderItemResponse)
\ No newline at end of file
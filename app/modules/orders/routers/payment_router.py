@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, select
 from sqlalchemy.exc import SQLAlchemyError
 from typing import List, Optional
-from app.core.db import SessionLocal
+from app.core.db import get_db
+from app.core.export import export_format, stream_export
+from app.core.lookups import get_active_order
 from app.modules.authentication.models.user import User
 from app.modules.orders.models import Order, Payment
 from app.modules.orders.schemas.payment_schema import PaymentCreate, PaymentResponse
@@ -12,22 +14,13 @@ from app.modules.authentication.dependencies import get_current_user, get_admin_
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/payments", response_model=PaymentResponse, status_code=status.HTTP_201_CREATED)
-def create_payment(
+async def create_payment(
     payment_data: PaymentCreate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    order = db.query(Order).filter(
-        and_(Order.id == payment_data.order_id, Order.active == True)
-    ).first()
+    order = await get_active_order(db, payment_data.order_id)
     
     if not order:
         raise HTTPException(status_code=404, detail="Order not found or inactive.")
@@ -38,12 +31,12 @@ def create_payment(
             detail="Not authorized to create payment for this order"
         )
     
-    existing_payment = db.query(Payment).filter(Payment.order_id == payment_data.order_id).first()
+    existing_payment = await db.scalar(select(Payment).where(Payment.order_id == payment_data.order_id))
     if existing_payment:
         raise HTTPException(status_code=400, detail="Payment already exists for this order.")
     
     try:
-        with db.begin_nested():
+        async with db.begin_nested():
             payment = Payment(
                 order_id=payment_data.order_id,
                 amount=payment_data.amount,
@@ -53,54 +46,70 @@ def create_payment(
             db.add(payment)
             
             order.status = "paid"
-            db.flush()
-        db.commit()
+            await db.flush()
+        await db.commit()
         return payment
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
+def payments_query(status: Optional[str]):
+    query = select(Payment)
+    
+    if status:
+        query = query.where(Payment.status == status)
+    
+    return query
+
 @router.get("/payments", response_model=PagedResponse[PaymentResponse])
-def get_payments(
-    db: Session = Depends(get_db),
+async def get_payments(
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_admin_user),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     sort_by: Optional[str] = Query(None),
     sort_order: str = Query("asc"),
+    cursor: Optional[str] = Query(None),
+    include_total: bool = Query(True),
+    count_strategy: Optional[str] = Query(None),
     status: Optional[str] = Query(None)
 ):
-    query = db.query(Payment)
-    
-    if status:
-        query = query.filter(Payment.status == status)
-    
-    pagination = PaginationParams(page, page_size, sort_by, sort_order)
-    return paginate(query, pagination, PaymentResponse)
+    query = payments_query(status)
+    pagination = PaginationParams(page, page_size, sort_by, sort_order, cursor, include_total, count_strategy)
+    return await paginate(db, query, pagination, PaymentResponse)
+
+@router.get("/payments/export")
+async def export_payments(
+    request: Request,
+    current_user: User = Depends(get_admin_user),
+    format: str = Depends(export_format),
+    status: Optional[str] = Query(None)
+):
+    return stream_export(request, payments_query(status), PaymentResponse, format, "payments")
 
 @router.get("/payments/order/{order_id}", response_model=PaymentResponse)
-def get_order_payment(
+async def get_order_payment(
     order: Order = Depends(verify_order_access()),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    payment = db.query(Payment).filter(Payment.order_id == order.id).first()
+    payment = await db.scalar(select(Payment).where(Payment.order_id == order.id))
     if not payment:
         raise HTTPException(status_code=404, detail="Payment not found for this order.")
     return payment
 
 @router.patch("/payments/{payment_id}", response_model=PaymentResponse)
-def update_payment(
+async def update_payment(
     payment_id: int, 
     status: str, 
     transaction_id: Optional[str] = None, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    payment = db.query(Payment).filter(Payment.id == payment_id).first()
+    payment = await db.scalar(select(Payment).where(Payment.id == payment_id))
     if not payment:
         raise HTTPException(status_code=404, detail="Payment not found.")
     
-    order = db.query(Order).filter(Order.id == payment.order_id).first()
+    order = await db.scalar(select(Order).where(Order.id == payment.order_id))
     if not order:
         raise HTTPException(status_code=404, detail="Associated order not found.")
     
@@ -115,7 +124,7 @@ def update_payment(
         raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {', '.join(valid_statuses)}")
     
     try:
-        with db.begin_nested():
+        async with db.begin_nested():
             payment.status = status
             
             if transaction_id:
@@ -124,9 +133,9 @@ def update_payment(
             if status == "failed":
                 order.status = "pending"
             
-            db.flush()
-        db.commit()
+            await db.flush()
+        await db.commit()
         return payment
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
\ No newline at end of file
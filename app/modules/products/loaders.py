@@ -0,0 +1,41 @@
+from sqlalchemy.orm import joinedload, selectinload
+from app.core.fieldsets import sparse_load_options
+from app.modules.products.models import Inventory, Product, Warranty
+
+# AsyncSession cannot lazy-load, so every query whose rows end up in a response
+# model with nested relationships has to load them up front.
+#
+# All of ProductResponse's relationships are many-to-one. Pages use selectinload:
+# a constant four queries whatever the page size, and each brand/category row is
+# fetched once however many products share it. Single rows use joinedload, one
+# round trip, with inner joins where the foreign key is NOT NULL.
+
+def warranty_response_options():
+    return (selectinload(Warranty.brand),)
+
+def product_relationship_options():
+    """Loaders for each ProductResponse relationship, keyed by field name, for sparse fieldsets."""
+    return {
+        "brand": (selectinload(Product.brand),),
+        "category": (selectinload(Product.category),),
+        "warranty": (selectinload(Product.warranty).options(*warranty_response_options()),),
+    }
+
+def product_response_options():
+    return tuple(option for options in product_relationship_options().values() for option in options)
+
+def product_detail_options():
+    return (
+        joinedload(Product.brand, innerjoin=True),
+        joinedload(Product.category),
+        joinedload(Product.warranty).joinedload(Warranty.brand, innerjoin=True),
+    )
+
+def product_field_options(fields, extra_columns=()):
+    return sparse_load_options(Product, fields, product_relationship_options(), extra_columns)
+
+def inventory_response_options():
+    return (selectinload(Inventory.product).options(*product_response_options()),)
+
+def inventory_detail_options():
+    return (joinedload(Inventory.product, innerjoin=True).options(*product_detail_options()),)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Boolean, Index, text
 from sqlalchemy.orm import relationship
 from app.models.base_class import Base
 from app.models.timestamped import TimestampedModel
@@ -6,6 +6,11 @@ import uuid
 
 class Product(Base, TimestampedModel):
     __tablename__ = "products"
+    __table_args__ = (
+        Index("ix_products_brand_id_id_active", "brand_id", "id", postgresql_where=text("active")),
+        Index("ix_products_category_id_id_active", "category_id", "id", postgresql_where=text("active")),
+        Index("ix_products_name_id_active", "name", "id", postgresql_where=text("active")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     uuid = Column(String(36), default=lambda: str(uuid.uuid4()), unique=True, index=True)
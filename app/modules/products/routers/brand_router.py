@@ -1,67 +1,66 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, select
 from sqlalchemy.exc import SQLAlchemyError
 from typing import List, Optional
-from app.core.db import SessionLocal
+from app.core.db import get_db
 from app.modules.authentication.models.user import User
 from app.modules.products.models import Brand
 from app.modules.products.schemas.brand_schema import BrandCreate, BrandResponse
-from app.core.pagination import PaginationParams, PagedResponse, paginate
-from app.modules.authentication.dependencies import get_current_user, get_admin_user
+from app.core.pagination import PaginationParams, PagedResponse, paginate, sort_keys
+from app.modules.authentication.dependencies import get_admin_user, get_token_principal
+from app.modules.authentication.schemas.auth_schema import TokenPrincipal
 
 router = APIRouter(prefix="/products", tags=["products"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+BRAND_SORT_KEYS = sort_keys(Brand.id, Brand.name)
 
 @router.post("/brands", response_model=BrandResponse, status_code=status.HTTP_201_CREATED)
-def create_brand(
+async def create_brand(
     brand_data: BrandCreate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_admin_user)
 ):
-    existing = db.query(Brand).filter(Brand.name == brand_data.name).first()
+    existing = await db.scalar(select(Brand).where(Brand.name == brand_data.name))
     if existing:
         raise HTTPException(status_code=400, detail="Brand with this name already exists")
     
     try:
-        with db.begin_nested():
+        async with db.begin_nested():
             brand = Brand(**brand_data.model_dump(), active=True)
             db.add(brand)
-            db.flush()
-        db.commit()
+            await db.flush()
+        await db.commit()
         return brand
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @router.get("/brands", response_model=PagedResponse[BrandResponse])
-def get_brands(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+async def get_brands(
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenPrincipal = Depends(get_token_principal),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     sort_by: Optional[str] = Query(None),
-    sort_order: str = Query("asc")
+    sort_order: str = Query("asc"),
+    cursor: Optional[str] = Query(None),
+    include_total: bool = Query(True),
+    count_strategy: Optional[str] = Query(None)
 ):
-    query = db.query(Brand).filter(Brand.active == True)
-    pagination = PaginationParams(page, page_size, sort_by, sort_order)
-    return paginate(query, pagination, BrandResponse)
+    query = select(Brand).where(Brand.active == True)
+    pagination = PaginationParams(page, page_size, sort_by, sort_order, cursor, include_total, count_strategy)
+    return await paginate(db, query, pagination, BrandResponse, BRAND_SORT_KEYS)
 
 @router.get("/brands/{brand_id}", response_model=BrandResponse)
-def get_brand(
+async def get_brand(
     brand_id: int, 
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenPrincipal = Depends(get_token_principal)
 ):
-    brand = db.query(Brand).filter(
+    brand = await db.scalar(select(Brand).where(
         and_(Brand.id == brand_id, Brand.active == True)
-    ).first()
+    ))
     
     if not brand:
         raise HTTPException(status_code=404, detail="Brand not found")
@@ -69,54 +68,54 @@ def get_brand(
     return brand
 
 @router.patch("/brands/{brand_id}", response_model=BrandResponse)
-def update_brand(
+async def update_brand(
     brand_id: int, 
     brand_data: BrandCreate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_admin_user)
 ):
-    brand = db.query(Brand).filter(
+    brand = await db.scalar(select(Brand).where(
         and_(Brand.id == brand_id, Brand.active == True)
-    ).first()
+    ))
     
     if not brand:
         raise HTTPException(status_code=404, detail="Brand not found")
     
     if brand_data.name != brand.name:
-        existing = db.query(Brand).filter(Brand.name == brand_data.name).first()
+        existing = await db.scalar(select(Brand).where(Brand.name == brand_data.name))
         if existing:
             raise HTTPException(status_code=400, detail="Brand with this name already exists")
     
     try:
-        with db.begin_nested():
+        async with db.begin_nested():
             brand.name = brand_data.name
             if brand_data.warranty_policy is not None:
                 brand.warranty_policy = brand_data.warranty_policy
-            db.flush()
-        db.commit()
+            await db.flush()
+        await db.commit()
         return brand
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @router.delete("/brands/{brand_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_brand(
+async def delete_brand(
     brand_id: int, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_admin_user)
 ):
-    brand = db.query(Brand).filter(
+    brand = await db.scalar(select(Brand).where(
         and_(Brand.id == brand_id, Brand.active == True)
-    ).first()
+    ))
     
     if not brand:
         raise HTTPException(status_code=404, detail="Brand not found")
     
     try:
-        with db.begin_nested():
+        async with db.begin_nested():
             brand.active = False
-            db.flush()
-        db.commit()
+            await db.flush()
+        await db.commit()
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
\ No newline at end of file
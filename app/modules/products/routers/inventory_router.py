@@ -1,40 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, select
 from sqlalchemy.exc import SQLAlchemyError
 from typing import Optional
-from app.core.db import SessionLocal
+from app.core.db import get_db
+from app.core.export import export_format, stream_export
+from app.core.lookups import get_active_product
 from app.modules.products.models import Inventory, Product
+from app.modules.products.loaders import inventory_detail_options, inventory_response_options
 from app.modules.products.schemas.inventory_schema import InventoryCreate, InventoryResponse
-from app.modules.authentication.dependencies import get_current_user, get_admin_user
+from app.modules.authentication.dependencies import get_admin_user, get_token_principal
+from app.modules.authentication.schemas.auth_schema import TokenPrincipal
 from app.modules.authentication.models.user import User
 from app.core.pagination import PaginationParams, PagedResponse, paginate
 
 router = APIRouter(prefix="/products", tags=["products"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/inventory", response_model=InventoryResponse, status_code=status.HTTP_201_CREATED)
-def create_inventory(
+async def create_inventory(
     inv_data: InventoryCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_admin_user)
 ):
-    product = db.query(Product).filter(and_(Product.id == inv_data.product_id, Product.active == True)).first()
+    product = await get_active_product(db, inv_data.product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
 
-    existing = db.query(Inventory).filter(Inventory.product_id == inv_data.product_id).first()
+    existing = await db.scalar(select(Inventory).where(Inventory.product_id == inv_data.product_id))
     if existing:
         raise HTTPException(status_code=400, detail="Inventory already exists for this product")
 
     try:
-        with db.begin_nested():
+        async with db.begin_nested():
             inventory = Inventory(
                 product_id=inv_data.product_id,
                 stock=inv_data.stock,
@@ -42,51 +39,72 @@ def create_inventory(
                 price_bs=inv_data.price_usd * 13
             )
             db.add(inventory)
-            db.flush()
-        db.commit()
-        return inventory
+            await db.flush()
+        await db.commit()
+        return await db.scalar(
+            select(Inventory)
+            .options(*inventory_detail_options())
+            .where(Inventory.id == inventory.id)
+            .execution_options(populate_existing=True)
+        )
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @router.get("/inventory", response_model=PagedResponse[InventoryResponse])
-def get_inventories(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+async def get_inventories(
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenPrincipal = Depends(get_token_principal),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     sort_by: Optional[str] = Query(None),
-    sort_order: str = Query("asc")
+    sort_order: str = Query("asc"),
+    cursor: Optional[str] = Query(None),
+    include_total: bool = Query(True),
+    count_strategy: Optional[str] = Query(None)
+):
+    query = select(Inventory).options(*inventory_response_options())
+    pagination = PaginationParams(page, page_size, sort_by, sort_order, cursor, include_total, count_strategy)
+    return await paginate(db, query, pagination, InventoryResponse)
+
+@router.get("/inventory/export")
+async def export_inventories(
+    request: Request,
+    current_user: User = Depends(get_admin_user),
+    format: str = Depends(export_format)
 ):
-    query = db.query(Inventory)
-    pagination = PaginationParams(page, page_size, sort_by, sort_order)
-    return paginate(query, pagination, InventoryResponse)
+    query = select(Inventory).options(*inventory_response_options())
+    return stream_export(request, query, InventoryResponse, format, "inventory")
 
 @router.get("/inventory/{product_id:int}", response_model=InventoryResponse)
-def get_product_inventory(
+async def get_product_inventory(
     product_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenPrincipal = Depends(get_token_principal)
 ):
-    inventory = db.query(Inventory).filter(Inventory.product_id == product_id).first()
+    inventory = await db.scalar(
+        select(Inventory).options(*inventory_detail_options()).where(Inventory.product_id == product_id)
+    )
     if not inventory:
         raise HTTPException(status_code=404, detail="Inventory not found for this product")
     return inventory
 
 @router.patch("/inventory/{inventory_id:int}", response_model=InventoryResponse)
-def update_inventory(
+async def update_inventory(
     inventory_id: int,
     stock: Optional[int] = None,
     price_usd: Optional[float] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_admin_user)
 ):
-    inventory = db.query(Inventory).filter(Inventory.id == inventory_id).first()
+    inventory = await db.scalar(
+        select(Inventory).options(*inventory_detail_options()).where(Inventory.id == inventory_id)
+    )
     if not inventory:
         raise HTTPException(status_code=404, detail="Inventory not found")
 
     try:
-        with db.begin_nested():
+        async with db.begin_nested():
             if stock is not None:
                 if stock < 0:
                     raise HTTPException(status_code=400, detail="Stock cannot be negative")
@@ -98,28 +116,28 @@ def update_inventory(
                 inventory.price_usd = price_usd
                 inventory.price_bs = price_usd * 13
 
-            db.flush()
-        db.commit()
+            await db.flush()
+        await db.commit()
         return inventory
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @router.delete("/inventory/{inventory_id:int}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_inventory(
+async def delete_inventory(
     inventory_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_admin_user)
 ):
-    inventory = db.query(Inventory).filter(Inventory.id == inventory_id).first()
+    inventory = await db.scalar(select(Inventory).where(Inventory.id == inventory_id))
     if not inventory:
         raise HTTPException(status_code=404, detail="Inventory not found")
 
     try:
-        with db.begin_nested():
-            db.delete(inventory)
-            db.flush()
-        db.commit()
+        async with db.begin_nested():
+            await db.delete(inventory)
+            await db.flush()
+        await db.commit()
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
\ No newline at end of file
@@ -1,67 +1,66 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, select
 from sqlalchemy.exc import SQLAlchemyError
 from typing import List, Optional
-from app.core.db import SessionLocal
+from app.core.db import get_db
 from app.modules.products.models import ProductCategory
 from app.modules.products.schemas.product_category_schema import ProductCategoryCreate, ProductCategoryResponse
-from app.core.pagination import PaginationParams, PagedResponse, paginate
-from app.modules.authentication.dependencies import get_current_user, get_admin_user
+from app.core.pagination import PaginationParams, PagedResponse, paginate, sort_keys
+from app.modules.authentication.dependencies import get_admin_user, get_token_principal
+from app.modules.authentication.schemas.auth_schema import TokenPrincipal
 from app.modules.authentication.models.user import User
 
 router = APIRouter(prefix="/products", tags=["products"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+CATEGORY_SORT_KEYS = sort_keys(ProductCategory.id, ProductCategory.name)
 
 @router.post("/categories", response_model=ProductCategoryResponse, status_code=status.HTTP_201_CREATED)
-def create_category(
+async def create_category(
     name: str, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_admin_user)
 ):
-    existing = db.query(ProductCategory).filter(ProductCategory.name == name).first()
+    existing = await db.scalar(select(ProductCategory).where(ProductCategory.name == name))
     if existing:
         raise HTTPException(status_code=400, detail="Category with this name already exists")
     
     try:
-        with db.begin_nested():
+        async with db.begin_nested():
             category = ProductCategory(name=name, active=True)
             db.add(category)
-            db.flush()
-        db.commit()
+            await db.flush()
+        await db.commit()
         return category
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @router.get("/categories", response_model=PagedResponse[ProductCategoryResponse])
-def get_categories(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+async def get_categories(
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenPrincipal = Depends(get_token_principal),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     sort_by: Optional[str] = Query(None),
-    sort_order: str = Query("asc")
+    sort_order: str = Query("asc"),
+    cursor: Optional[str] = Query(None),
+    include_total: bool = Query(True),
+    count_strategy: Optional[str] = Query(None)
 ):
-    query = db.query(ProductCategory).filter(ProductCategory.active == True)
-    pagination = PaginationParams(page, page_size, sort_by, sort_order)
-    return paginate(query, pagination, ProductCategoryResponse)
+    query = select(ProductCategory).where(ProductCategory.active == True)
+    pagination = PaginationParams(page, page_size, sort_by, sort_order, cursor, include_total, count_strategy)
+    return await paginate(db, query, pagination, ProductCategoryResponse, CATEGORY_SORT_KEYS)
 
 @router.get("/categories/{category_id:int}", response_model=ProductCategoryResponse)
-def get_category(
+async def get_category(
     category_id: int, 
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenPrincipal = Depends(get_token_principal)
 ):
-    category = db.query(ProductCategory).filter(
+    category = await db.scalar(select(ProductCategory).where(
         and_(ProductCategory.id == category_id, ProductCategory.active == True)
-    ).first()
+    ))
     
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
@@ -69,52 +68,52 @@ def get_category(
     return category
 
 @router.patch("/categories/{category_id:int}", response_model=ProductCategoryResponse)
-def update_category(
+async def update_category(
     category_id: int, 
     name: str, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_admin_user)
 ):
-    category = db.query(ProductCategory).filter(
+    category = await db.scalar(select(ProductCategory).where(
         and_(ProductCategory.id == category_id, ProductCategory.active == True)
-    ).first()
+    ))
     
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
     
     if name != category.name:
-        existing = db.query(ProductCategory).filter(ProductCategory.name == name).first()
+        existing = await db.scalar(select(ProductCategory).where(ProductCategory.name == name))
         if existing:
             raise HTTPException(status_code=400, detail="Category with this name already exists")
     
     try:
-        with db.begin_nested():
+        async with db.begin_nested():
             category.name = name
-            db.flush()
-        db.commit()
+            await db.flush()
+        await db.commit()
         return category
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @router.delete("/categories/{category_id:int}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_category(
+async def delete_category(
     category_id: int, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_admin_user)
 ):
-    category = db.query(ProductCategory).filter(
+    category = await db.scalar(select(ProductCategory).where(
         and_(ProductCategory.id == category_id, ProductCategory.active == True)
-    ).first()
+    ))
     
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
     
     try:
-        with db.begin_nested():
+        async with db.begin_nested():
             category.active = False
-            db.flush()
-        db.commit()
+            await db.flush()
+        await db.commit()
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
\ No newline at end of file
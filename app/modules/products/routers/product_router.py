@@ -1,31 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Form, Body
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query, UploadFile, File, Form, Body
 from typing import Optional, List
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import json
 import logging
 
-from app.core.db import SessionLocal
+from app.core.db import get_db
+from app.core.export import export_format, stream_export
+from app.core.fieldsets import parse_fields, sparse_page_response, sparse_response
+from app.core.serialization import json_response
+from app.core.lookups import get_active_product, get_active_product_for_response
 from app.modules.products.models import Product, Brand, ProductCategory
+from app.modules.products.loaders import product_detail_options, product_field_options, product_response_options
 from app.modules.products.schemas.product_schema import *
-from app.core.pagination import PaginationParams, PagedResponse, paginate
-from app.modules.authentication.dependencies import get_current_user, get_admin_user
+from app.core.pagination import COUNT_WINDOW, PaginationParams, PagedResponse, paginate, sort_keys
+from app.modules.authentication.dependencies import get_admin_user, get_token_principal
+from app.modules.authentication.schemas.auth_schema import TokenPrincipal
 from app.modules.authentication.models.user import User
 from app.core.file_utils import upload_product_image, upload_product_model_3d, upload_ar_file
-from app.services.ml.openai_service import OpenAIService
-from app.services.ml.pinecone_service import PineconeService
+from app.services.ml.embedding_cache import embedding_cache
+from app.services.ml.clients import get_openai_service, get_pinecone_service
 from app.services.ml.recommendation_service import RecommendationService
 
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/products", tags=["products"])
 
+PRODUCT_SORT_KEYS = sort_keys(Product.id, Product.name)
+
+# Fields that feed the Pinecone vector or its metadata; other updates skip re-indexing.
+INDEXED_FIELDS = {"name", "description", "brand_id", "category_id", "technical_specifications"}
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 
 @router.post("/", response_model=ProductResponse, status_code=status.HTTP_201_CREATED)
 async def create_product(
@@ -33,22 +38,22 @@ async def create_product(
     image: Optional[UploadFile] = File(None),
     model_3d: Optional[UploadFile] = File(None),
     ar_file: Optional[UploadFile] = File(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_admin_user)
 ):
     try:
-        brand = db.query(Brand).filter(Brand.id == product_data.brand_id, Brand.active == True).first()
+        brand = await db.scalar(select(Brand).where(Brand.id == product_data.brand_id, Brand.active == True))
         if not brand:
             raise HTTPException(status_code=404, detail="Brand not found")
 
         category = None
         if product_data.category_id:
-            category = db.query(ProductCategory).filter(ProductCategory.id == product_data.category_id).first()
+            category = await db.scalar(select(ProductCategory).where(ProductCategory.id == product_data.category_id))
 
-        with db.begin_nested():
+        async with db.begin_nested():
             product = Product(**product_data.model_dump(), active=True)
             db.add(product)
-            db.flush()
+            await db.flush()
 
             if image:
                 product.image_url = await upload_product_image(image, product.id)
@@ -58,24 +63,31 @@ async def create_product(
                 product.ar_url = await upload_ar_file(ar_file, product.id)
 
             text_data = f"{product.name or ''} {product.description or ''}"
-            embedding_service = OpenAIService()
-            pinecone_service = PineconeService()
-            embedding_vector = embedding_service.get_embeddings(text_data)
             metadata = {
                 "brand": brand.name,
                 "category": category.name if category else "",
                 "text": text_data,
                 "technical_specifications": product.technical_specifications or ""
             }
-            pinecone_service.upsert_pinecone_data(vector=embedding_vector, id=product.uuid, metadata=metadata)
-
-            db.flush()
-
-        db.commit()
-        return product
-
+            embedding_vector = await embedding_cache.get_embeddings(get_openai_service(), text_data)
+            await get_pinecone_service().upsert_pinecone_data(vector=embedding_vector, id=product.uuid, metadata=metadata)
+
+            await db.flush()
+
+        await db.commit()
+        return await db.scalar(
+            select(Product)
+            .options(*product_detail_options())
+            .where(Product.id == product.id)
+            .execution_options(populate_existing=True)
+        )
+
+    except HTTPException:
+        # Includes CircuitOpenError, which must stay a 503 with Retry-After.
+        await db.rollback()
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -85,27 +97,26 @@ async def create_products_bulk_form(
     images: Optional[List[UploadFile]] = File(None),
     models_3d: Optional[List[UploadFile]] = File(None),
     ar_files: Optional[List[UploadFile]] = File(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_admin_user)
 ):
     created_products = []
-    embedding_service = OpenAIService()
-    pinecone_service = PineconeService()
+    index_entries = []
 
     try:
-        with db.begin_nested():
+        async with db.begin_nested():
             for product_data in products:
-                brand = db.query(Brand).filter(Brand.id == product_data.brand_id, Brand.active == True).first()
+                brand = await db.scalar(select(Brand).where(Brand.id == product_data.brand_id, Brand.active == True))
                 if not brand:
                     raise HTTPException(status_code=404, detail=f"Brand {product_data.brand_id} not found")
 
                 category = None
                 if product_data.category_id:
-                    category = db.query(ProductCategory).filter(ProductCategory.id == product_data.category_id).first()
+                    category = await db.scalar(select(ProductCategory).where(ProductCategory.id == product_data.category_id))
 
                 product = Product(**product_data.model_dump(), active=True)
                 db.add(product)
-                db.flush()
+                await db.flush()
 
                 i = product_data.index
                 if images and len(images) > i:
@@ -116,49 +127,65 @@ async def create_products_bulk_form(
                     product.ar_url = await upload_ar_file(ar_files[i], product.id)
 
                 text_data = f"{product.name or ''} {product.description or ''}"
-                vector = embedding_service.get_embeddings(text_data)
                 metadata = {
                     "brand": brand.name,
                     "category": category.name if category else "",
                     "text": text_data,
                     "technical_specifications": product.technical_specifications or ""
                 }
-                pinecone_service.upsert_pinecone_data(vector=vector, id=product.uuid, metadata=metadata)
+                index_entries.append((product.uuid, text_data, metadata))
                 created_products.append(product)
 
-        db.commit()
+            # One batched embeddings pass and batched upserts for the whole import.
+            vectors = await embedding_cache.get_embeddings_batch(get_openai_service(), [text for _, text, _ in index_entries])
+            await get_pinecone_service().upsert_pinecone_batch(
+                [(uuid, vector, metadata) for (uuid, _, metadata), vector in zip(index_entries, vectors)]
+            )
+
+        await db.commit()
+        result = await db.scalars(
+            select(Product)
+            .options(*product_response_options())
+            .where(Product.id.in_([p.id for p in created_products]))
+            .order_by(Product.id)
+            .execution_options(populate_existing=True)
+        )
+        created_products = result.all()
 
         return {
             "message": f"Successfully created {len(created_products)} products",
             "products": created_products
         }
 
+    except HTTPException:
+        await db.rollback()
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/recommendations/{product_id:int}", response_model=List[ProductResponse])
-def get_recommendations_by_product(
+async def get_recommendations_by_product(
     product_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenPrincipal = Depends(get_token_principal),
     top_k: int = Query(3, ge=1, le=20),
     brand_filter: Optional[str] = Query(None),
     keywords: Optional[List[str]] = Query(None)
 ):
-    product = db.query(Product).filter(Product.id == product_id, Product.active == True).first()
+    product = await get_active_product(db, product_id)
 
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
 
     service = RecommendationService(db)
-    return service.recommend_products(product, top_k, brand_filter, keywords)
+    return await service.recommend_products(product, top_k, brand_filter, keywords)
 
 @router.post("/recommendations/search", response_model=List[ProductResponse])
-def get_recommendations_by_text(
+async def get_recommendations_by_text(
     input_text: str = Body(..., embed=True),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenPrincipal = Depends(get_token_principal),
     top_k: int = Query(3, ge=1, le=20),
     brand_filter: Optional[str] = Query(None),
     keywords: Optional[List[str]] = Query(None)
@@ -167,49 +194,87 @@ def get_recommendations_by_text(
         raise HTTPException(status_code=400, detail="Input text is required")
 
     service = RecommendationService(db)
-    return service.recommend_products_by_text(input_text, top_k, brand_filter, keywords)
+    return await service.recommend_products_by_text(input_text, top_k, brand_filter, keywords)
 
 
-@router.get("/", response_model=PagedResponse[ProductResponse])
-def get_products(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    page: int = Query(1, ge=1),
-    page_size: int = Query(20, ge=1, le=100),
-    sort_by: Optional[str] = Query(None),
-    sort_order: str = Query("asc"),
-    brand_id: Optional[int] = Query(None),
-    category_id: Optional[int] = Query(None),
-    search: Optional[str] = Query(None)
-):
-    query = db.query(Product).filter(Product.active == True)
+def products_query(brand_id: Optional[int], category_id: Optional[int], search: Optional[str], options=None):
+    options = product_response_options() if options is None else options
+    query = select(Product).options(*options).where(Product.active == True)
 
     if brand_id:
-        query = query.filter(Product.brand_id == brand_id)
+        query = query.where(Product.brand_id == brand_id)
 
     if category_id:
-        query = query.filter(Product.category_id == category_id)
+        query = query.where(Product.category_id == category_id)
 
     if search:
         term = f"%{search}%"
-        query = query.filter(Product.name.ilike(term) | Product.description.ilike(term))
+        query = query.where(Product.name.ilike(term) | Product.description.ilike(term))
 
-    pagination = PaginationParams(page, page_size, sort_by, sort_order)
-    return paginate(query, pagination, ProductResponse)
+    return query
 
+@router.get("/", response_model=PagedResponse[ProductResponse])
+async def get_products(
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenPrincipal = Depends(get_token_principal),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    sort_by: Optional[str] = Query(None),
+    sort_order: str = Query("asc"),
+    cursor: Optional[str] = Query(None),
+    include_total: bool = Query(True),
+    count_strategy: Optional[str] = Query(None),
+    brand_id: Optional[int] = Query(None),
+    category_id: Optional[int] = Query(None),
+    search: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None, description="Comma separated ProductResponse fields, e.g. id,name,image_url")
+):
+    field_names = parse_fields(fields, ProductResponse)
+    options = product_field_options(field_names, [sort_by] if sort_by in PRODUCT_SORT_KEYS else []) if field_names else None
+    query = products_query(brand_id, category_id, search, options)
+    pagination = PaginationParams(page, page_size, sort_by, sort_order, cursor, include_total, count_strategy)
+    if field_names:
+        result = await paginate(
+            db, query, pagination, ProductResponse, PRODUCT_SORT_KEYS, count_strategy=COUNT_WINDOW, raw=True
+        )
+        return sparse_page_response(result, ProductResponse, field_names)
+    return await paginate(db, query, pagination, ProductResponse, PRODUCT_SORT_KEYS, count_strategy=COUNT_WINDOW)
+
+
+@router.get("/export")
+async def export_products(
+    request: Request,
+    current_user: User = Depends(get_admin_user),
+    format: str = Depends(export_format),
+    brand_id: Optional[int] = Query(None),
+    category_id: Optional[int] = Query(None),
+    search: Optional[str] = Query(None)
+):
+    return stream_export(request, products_query(brand_id, category_id, search), ProductResponse, format, "products")
 
 @router.get("/{product_id:int}", response_model=ProductResponse)
-def get_product(
+async def get_product(
     product_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenPrincipal = Depends(get_token_principal),
+    fields: Optional[str] = Query(None, description="Comma separated ProductResponse fields, e.g. id,name,image_url")
 ):
-    product = db.query(Product).filter(Product.id == product_id, Product.active == True).first()
+    field_names = parse_fields(fields, ProductResponse)
+    if field_names:
+        product = await db.scalar(
+            select(Product)
+            .options(*product_field_options(field_names))
+            .where(Product.id == product_id, Product.active == True)
+        )
+    else:
+        product = await get_active_product_for_response(db, product_id)
 
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
 
-    return product
+    if field_names:
+        return sparse_response(product, ProductResponse, field_names)
+    return json_response(product, ProductResponse)
 
 @router.patch("/{product_id:int}", response_model=ProductResponse)
 async def update_product(
@@ -218,16 +283,16 @@ async def update_product(
     image: Optional[UploadFile] = File(None),
     model_3d: Optional[UploadFile] = File(None),
     ar_file: Optional[UploadFile] = File(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_admin_user)
 ):
-    product = db.query(Product).filter(Product.id == product_id, Product.active == True).first()
+    product = await get_active_product(db, product_id)
 
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
 
     try:
-        with db.begin_nested():
+        async with db.begin_nested():
             update_data = {k: v for k, v in data.model_dump().items() if v is not None}
             for key, value in update_data.items():
                 setattr(product, key, value)
@@ -241,47 +306,54 @@ async def update_product(
             if ar_file:
                 product.ar_url = await upload_ar_file(ar_file, product.id)
 
-            brand = db.query(Brand).filter(Brand.id == product.brand_id).first()
-            category = db.query(ProductCategory).filter(ProductCategory.id == product.category_id).first() if product.category_id else None
-
-            text_data = f"{product.name or ''} {product.description or ''}"
-            embedding_service = OpenAIService()
-            pinecone_service = PineconeService()
-            embedding_vector = embedding_service.get_embeddings(text_data)
-            metadata = {
-                "brand": brand.name if brand else "",
-                "category": category.name if category else "",
-                "text": text_data,
-                "technical_specifications": product.technical_specifications or ""
-            }
-            pinecone_service.upsert_pinecone_data(vector=embedding_vector, id=product.uuid, metadata=metadata)
-
-            db.flush()
-
-        db.commit()
-        return product
+            if INDEXED_FIELDS & update_data.keys():
+                brand = await db.scalar(select(Brand).where(Brand.id == product.brand_id))
+                category = await db.scalar(select(ProductCategory).where(ProductCategory.id == product.category_id)) if product.category_id else None
 
+                text_data = f"{product.name or ''} {product.description or ''}"
+                metadata = {
+                    "brand": brand.name if brand else "",
+                    "category": category.name if category else "",
+                    "text": text_data,
+                    "technical_specifications": product.technical_specifications or ""
+                }
+                embedding_vector = await embedding_cache.get_embeddings(get_openai_service(), text_data)
+                await get_pinecone_service().upsert_pinecone_data(vector=embedding_vector, id=product.uuid, metadata=metadata)
+
+            await db.flush()
+
+        await db.commit()
+        return await db.scalar(
+            select(Product)
+            .options(*product_detail_options())
+            .where(Product.id == product.id)
+            .execution_options(populate_existing=True)
+        )
+
+    except HTTPException:
+        await db.rollback()
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/{product_id:int}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_product(
+async def delete_product(
     product_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_admin_user)
 ):
-    product = db.query(Product).filter(Product.id == product_id, Product.active == True).first()
+    product = await get_active_product(db, product_id)
 
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
 
     try:
-        with db.begin_nested():
+        async with db.begin_nested():
             product.active = False
-            db.flush()
-        db.commit()
+            await db.flush()
+        await db.commit()
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
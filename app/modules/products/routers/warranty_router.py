@@ -1,101 +1,100 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, select
 from sqlalchemy.exc import SQLAlchemyError
 from typing import Optional
-from app.core.db import SessionLocal
+from app.core.db import get_db
 from app.modules.products.models import Warranty
+from app.modules.products.loaders import warranty_response_options
 from app.modules.products.schemas.warranty_schema import WarrantyCreate, WarrantyResponse
 from app.core.pagination import PaginationParams, PagedResponse, paginate
-from app.modules.authentication.dependencies import get_current_user, get_admin_user
+from app.modules.authentication.dependencies import get_admin_user, get_token_principal
+from app.modules.authentication.schemas.auth_schema import TokenPrincipal
 from app.modules.authentication.models.user import User
 
 router = APIRouter(prefix="/products", tags=["products"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/warranties", response_model=WarrantyResponse, status_code=status.HTTP_201_CREATED)
-def create_warranty(
+async def create_warranty(
     warranty_data: WarrantyCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_admin_user)
 ):
 
     try:
-        with db.begin_nested():
+        async with db.begin_nested():
             warranty = Warranty(**warranty_data.model_dump())
             db.add(warranty)
-            db.flush()
-        db.commit()
+            await db.flush()
+        await db.commit()
+        await db.refresh(warranty, attribute_names=["brand"])
         return warranty
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @router.get("/warranties", response_model=PagedResponse[WarrantyResponse])
-def get_warranties(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+async def get_warranties(
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenPrincipal = Depends(get_token_principal),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     sort_by: Optional[str] = Query(None),
-    sort_order: str = Query("asc")
+    sort_order: str = Query("asc"),
+    cursor: Optional[str] = Query(None),
+    include_total: bool = Query(True),
+    count_strategy: Optional[str] = Query(None)
 ):
-    query = db.query(Warranty)
-    pagination = PaginationParams(page, page_size, sort_by, sort_order)
-    return paginate(query, pagination, WarrantyResponse)
+    query = select(Warranty).options(*warranty_response_options())
+    pagination = PaginationParams(page, page_size, sort_by, sort_order, cursor, include_total, count_strategy)
+    return await paginate(db, query, pagination, WarrantyResponse)
 
 @router.get("/warranties/{warranty_id:int}", response_model=WarrantyResponse)
-def get_warranty(
+async def get_warranty(
     warranty_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenPrincipal = Depends(get_token_principal)
 ):
-    warranty = db.query(Warranty).filter(Warranty.id == warranty_id).first()
+    warranty = await db.scalar(select(Warranty).options(*warranty_response_options()).where(Warranty.id == warranty_id))
     if not warranty:
         raise HTTPException(status_code=404, detail="Warranty not found")
     return warranty
 
 @router.patch("/warranties/{warranty_id:int}", response_model=WarrantyResponse)
-def update_warranty(
+async def update_warranty(
     warranty_id: int,
     warranty_data: WarrantyCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_admin_user)
 ):
-    warranty = db.query(Warranty).filter(Warranty.id == warranty_id).first()
+    warranty = await db.scalar(select(Warranty).options(*warranty_response_options()).where(Warranty.id == warranty_id))
     if not warranty:
         raise HTTPException(status_code=404, detail="Warranty not found")
     try:
-        with db.begin_nested():
+        async with db.begin_nested():
             for key, value in warranty_data.model_dump().items():
                 setattr(warranty, key, value)
-            db.flush()
-        db.commit()
+            await db.flush()
+        await db.commit()
         return warranty
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @router.delete("/warranties/{warranty_id:int}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_warranty(
+async def delete_warranty(
     warranty_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_admin_user)
 ):
-    warranty = db.query(Warranty).filter(Warranty.id == warranty_id).first()
+    warranty = await db.scalar(select(Warranty).where(Warranty.id == warranty_id))
     if not warranty:
         raise HTTPException(status_code=404, detail="Warranty not found")
     try:
-        with db.begin_nested():
-            db.delete(warranty)
-            db.flush()
-        db.commit()
+        async with db.begin_nested():
+            await db.delete(warranty)
+            await db.flush()
+        await db.commit()
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
\ No newline at end of file
@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, Text, Numeric, Date, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Numeric, Date, Boolean, ForeignKey, Index, text
 from app.models.timestamped import TimestampedModel
 from sqlalchemy.orm import relationship
 from app.models.base_class import Base
 
 class Promotion(Base, TimestampedModel):
     __tablename__ = "promotions"
+    __table_args__ = (
+        Index("ix_promotions_start_date_end_date_active", "start_date", "end_date", postgresql_where=text("active")),
+        Index("ix_promotions_start_date_id_active", "start_date", "id", postgresql_where=text("active")),
+    )
 
     id = Column(Integer, primary_key=True)
     title = Column(String(255), nullable=False)
@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy import Column, Integer, ForeignKey, Index
 from app.models.timestamped import TimestampedModel
 from sqlalchemy.orm import relationship
 from app.models.base_class import Base
 
 class PromotionProduct(Base, TimestampedModel):
     __tablename__ = "promotion_products"
+    __table_args__ = (
+        Index("ix_promotion_products_promotion_id_product_id", "promotion_id", "product_id"),
+        Index("ix_promotion_products_product_id_promotion_id", "product_id", "promotion_id"),
+    )
 
     id = Column(Integer, primary_key=True)
     promotion_id = Column(Integer, ForeignKey("promotions.id", ondelete="CASCADE"), nullable=False)
@@ -1,177 +1,161 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, select
 from sqlalchemy.exc import SQLAlchemyError
 from typing import List, Optional
-from app.core.db import SessionLocal
+from app.core.db import get_db
+from app.core.lookups import get_active_product
 from app.modules.authentication.models.user import User
 from app.modules.promotions.models import Promotion, PromotionProduct
 from app.modules.promotions.schemas.promotion_schema import PromotionResponse
 from app.modules.products.models.product import Product
+from app.modules.products.loaders import product_field_options, product_response_options
 from app.modules.products.schemas.product_schema import ProductResponse
-from app.core.pagination import PaginationParams, PagedResponse, paginate
-from app.modules.authentication.dependencies import get_current_user, get_admin_user
+from app.core.pagination import PaginationParams, PagedResponse, paginate, sort_keys
+from app.core.fieldsets import parse_fields, sparse_page_response
+from app.modules.authentication.dependencies import get_admin_user, get_token_principal
+from app.modules.authentication.schemas.auth_schema import TokenPrincipal
 
 router = APIRouter(prefix="/promotions", tags=["promotions"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+PRODUCT_SORT_KEYS = sort_keys(Product.id, Product.name)
+PROMOTION_SORT_KEYS = sort_keys(Promotion.id, Promotion.start_date)
 
 @router.post("/{promotion_id}/products/{product_id}", status_code=status.HTTP_201_CREATED)
-def add_product_to_promotion(
+async def add_product_to_promotion(
     promotion_id: int, 
     product_id: int, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_admin_user)
 ):
-    promotion = db.query(Promotion).filter(
+    promotion = await db.scalar(select(Promotion).where(
         and_(Promotion.id == promotion_id, Promotion.active == True)
-    ).first()
+    ))
     
     if not promotion:
         raise HTTPException(status_code=404, detail="Promotion not found or inactive.")
     
-    product = db.query(Product).filter(
-        and_(Product.id == product_id, Product.active == True)
-    ).first()
+    product = await get_active_product(db, product_id)
     
     if not product:
         raise HTTPException(status_code=404, detail="Product not found or inactive.")
     
-    existing = db.query(PromotionProduct).filter(
+    existing = await db.scalar(select(PromotionProduct).where(
         and_(
             PromotionProduct.promotion_id == promotion_id,
             PromotionProduct.product_id == product_id
         )
-    ).first()
+    ))
     
     if existing:
         raise HTTPException(status_code=400, detail="Product is already in this promotion.")
     
     try:
-        with db.begin_nested():
+        async with db.begin_nested():
             promo_product = PromotionProduct(
                 promotion_id=promotion_id,
                 product_id=product_id
             )
             db.add(promo_product)
-            db.flush()
-        db.commit()
+            await db.flush()
+        await db.commit()
         return {"promotion_id": promotion_id, "product_id": product_id}
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @router.get("/{promotion_id}/products", response_model=PagedResponse[ProductResponse])
-def get_promotion_products(
+async def get_promotion_products(
     promotion_id: int, 
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenPrincipal = Depends(get_token_principal),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     sort_by: Optional[str] = Query(None),
-    sort_order: str = Query("asc")
+    sort_order: str = Query("asc"),
+    cursor: Optional[str] = Query(None),
+    include_total: bool = Query(True),
+    count_strategy: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None, description="Comma separated ProductResponse fields, e.g. id,name,image_url")
 ):
-    promotion = db.query(Promotion).filter(
+    field_names = parse_fields(fields, ProductResponse)
+    promotion = await db.scalar(select(Promotion).where(
         and_(Promotion.id == promotion_id, Promotion.active == True)
-    ).first()
+    ))
     
     if not promotion:
         raise HTTPException(status_code=404, detail="Promotion not found or inactive.")
     
-    promo_products = db.query(PromotionProduct).filter(
-        PromotionProduct.promotion_id == promotion_id
-    ).all()
-    
-    product_ids = [pp.product_id for pp in promo_products]
-    
-    if not product_ids:
-        return PagedResponse(
-            items=[],
-            total=0,
-            page=page,
-            page_size=page_size,
-            pages=0,
-            has_next=False,
-            has_prev=False
-        )
-    
-    query = db.query(Product).filter(
-        and_(Product.id.in_(product_ids), Product.active == True)
+    if field_names:
+        options = product_field_options(field_names, [sort_by] if sort_by in PRODUCT_SORT_KEYS else [])
+    else:
+        options = product_response_options()
+    query = (
+        select(Product)
+        .join(PromotionProduct, PromotionProduct.product_id == Product.id)
+        .options(*options)
+        .where(and_(PromotionProduct.promotion_id == promotion_id, Product.active == True))
     )
     
-    pagination = PaginationParams(page, page_size, sort_by, sort_order)
-    return paginate(query, pagination, ProductResponse)
+    pagination = PaginationParams(page, page_size, sort_by, sort_order, cursor, include_total, count_strategy)
+    if field_names:
+        result = await paginate(db, query, pagination, ProductResponse, PRODUCT_SORT_KEYS, raw=True)
+        return sparse_page_response(result, ProductResponse, field_names)
+    return await paginate(db, query, pagination, ProductResponse, PRODUCT_SORT_KEYS)
 
 @router.delete("/{promotion_id}/products/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
-def remove_product_from_promotion(
+async def remove_product_from_promotion(
     promotion_id: int, 
     product_id: int, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_admin_user)
 ):
-    promo_product = db.query(PromotionProduct).filter(
+    promo_product = await db.scalar(select(PromotionProduct).where(
         and_(
             PromotionProduct.promotion_id == promotion_id,
             PromotionProduct.product_id == product_id
         )
-    ).first()
+    ))
     
     if not promo_product:
         raise HTTPException(status_code=404, detail="Product not found in this promotion.")
     
     try:
-        with db.begin_nested():
-            db.delete(promo_product)
-            db.flush()
-        db.commit()
+        async with db.begin_nested():
+            await db.delete(promo_product)
+            await db.flush()
+        await db.commit()
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @router.get("/products/{product_id}", response_model=PagedResponse[PromotionResponse])
-def get_product_promotions(
+async def get_product_promotions(
     product_id: int, 
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenPrincipal = Depends(get_token_principal),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     sort_by: Optional[str] = Query("start_date"),
     sort_order: str = Query("desc"),
+    cursor: Optional[str] = Query(None),
+    include_total: bool = Query(True),
+    count_strategy: Optional[str] = Query(None),
     active_only: bool = Query(True)
 ):
-    product = db.query(Product).filter(
-        and_(Product.id == product_id, Product.active == True)
-    ).first()
+    product = await get_active_product(db, product_id)
     
     if not product:
         raise HTTPException(status_code=404, detail="Product not found or inactive.")
     
-    promo_products = db.query(PromotionProduct).filter(
-        PromotionProduct.product_id == product_id
-    ).all()
-    
-    promotion_ids = [pp.promotion_id for pp in promo_products]
-    
-    if not promotion_ids:
-        return PagedResponse(
-            items=[],
-            total=0,
-            page=page,
-            page_size=page_size,
-            pages=0,
-            has_next=False,
-            has_prev=False
-        )
-    
-    query = db.query(Promotion).filter(Promotion.id.in_(promotion_ids))
+    query = (
+        select(Promotion)
+        .join(PromotionProduct, PromotionProduct.promotion_id == Promotion.id)
+        .where(PromotionProduct.product_id == product_id)
+    )
     
     if active_only:
-        query = query.filter(Promotion.active == True)
+        query = query.where(Promotion.active == True)
     
-    pagination = PaginationParams(page, page_size, sort_by, sort_order)
-    return paginate(query, pagination, PromotionResponse)
\ No newline at end of file
+    pagination = PaginationParams(page, page_size, sort_by, sort_order, cursor, include_total, count_strategy)
+    return await paginate(db, query, pagination, PromotionResponse, PROMOTION_SORT_KEYS)
\ No newline at end of file
@@ -0,0 +1,430 @@
+import asyncio
+import json
+import logging
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import joinedload, load_only
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal
+from app.core.pool_metrics import LatencyHistogram
+from app.modules.chatbot.models import ChatbotMessage, ChatbotSession
+from app.modules.products.models import Product
+from app.services.ml.clients import get_openai_service, get_pinecone_service
+from app.services.ml.embedding_cache import embedding_cache
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = (
+    "You are the shopping assistant of an online store. Answer questions about "
+    "products, orders and recommendations briefly and accurately. If you do not "
+    "know something, say so instead of guessing."
+)
+PRODUCTS_HEADER = "Products from our catalog that may be relevant, most relevant first:"
+SUMMARY_HEADER = "Summary of the earlier conversation:"
+SUMMARY_PROMPT = (
+    "Summarise this conversation between a customer and the store's shopping "
+    "assistant for the assistant's own later reference. Keep product names, order "
+    "details, the customer's preferences and anything still unresolved. Be concise."
+)
+# Unsummarised messages read per compaction; a longer backlog is worked off over several replies.
+SUMMARY_BATCH_MESSAGES = 200
+
+# Chat formatting adds a few tokens per message on top of its content, and
+# the reply is primed with a few more.
+MESSAGE_OVERHEAD_TOKENS = 4
+REPLY_PRIMING_TOKENS = 3
+
+PIPELINE_STAGES = ("history", "embed", "retrieve", "hydrate", "pack", "context", "first_token")
+pipeline_latency: Dict[str, LatencyHistogram] = {stage: LatencyHistogram() for stage in PIPELINE_STAGES}
+
+def get_pipeline_stats() -> List[dict]:
+    return [{"stage": stage, "latency": histogram.snapshot()} for stage, histogram in pipeline_latency.items()]
+
+def sse_event(data: dict, event: Optional[str] = None) -> str:
+    """One Server-Sent Events frame; data is sent as a single line of JSON."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+def _delta(chunk) -> str:
+    # Azure sends a first chunk with no choices (content filter results).
+    if not chunk.choices:
+        return ""
+    return chunk.choices[0].delta.content or ""
+
+class ChatContext:
+    def __init__(self, messages: List[dict], product_ids: List[int], prompt_tokens: int, timings: Dict[str, float]):
+        self.messages = messages
+        self.product_ids = product_ids
+        self.prompt_tokens = prompt_tokens
+        self.timings = timings
+
+    def server_timing(self) -> str:
+        """The stage timings as a Server-Timing header value."""
+        return ", ".join(f"{stage};dur={elapsed:.1f}" for stage, elapsed in self.timings.items())
+
+class ChatService:
+    """
+    Builds reply prompts under CHATBOT_PROMPT_TOKENS. Session history is
+    loaded while the question is embedded, matched in Pinecone and the
+    matches hydrated from Postgres; each runs on its own session since an
+    AsyncSession cannot serve two queries at once.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker = AsyncSessionLocal):
+        self.session_factory = session_factory
+        self.openai_service = get_openai_service()
+        self.pinecone_service = get_pinecone_service()
+        self.encoding = self.openai_service.encoding
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.encoding.encode(text))
+
+    async def _timed(self, stage: str, timings: Dict[str, float], awaitable):
+        started = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            timings[stage] = (time.perf_counter() - started) * 1000
+
+    async def load_history(self, session_id: int, after_id: Optional[int] = None) -> List[ChatbotMessage]:
+        """
+        The last CHATBOT_HISTORY_MESSAGES messages of a session after
+        `after_id` (the end of the stored summary), oldest first.
+        """
+        async with self.session_factory() as db:
+            messages = (await db.scalars(
+                select(ChatbotMessage)
+                .where(ChatbotMessage.session_id == session_id, ChatbotMessage.id > (after_id or 0))
+                .order_by(ChatbotMessage.id.desc())
+                .limit(settings.CHATBOT_HISTORY_MESSAGES)
+            )).all()
+        return list(reversed(messages))
+
+    async def _hydrate(self, uuids: List[str]) -> List[Product]:
+        async with self.session_factory() as db:
+            return (await db.scalars(
+                select(Product)
+                .options(
+                    load_only(Product.id, Product.uuid, Product.name, Product.description, Product.technical_specifications),
+                    joinedload(Product.brand, innerjoin=True),
+                    joinedload(Product.category),
+                    joinedload(Product.inventory),
+                )
+                .where(Product.active == True, Product.uuid.in_(uuids))
+            )).unique().all()
+
+    async def retrieve_products(self, text: str, timings: Dict[str, float]) -> List[Product]:
+        """
+        Active catalog products matching the question, most relevant first.
+        Retrieval failures only cost the answer its product context.
+        """
+        try:
+            vector = await self._timed("embed", timings, embedding_cache.get_embeddings(self.openai_service, text))
+            response = await self._timed("retrieve", timings, self.pinecone_service.query_pinecone_data(
+                vector=vector,
+                top_k=settings.CHATBOT_RETRIEVAL_TOP_K,
+                include_values=False
+            ))
+            uuids = [match["id"] for match in response.get("matches", [])]
+            if not uuids:
+                return []
+            products = await self._timed("hydrate", timings, self._hydrate(uuids))
+        except Exception as e:
+            logger.warning(f"[Chatbot] Product retrieval failed, answering without it: {str(e)}")
+            return []
+        rank = {uuid: i for i, uuid in enumerate(uuids)}
+        return sorted(products, key=lambda p: rank[p.uuid])
+
+    def product_entry(self, product: Product) -> str:
+        details = [f"brand: {product.brand.name}"]
+        if product.category:
+            details.append(f"category: {product.category.name}")
+        if product.inventory:
+            details.append(f"price: ${product.inventory.price_usd}")
+            details.append("in stock" if product.inventory.stock > 0 else "out of stock")
+        entry = f"- {product.name} ({', '.join(details)})"
+
+        description = " ".join(part for part in (product.description, product.technical_specifications) if part)
+        if not description:
+            return entry
+        tokens = self.encoding.encode(description)
+        if len(tokens) > settings.CHATBOT_PRODUCT_TOKENS:
+            description = self.encoding.decode(tokens[:settings.CHATBOT_PRODUCT_TOKENS]) + "..."
+        return f"{entry}: {description}"
+
+    def pack(
+        self,
+        history: List[ChatbotMessage],
+        products: List[Product],
+        text: str,
+        summary: Optional[str] = None
+    ) -> Tuple[List[dict], List[int], int]:
+        """
+        Fills the prompt budget greedily. The instructions, the summary of
+        older turns and the question always go in. Then the newest history,
+        up to CHATBOT_HISTORY_TOKENS, then products in relevance order,
+        skipping any that do not fit, then older history with whatever is
+        left. History is only ever cut from the old end, so the conversation
+        stays contiguous.
+        """
+        budget = settings.CHATBOT_PROMPT_TOKENS
+        used = self.base_tokens(text, summary)
+
+        history_costs = [self.count_tokens(message.message) + MESSAGE_OVERHEAD_TOKENS for message in reversed(history)]
+        kept = 0
+
+        def take_history(limit: int) -> None:
+            nonlocal kept, used
+            while kept < len(history_costs) and used + history_costs[kept] <= limit:
+                used += history_costs[kept]
+                kept += 1
+
+        take_history(min(budget, used + settings.CHATBOT_HISTORY_TOKENS))
+
+        entries = []
+        product_ids = []
+        header_cost = self.count_tokens(PRODUCTS_HEADER) + MESSAGE_OVERHEAD_TOKENS
+        for product in products:
+            entry = self.product_entry(product)
+            cost = self.count_tokens(entry) + 1 + (0 if entries else header_cost)
+            if used + cost > budget:
+                continue
+            used += cost
+            entries.append(entry)
+            product_ids.append(product.id)
+
+        take_history(budget)
+
+        messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+        if summary:
+            messages.append({"role": "system", "content": f"{SUMMARY_HEADER}\n{summary}"})
+        if entries:
+            messages.append({"role": "system", "content": "\n".join([PRODUCTS_HEADER] + entries)})
+        for message in history[len(history) - kept:]:
+            role = "assistant" if message.sender == "bot" else "user"
+            messages.append({"role": role, "content": message.message})
+        messages.append({"role": "user", "content": text})
+        return messages, product_ids, used
+
+    def base_tokens(self, text: str, summary: Optional[str] = None) -> int:
+        """Tokens every prompt for `text` needs: the instructions, the summary, the question and reply priming."""
+        tokens = (
+            self.count_tokens(SYSTEM_PROMPT) + self.count_tokens(text)
+            + 2 * MESSAGE_OVERHEAD_TOKENS + REPLY_PRIMING_TOKENS
+        )
+        if summary:
+            tokens += self.count_tokens(f"{SUMMARY_HEADER}\n{summary}") + MESSAGE_OVERHEAD_TOKENS
+        return tokens
+
+    async def build_context(
+        self,
+        session_id: int,
+        text: str,
+        summary: Optional[str] = None,
+        summary_message_id: Optional[int] = None
+    ) -> ChatContext:
+        summary = valid_summary(summary, summary_message_id)
+        if self.base_tokens(text, summary) > settings.CHATBOT_PROMPT_TOKENS:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Message is too long")
+
+        started = time.perf_counter()
+        timings: Dict[str, float] = {}
+        history, products = await asyncio.gather(
+            self._timed("history", timings, self.load_history(session_id, summary_message_id)),
+            self.retrieve_products(text, timings),
+        )
+        packed = time.perf_counter()
+        messages, product_ids, prompt_tokens = self.pack(history, products, text, summary)
+        timings["pack"] = (time.perf_counter() - packed) * 1000
+        timings["context"] = (time.perf_counter() - started) * 1000
+
+        for stage, elapsed in timings.items():
+            pipeline_latency[stage].observe(elapsed)
+        logger.info(
+            f"[Chatbot] Session {session_id}: {prompt_tokens} prompt tokens, {len(product_ids)} products, "
+            + ", ".join(f"{stage} {elapsed:.1f}ms" for stage, elapsed in timings.items())
+        )
+        return ChatContext(messages, product_ids, prompt_tokens, timings)
+
+    async def start_reply(self, context: ChatContext):
+        """
+        Sends the prompt and returns the open completion stream. Awaited before
+        the response starts, so a failed or short-circuited call still turns
+        into a proper error status instead of a broken event stream.
+        """
+        return await self.openai_service.stream_api(context.messages)
+
+async def stream_reply(stream, session_id: int, text: str, started: float) -> AsyncIterator[str]:
+    """
+    Relays the completion as SSE `data` frames of {"delta": ...}, then stores
+    the user message and the full reply together and ends with a `done` event
+    carrying both ids; an empty completion ends with an `error` event and
+    stores nothing. When the client disconnects the response task is
+    cancelled; closing the stream in `finally` stops generation upstream, and
+    nothing is stored for a reply the client never received.
+    """
+    parts = []
+    try:
+        async for chunk in stream:
+            delta = _delta(chunk)
+            if delta:
+                if not parts:
+                    pipeline_latency["first_token"].observe((time.perf_counter() - started) * 1000)
+                parts.append(delta)
+                yield sse_event({"delta": delta})
+    except Exception as e:
+        logger.error(f"[Chatbot] Reply stream failed for session {session_id}: {str(e)}")
+        yield sse_event({"detail": "The reply was interrupted, please try again"}, "error")
+        return
+    finally:
+        await stream.close()
+
+    reply = "".join(parts)
+    if not reply.strip():
+        # Empty or content-filtered completion: an empty bot turn would only
+        # be fed back into later prompts and summaries, so keep neither message.
+        logger.warning(f"[Chatbot] Empty reply for session {session_id}")
+        yield sse_event({"detail": "The assistant returned no answer, please try again"}, "error")
+        return
+
+    # The response outlives the request-scoped session, so the write uses its own.
+    async with AsyncSessionLocal() as db:
+        try:
+            async with db.begin_nested():
+                user_message = ChatbotMessage(session_id=session_id, sender="user", message=text)
+                bot_message = ChatbotMessage(session_id=session_id, sender="bot", message=reply)
+                db.add_all([user_message, bot_message])
+                await db.flush()
+                ids = {"user_message_id": user_message.id, "message_id": bot_message.id}
+            await db.commit()
+        except SQLAlchemyError as e:
+            await db.rollback()
+            logger.error(f"[Chatbot] Failed to store reply for session {session_id}: {str(e)}")
+            yield sse_event({"detail": "The reply could not be saved"}, "error")
+            return
+
+    schedule_summary(session_id)
+    yield sse_event(ids, "done")
+
+def valid_summary(summary: Optional[str], summary_message_id: Optional[int]) -> Optional[str]:
+    """
+    The stored summary, or None once summary_message_id has been cleared by
+    deleting the message it pointed at: the summary no longer says where it
+    ends, and sending it next to the full history would repeat that history.
+    The next compaction writes a fresh one over it.
+    """
+    return summary if summary_message_id is not None else None
+
+_summarising = set()
+# Strong references to running summary tasks; the event loop only keeps weak ones.
+_summary_tasks = set()
+
+def schedule_summary(session_id: int) -> None:
+    """
+    Starts summarise_session as a task of its own rather than a response
+    background task, so the reply's admission slot and connection are freed
+    as soon as the last frame is sent instead of after compaction.
+    """
+    if settings.CHATBOT_SUMMARY_THRESHOLD_TOKENS <= 0 or session_id in _summarising:
+        return
+    task = asyncio.create_task(summarise_session(session_id))
+    _summary_tasks.add(task)
+    task.add_done_callback(_summary_tasks.discard)
+
+async def summarise_session(session_id: int) -> None:
+    """
+    Compacts a session once its unsummarised messages pass
+    CHATBOT_SUMMARY_THRESHOLD_TOKENS: the older ones are folded into the
+    stored summary with OPENAI_BASE_MODEL, and the newest
+    CHATBOT_SUMMARY_KEEP_TOKENS stay verbatim. Scheduled by
+    schedule_summary once a reply has been stored. Failures are logged and
+    simply retried after the next reply.
+    """
+    if settings.CHATBOT_SUMMARY_THRESHOLD_TOKENS <= 0 or session_id in _summarising:
+        return
+    _summarising.add(session_id)
+    try:
+        await _compact(session_id)
+    except Exception as e:
+        logger.error(f"[Chatbot] Summarising session {session_id} failed: {str(e)}")
+    finally:
+        _summarising.discard(session_id)
+
+async def _compact(session_id: int) -> None:
+    openai_service = get_openai_service()
+    encoding = openai_service.encoding
+
+    async with AsyncSessionLocal() as db:
+        row = (await db.execute(
+            select(ChatbotSession.summary, ChatbotSession.summary_message_id).where(ChatbotSession.id == session_id)
+        )).first()
+        if row is None:
+            return
+        summary, summary_message_id = row
+        summary = valid_summary(summary, summary_message_id)
+        messages = (await db.scalars(
+            select(ChatbotMessage)
+            .where(ChatbotMessage.session_id == session_id, ChatbotMessage.id > (summary_message_id or 0))
+            .order_by(ChatbotMessage.id)
+            .limit(SUMMARY_BATCH_MESSAGES)
+        )).all()
+
+    costs = [len(encoding.encode(message.message)) + MESSAGE_OVERHEAD_TOKENS for message in messages]
+    backlog = len(messages) == SUMMARY_BATCH_MESSAGES
+    if not backlog and sum(costs) <= settings.CHATBOT_SUMMARY_THRESHOLD_TOKENS:
+        return
+
+    # Leave the newest turns verbatim, unless this batch does not reach them yet.
+    keep = 0
+    if not backlog:
+        kept_tokens = 0
+        while keep < len(messages) and kept_tokens + costs[-1 - keep] <= settings.CHATBOT_SUMMARY_KEEP_TOKENS:
+            kept_tokens += costs[-1 - keep]
+            keep += 1
+
+    # Summarise at most a prompt's worth of the older turns per run.
+    older = []
+    total = 0
+    for message, cost in zip(messages[:len(messages) - keep], costs):
+        if older and total + cost > settings.CHATBOT_PROMPT_TOKENS:
+            break
+        older.append(message)
+        total += cost
+    if not older:
+        return
+
+    transcript = "\n".join(
+        f"{'Assistant' if message.sender == 'bot' else 'Customer'}: {message.message}" for message in older
+    )
+    previous = f"Summary so far:\n{summary}\n\n" if summary else ""
+    new_summary = await openai_service.complete(
+        [
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {"role": "user", "content": f"{previous}Conversation:\n{transcript}"},
+        ],
+        model=settings.OPENAI_BASE_MODEL,
+        max_tokens=settings.CHATBOT_SUMMARY_TOKENS
+    )
+
+    async with AsyncSessionLocal() as db:
+        try:
+            async with db.begin_nested():
+                # Another worker may have compacted the session meanwhile; theirs stands.
+                await db.execute(
+                    update(ChatbotSession)
+                    .where(
+                        ChatbotSession.id == session_id,
+                        ChatbotSession.summary_message_id.is_not_distinct_from(summary_message_id)
+                    )
+                    .values(summary=new_summary, summary_message_id=older[-1].id)
+                )
+            await db.commit()
+        except SQLAlchemyError as e:
+            await db.rollback()
+            logger.error(f"[Chatbot] Failed to store summary for session {session_id}: {str(e)}")
+            return
+    logger.info(f"[Chatbot] Session {session_id}: summarised {len(older)} messages ({total} tokens)")
@@ -0,0 +1,55 @@
+import asyncio
+import logging
+from typing import Optional
+from app.core.config import settings
+from app.core.storage import get_s3_client
+from app.services.ml.openai_service import AsyncOpenAIService
+from app.services.ml.pinecone_service import AsyncPineconeService
+
+logger = logging.getLogger(__name__)
+
+# One of each per worker, created at startup and closed at shutdown. Building
+# them loads the tiktoken encoding and botocore's service model, and every new
+# client starts with an empty connection pool, so a client per request paid
+# for construction plus fresh TLS handshakes on each call.
+_openai_service: Optional[AsyncOpenAIService] = None
+_pinecone_service: Optional[AsyncPineconeService] = None
+
+def get_openai_service() -> AsyncOpenAIService:
+    global _openai_service
+    if _openai_service is None:
+        _openai_service = AsyncOpenAIService()
+    return _openai_service
+
+def get_pinecone_service() -> AsyncPineconeService:
+    global _pinecone_service
+    if _pinecone_service is None:
+        _pinecone_service = AsyncPineconeService()
+    return _pinecone_service
+
+async def _warm_up(name: str, warm_up) -> None:
+    try:
+        await warm_up()
+    except Exception as e:
+        # Best effort, never fails startup: the first request just pays for
+        # the connection instead.
+        logger.warning(f"{name} warm-up failed: {str(e)}")
+
+async def start_ml_clients():
+    openai_service = get_openai_service()
+    pinecone_service = get_pinecone_service()
+    await asyncio.to_thread(get_s3_client)
+    if settings.ML_CLIENT_WARMUP:
+        await asyncio.gather(
+            _warm_up("OpenAI", openai_service.warm_up),
+            _warm_up("Pinecone", pinecone_service.warm_up),
+        )
+
+async def stop_ml_clients():
+    global _openai_service, _pinecone_service
+    if _openai_service is not None:
+        await _openai_service.close()
+        _openai_service = None
+    if _pinecone_service is not None:
+        await _pinecone_service.close()
+        _pinecone_service = None
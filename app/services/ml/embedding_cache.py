@@ -0,0 +1,213 @@
+import asyncio
+import hashlib
+import logging
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Union
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal
+from app.models.embedding_cache import EmbeddingCacheEntry
+
+logger = logging.getLogger(__name__)
+
+# Rows per statement for the batch reads/writes of the persistent tier.
+PERSISTENT_BATCH_SIZE = 500
+
+def normalize_text(text: Union[str, List[str]]) -> str:
+    if isinstance(text, list):
+        text = " ".join(text)
+    return " ".join(text.split())
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    """
+    Embeddings keyed by (model, sha256 of the normalised text), in front of
+    OpenAIService.get_embeddings. An in-process LRU of float32 arrays sits over
+    the embedding_cache table, which every worker shares and which survives
+    restarts. Concurrent misses for the same text share one API call. Only
+    used from the event loop.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.persistent_errors = 0
+        self._entries: "OrderedDict[Tuple[str, str], array]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+
+    def _get_memory(self, key: Tuple[str, str]) -> Optional[array]:
+        vector = self._entries.get(key)
+        if vector is not None:
+            self._entries.move_to_end(key)
+        return vector
+
+    def _put_memory(self, key: Tuple[str, str], vector: List[float]) -> None:
+        if self.size <= 0:
+            return
+        self._entries[key] = array("f", vector)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    async def _load(self, key: Tuple[str, str]) -> Optional[List[float]]:
+        model, digest = key
+        try:
+            async with AsyncSessionLocal() as db:
+                return await db.scalar(
+                    select(EmbeddingCacheEntry.embedding).where(
+                        EmbeddingCacheEntry.model == model,
+                        EmbeddingCacheEntry.content_hash == digest
+                    )
+                )
+        except SQLAlchemyError as e:
+            self.persistent_errors += 1
+            logger.warning(f"Embedding cache read failed: {str(e)}")
+            return None
+
+    async def _store(self, key: Tuple[str, str], vector: List[float]) -> None:
+        model, digest = key
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    insert(EmbeddingCacheEntry)
+                    .values(model=model, content_hash=digest, embedding=vector)
+                    .on_conflict_do_nothing()
+                )
+                await db.commit()
+        except SQLAlchemyError as e:
+            self.persistent_errors += 1
+            logger.warning(f"Embedding cache write failed: {str(e)}")
+
+    async def get_embeddings(self, service, text: Union[str, List[str]]) -> List[float]:
+        text = normalize_text(text)
+        key = (service.embedding_model, content_hash(text))
+
+        vector = self._get_memory(key)
+        if vector is not None:
+            self.memory_hits += 1
+            return vector.tolist()
+
+        while key in self._inflight:
+            inflight = self._inflight[key]
+            try:
+                return list(await asyncio.shield(inflight))
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # The request fetching it went away; fetch it ourselves.
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            vector = await self._load(key) if settings.EMBEDDING_CACHE_PERSISTENT else None
+            if vector is not None:
+                self.persistent_hits += 1
+            else:
+                self.misses += 1
+                vector = await service.get_embeddings(text)
+                if settings.EMBEDDING_CACHE_PERSISTENT:
+                    await self._store(key, vector)
+            self._put_memory(key, vector)
+            future.set_result(vector)
+            return vector
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody else may be waiting; don't let the loop warn about it.
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def _load_many(self, model: str, digests: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        try:
+            async with AsyncSessionLocal() as db:
+                for start in range(0, len(digests), PERSISTENT_BATCH_SIZE):
+                    rows = await db.execute(
+                        select(EmbeddingCacheEntry.content_hash, EmbeddingCacheEntry.embedding).where(
+                            EmbeddingCacheEntry.model == model,
+                            EmbeddingCacheEntry.content_hash.in_(digests[start:start + PERSISTENT_BATCH_SIZE])
+                        )
+                    )
+                    found.update(rows.tuples().all())
+        except SQLAlchemyError as e:
+            self.persistent_errors += 1
+            logger.warning(f"Embedding cache read failed: {str(e)}")
+        return found
+
+    async def _store_many(self, model: str, vectors: Dict[str, List[float]]) -> None:
+        rows = [{"model": model, "content_hash": digest, "embedding": vector} for digest, vector in vectors.items()]
+        try:
+            async with AsyncSessionLocal() as db:
+                for start in range(0, len(rows), PERSISTENT_BATCH_SIZE):
+                    await db.execute(
+                        insert(EmbeddingCacheEntry)
+                        .values(rows[start:start + PERSISTENT_BATCH_SIZE])
+                        .on_conflict_do_nothing()
+                    )
+                await db.commit()
+        except SQLAlchemyError as e:
+            self.persistent_errors += 1
+            logger.warning(f"Embedding cache write failed: {str(e)}")
+
+    async def get_embeddings_batch(self, service, texts: List[Union[str, List[str]]]) -> List[List[float]]:
+        """
+        Embeddings for many texts, in order: memory first, then one persistent
+        lookup for the rest, then a single get_embeddings_batch call for
+        whatever is still missing.
+        """
+        model = service.embedding_model
+        texts = [normalize_text(text) for text in texts]
+        digests = [content_hash(text) for text in texts]
+        vectors: Dict[str, List[float]] = {}
+
+        for digest in digests:
+            cached = self._get_memory((model, digest))
+            if cached is not None:
+                self.memory_hits += 1
+                vectors[digest] = cached.tolist()
+
+        loaded: Dict[str, List[float]] = {}
+        missing = list(dict.fromkeys(digest for digest in digests if digest not in vectors))
+        if missing and settings.EMBEDDING_CACHE_PERSISTENT:
+            loaded = await self._load_many(model, missing)
+            self.persistent_hits += len(loaded)
+            missing = [digest for digest in missing if digest not in loaded]
+
+        if missing:
+            self.misses += len(missing)
+            text_by_digest = dict(zip(digests, texts))
+            embedded = await service.get_embeddings_batch([text_by_digest[digest] for digest in missing])
+            fresh = dict(zip(missing, embedded))
+            if settings.EMBEDDING_CACHE_PERSISTENT:
+                await self._store_many(model, fresh)
+            loaded.update(fresh)
+
+        for digest, vector in loaded.items():
+            self._put_memory((model, digest), vector)
+        vectors.update(loaded)
+        return [vectors[digest] for digest in digests]
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.persistent_hits + self.misses
+        return {
+            "size": self.size,
+            "entries": len(self._entries),
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "persistent_errors": self.persistent_errors,
+            "hit_rate": round((self.memory_hits + self.persistent_hits) / lookups, 4) if lookups else None,
+        }
+
+embedding_cache = EmbeddingCache(settings.EMBEDDING_CACHE_SIZE)
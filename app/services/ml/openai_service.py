@@ -1,58 +1,81 @@
-import logging, json, tiktoken
+import asyncio, functools, logging, json, tiktoken
+import httpx
+import numpy as np
 from datetime import datetime
-from openai import AzureOpenAI
+from openai import AsyncAzureOpenAI, AzureOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient
 from dotenv import load_dotenv
 from app.core.config import settings
+from app.core.resilience import CircuitOpenError, acall_with_retries, call_with_retries, openai_breaker
 import re
 
 load_dotenv()
 
 def handle_openai_errors(func):
 
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        for i in range(3):
-            try:
-                response = func(*args, **kwargs)
-                return response
-            except Exception as e:  
-                logging.info(f"[OpenAI] Error on request {i+1}: {e}")
-                if i < 2:
-                    import time
-                    time.sleep(1)
-                else:
-                    raise Exception(f"[OpenAI] Final error after {i} attempts: {e}")
+        return call_with_retries(openai_breaker, func, *args, **kwargs)
 
     return wrapper
 
+def handle_openai_errors_async(func):
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await acall_with_retries(openai_breaker, func, *args, **kwargs)
+
+    return wrapper
+
+def http_client_options():
+    """Connection pool for one long-lived client: keep-alive, bounded size, short connect timeout."""
+    return {
+        "limits": httpx.Limits(
+            max_connections=settings.OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.OPENAI_KEEPALIVE_SECONDS
+        ),
+        "timeout": httpx.Timeout(settings.OPENAI_TIMEOUT_SECONDS, connect=settings.OPENAI_CONNECT_TIMEOUT_SECONDS),
+    }
+
 class OpenAIService():
+    client_class = AzureOpenAI
+    http_client_class = DefaultHttpxClient
+
     def __init__(self):
-        self.client = AzureOpenAI(
+        self.client = self.client_class(
             api_key=settings.OPENAI_AZURE_API_KEY,
             api_version=settings.OPENAI_AZURE_API_VERSION,
-            azure_endpoint=settings.OPENAI_AZURE_API_BASE
+            azure_endpoint=settings.OPENAI_AZURE_API_BASE,
+            http_client=self.http_client_class(**http_client_options()),
+            # Retries and backoff come from app.core.resilience, not the SDK.
+            max_retries=0
         )
+        self.embedding_model = "text-embedding-ada-002"
         self.token_limit = 8192
         self.safe_token_limit = 7500
         self.overlap_tokens = 500
+        self.batch_max_inputs = settings.OPENAI_EMBEDDING_BATCH_SIZE
+        self.batch_token_limit = settings.OPENAI_EMBEDDING_BATCH_TOKENS
         self.encoding = tiktoken.encoding_for_model("gpt-4o")  
 
-    def chunk_text_by_tokens(self, text, max_tokens=None, overlap_tokens=None):
+    def chunk_tokens(self, tokens, max_tokens=None, overlap_tokens=None):
         max_tokens = max_tokens or self.safe_token_limit
         overlap_tokens = overlap_tokens if overlap_tokens is not None else self.overlap_tokens
-        tokens = self.encoding.encode(text)
         chunks = []
         start = 0
         while start < len(tokens):
             end = min(start + max_tokens, len(tokens))
-            chunk_tokens = tokens[start:end]
-            chunk_text = self.encoding.decode(chunk_tokens)
-            chunks.append(chunk_text)
+            chunks.append(tokens[start:end])
             if overlap_tokens > 0 and end < len(tokens):
                 start = end - overlap_tokens
             else:
                 start = end
         return chunks
 
+    def chunk_text_by_tokens(self, text, max_tokens=None, overlap_tokens=None):
+        tokens = self.encoding.encode(text)
+        return [self.encoding.decode(chunk) for chunk in self.chunk_tokens(tokens, max_tokens, overlap_tokens)]
+
     def call_api(self, messages, model=settings.OPENAI_BASE_MODEL):
         try:
             if model == settings.OPENAI_THINKING_MODEL:
@@ -60,7 +83,7 @@ class OpenAIService():
                     if msg.get("role") == "system":
                         msg["role"] = "user"
 
-            response = self.client.chat.completions.create(model=model, messages=messages)
+            response = call_with_retries(openai_breaker, self.client.chat.completions.create, model=model, messages=messages)
             if response.choices:
                 return response.choices[0].message.content
             return "No response"
@@ -75,7 +98,9 @@ class OpenAIService():
                     if msg.get("role") == "system":
                         msg["role"] = "user"
 
-            response = self.client.chat.completions.create(
+            response = call_with_retries(
+                openai_breaker,
+                self.client.chat.completions.create,
                 model=model,
                 messages=messages,
                 stream=True
@@ -83,11 +108,67 @@ class OpenAIService():
 
             return response
 
+        except CircuitOpenError:
+            raise
         except Exception as e:
             logging.error(f"[OpenAI] An error occurred in Azure API: {e}")
             raise Exception(f"[OpenAI] An error occurred in Azure API: {e}")
 
     @handle_openai_errors
+    def _embed_inputs(self, inputs):
+        response = self.client.embeddings.create(model=self.embedding_model, input=inputs)
+        # The API may return the data out of order; index ties each vector to its input.
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    def _embedding_batches(self, pieces):
+        batch, batch_tokens = [], 0
+        for piece in pieces:
+            token_count = piece[1]
+            if batch and (len(batch) >= self.batch_max_inputs or batch_tokens + token_count > self.batch_token_limit):
+                yield batch
+                batch, batch_tokens = [], 0
+            batch.append(piece)
+            batch_tokens += token_count
+        if batch:
+            yield batch
+
+    def get_embeddings_batch(self, texts):
+        """
+        Get the embeddings for a list of texts in as few API calls as possible.
+        Texts over the safe limit are split into chunks, every chunk of every text is packed into
+        requests of at most batch_max_inputs inputs / batch_token_limit tokens, and each text's
+        chunk embeddings are averaged weighted by their token counts.
+        """
+        if not texts:
+            return []
+
+        pieces = self._embedding_pieces(texts)
+        vectors = []
+        for batch in self._embedding_batches(pieces):
+            vectors.extend(self._embed_inputs([piece[2] for piece in batch]))
+        return self._average_pieces(pieces, vectors, len(texts))
+
+    def _embedding_pieces(self, texts):
+        pieces = []  # (text index, token count, input text)
+        for i, text in enumerate(texts):
+            tokens = self.encoding.encode(text)
+            if len(tokens) <= self.safe_token_limit:
+                pieces.append((i, len(tokens), text))
+            else:
+                for chunk_tokens in self.chunk_tokens(tokens):
+                    pieces.append((i, len(chunk_tokens), self.encoding.decode(chunk_tokens)))
+        return pieces
+
+    def _average_pieces(self, pieces, vectors, text_count):
+        owners = np.fromiter((piece[0] for piece in pieces), dtype=np.intp, count=len(pieces))
+        # max(..., 1) keeps an empty text from zeroing its own weight.
+        weights = np.fromiter((max(piece[1], 1) for piece in pieces), dtype=np.float64, count=len(pieces))
+        matrix = np.asarray(vectors, dtype=np.float64)
+        sums = np.zeros((text_count, matrix.shape[1]), dtype=np.float64)
+        np.add.at(sums, owners, matrix * weights[:, None])
+        totals = np.bincount(owners, weights=weights, minlength=text_count)
+        return (sums / totals[:, None]).tolist()
+
     def get_embeddings(self, paragraphs):
         """
         Get the embeddings for a list of paragraphs. 
@@ -96,25 +177,102 @@ class OpenAIService():
         if isinstance(paragraphs, list):
             paragraphs = " ".join(paragraphs)
 
-        tokens = self.encoding.encode(paragraphs)
-        if len(tokens) <= self.safe_token_limit:
-            # Simple case: Get the embedding for the whole text
-            embedding_response = self.client.embeddings.create(model="text-embedding-ada-002", input=paragraphs)
-            embedding_vector = embedding_response.data[0].embedding
-            return embedding_vector
-        else:
-            # Extented case: Split the text into chunks and average the embeddings
-            chunks = self.chunk_text_by_tokens(paragraphs)
-            combined_embedding = None
-            count = 0
-            for chunk in chunks:
-                embedding_response = self.client.embeddings.create(model="text-embedding-ada-002", input=chunk)
-                embedding_vector = embedding_response.data[0].embedding
-                if combined_embedding is None:
-                    combined_embedding = embedding_vector
-                else:
-                    combined_embedding = [x + y for x, y in zip(combined_embedding, embedding_vector)]
-                count += 1
-            if combined_embedding and count > 1:
-                combined_embedding = [x / count for x in combined_embedding]
-            return combined_embedding
\ No newline at end of file
+        return self.get_embeddings_batch([paragraphs])[0]
+
+class AsyncOpenAIService(OpenAIService):
+    """
+    OpenAIService on AsyncAzureOpenAI for async handlers: same chunking,
+    packing and averaging, but API calls await instead of blocking the event
+    loop, and retries back off with asyncio.sleep. Handlers use the shared
+    instance from app.services.ml.clients rather than creating their own.
+    """
+    client_class = AsyncAzureOpenAI
+    http_client_class = DefaultAsyncHttpxClient
+
+    async def close(self):
+        await self.client.close()
+
+    async def warm_up(self):
+        """
+        Opens a pooled connection (DNS, TCP and TLS) so the first real request
+        does not pay for it. Lists models rather than embedding anything, so it
+        is not billed, and skips the breaker so a startup blip cannot open it.
+        """
+        await self.client.models.list()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def call_api(self, messages, model=settings.OPENAI_BASE_MODEL):
+        try:
+            if model == settings.OPENAI_THINKING_MODEL:
+                for msg in messages:
+                    if msg.get("role") == "system":
+                        msg["role"] = "user"
+
+            response = await acall_with_retries(openai_breaker, self.client.chat.completions.create, model=model, messages=messages)
+            if response.choices:
+                return response.choices[0].message.content
+            return "No response"
+        except Exception as e:
+            logging.error(f"[OpenAI] An error occurred while calling the API: {e}")
+            return f"[OpenAI] An error occurred while calling the API: {e}"
+
+    async def complete(self, messages, model=settings.OPENAI_BASE_MODEL, max_tokens=None):
+        """Like call_api, but raises on failure instead of returning the error as text."""
+        options = {"max_tokens": max_tokens} if max_tokens else {}
+        response = await acall_with_retries(
+            openai_breaker,
+            self.client.chat.completions.create,
+            model=model,
+            messages=messages,
+            **options
+        )
+        if not response.choices or not response.choices[0].message.content:
+            raise Exception("[OpenAI] Empty completion")
+        return response.choices[0].message.content
+
+    async def stream_api(self, messages, model=settings.OPENAI_BASE_MODEL):
+        try:
+            if model == settings.OPENAI_THINKING_MODEL:
+                for msg in messages:
+                    if msg.get("role") == "system":
+                        msg["role"] = "user"
+
+            return await acall_with_retries(
+                openai_breaker,
+                self.client.chat.completions.create,
+                model=model,
+                messages=messages,
+                stream=True
+            )
+
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            logging.error(f"[OpenAI] An error occurred in Azure API: {e}")
+            raise Exception(f"[OpenAI] An error occurred in Azure API: {e}")
+
+    @handle_openai_errors_async
+    async def _embed_inputs(self, inputs):
+        response = await self.client.embeddings.create(model=self.embedding_model, input=inputs)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    async def get_embeddings_batch(self, texts):
+        if not texts:
+            return []
+
+        pieces = self._embedding_pieces(texts)
+        vectors = []
+        for batch in self._embedding_batches(pieces):
+            vectors.extend(await self._embed_inputs([piece[2] for piece in batch]))
+        return self._average_pieces(pieces, vectors, len(texts))
+
+    async def get_embeddings(self, paragraphs):
+        if isinstance(paragraphs, list):
+            paragraphs = " ".join(paragraphs)
+
+        return (await self.get_embeddings_batch([paragraphs]))[0]
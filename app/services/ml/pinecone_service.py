@@ -1,81 +1,115 @@
+import asyncio
 import pinecone
+from typing import Dict
 from app.core.config import settings
+from app.core.resilience import CircuitOpenError, acall_with_retries, pinecone_breaker
+
+# Index name -> data plane host, so each AsyncPineconeService skips describe_index after the first.
+_index_hosts: Dict[str, str] = {}
+
+def _filter_by_keywords(response, keyword_filter):
+    filtered_matches = []
+    for match in response['matches']:
+        metadata = match.get('metadata', {})
+        if any(keyword in metadata.get('text', '') for keyword in keyword_filter):
+            filtered_matches.append(match)
+    response['matches'] = filtered_matches
+
+class AsyncPineconeService:
+    """
+    Pinecone index access on the asyncio client. Handlers use the shared
+    instance from app.services.ml.clients rather than creating their own.
+    """
 
-class PineconeService:
     def __init__(self, index_name=settings.PINECONE_INDEX_NAME):
-        self.pinecone_api_key = settings.PINECONE_API_KEY
         self.pinecone_index_name = index_name
-        self.pc = pinecone.Pinecone(api_key=self.pinecone_api_key)
-        self.index = self.pc.Index(self.pinecone_index_name)
+        # The pool size is client config; IndexAsyncio ignores its own kwargs.
+        self.pc = pinecone.PineconeAsyncio(
+            api_key=settings.PINECONE_API_KEY, connection_pool_maxsize=settings.PINECONE_POOL_SIZE
+        )
+        self.index = None
+        self._index_lock = asyncio.Lock()
 
-    def upsert_pinecone_data(self, vector, id, namespace='', metadata=None):
-        try:
-            temp_dict = {
-                'id': str(id),
-                'values': vector
-            }
+    async def get_index(self):
+        if self.index is None:
+            async with self._index_lock:
+                if self.index is None:
+                    host = settings.PINECONE_INDEX_HOST or _index_hosts.get(self.pinecone_index_name)
+                    if host is None:
+                        description = await acall_with_retries(pinecone_breaker, self.pc.describe_index, self.pinecone_index_name)
+                        host = _index_hosts[self.pinecone_index_name] = description.host
+                    self.index = self.pc.IndexAsyncio(host=host)
+        return self.index
+
+    async def warm_up(self):
+        """Resolves the index host and opens a pooled data plane connection. One attempt, outside the breaker."""
+        index = await self.get_index()
+        await index.describe_index_stats()
 
-            if metadata:
-                temp_dict['metadata'] = metadata
+    async def close(self):
+        if self.index is not None:
+            await self.index.close()
+        await self.pc.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def upsert_pinecone_data(self, vector, id, namespace='', metadata=None):
+        await self.upsert_pinecone_batch([(id, vector, metadata)], namespace=namespace)
+
+    async def upsert_pinecone_batch(self, items, namespace='', batch_size=100):
+        try:
+            index = await self.get_index()
+            vectors = []
+            for id, vector, metadata in items:
+                temp_dict = {
+                    'id': str(id),
+                    'values': vector
+                }
+                if metadata:
+                    temp_dict['metadata'] = metadata
+                vectors.append(temp_dict)
 
-            self.index.upsert(vectors=[temp_dict], namespace=namespace)
+            for start in range(0, len(vectors), batch_size):
+                await acall_with_retries(pinecone_breaker, index.upsert, vectors=vectors[start:start + batch_size], namespace=namespace)
+        except CircuitOpenError:
+            raise
         except Exception as e:
             raise Exception(f"An error occurred during Pinecone upsert: {e}")
 
-    def query_pinecone_data(self, vector, namespace="", top_k=3, metadata_filter=None, keyword_filter=None):
+    async def query_pinecone_data(self, vector, namespace="", top_k=3, metadata_filter=None, keyword_filter=None, include_values=True):
         try:
+            index = await self.get_index()
             query_params = {
                 "namespace": namespace,
                 "top_k": top_k,
-                "include_values": True,
+                "include_values": include_values,
                 "include_metadata": True,
                 "vector": vector
             }
-            
+
             if metadata_filter:
                 query_params["filter"] = metadata_filter
-            
-            response = self.index.query(**query_params)
-            
+
+            response = await acall_with_retries(pinecone_breaker, index.query, **query_params)
+
             if keyword_filter:
-                filtered_matches = []
-                for match in response['matches']:
-                    metadata = match.get('metadata', {})
-                    if any(keyword in metadata.get('text', '') for keyword in keyword_filter):
-                        filtered_matches.append(match)
-                response['matches'] = filtered_matches
+                _filter_by_keywords(response, keyword_filter)
 
             return response
+        except CircuitOpenError:
+            raise
         except Exception as e:
             raise Exception(f"An error occurred during Pinecone query: {e}")
 
-    def delete_pinecone_data(self, id, namespace=""):
+    async def delete_pinecone_data(self, id, namespace=""):
         try:
-            self.index.delete(ids=[str(id)], namespace=namespace)
+            index = await self.get_index()
+            await acall_with_retries(pinecone_breaker, index.delete, ids=[str(id)], namespace=namespace)
+        except CircuitOpenError:
+            raise
         except Exception as e:
             raise Exception(f"An error occurred during Pinecone delete: {e}")
-
-    def fetch_all_ids(self, namespace=""):
-        try:
-            zero_vector = [0] * 3072
-            response = self.index.query(vector=zero_vector, top_k=10000, include_metadata=True, include_values=False, namespace=namespace)
-            return set(match['id'] for match in response['matches'])
-        except Exception as e:
-            raise Exception(f"An error occurred during fetching IDs from Pinecone: {e}")
-
-    def hybrid_search(self, vector, namespace="", top_k=3, metadata_filter=None, keyword_filter=None):
-        try:
-            vector_response = self.query_pinecone_data(vector, namespace, top_k, metadata_filter)
-
-            # If keyword filter is provided, perform an additional search/filter
-            if keyword_filter:
-                filtered_matches = []
-                for match in vector_response['matches']:
-                    metadata = match.get('metadata', {})
-                    if any(keyword in metadata.get('text', '') for keyword in keyword_filter):
-                        filtered_matches.append(match)
-                vector_response['matches'] = filtered_matches
-
-            return vector_response
-        except Exception as e:
-            raise Exception(f"An error occurred during hybrid search: {e}")
\ No newline at end of file
@@ -1,20 +1,29 @@
 import os
 from typing import List, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.modules.products.models import Product
+from app.modules.products.loaders import product_detail_options
 from app.modules.products.schemas.product_schema import ProductResponse
-from app.services.ml.pinecone_service import PineconeService
-from app.services.ml.openai_service import OpenAIService
+from app.services.ml.clients import get_openai_service, get_pinecone_service
+from app.services.ml.embedding_cache import embedding_cache
+
+
+def ranked_responses(products: List[Product], uuids: List[str]) -> List[ProductResponse]:
+    """ProductResponses in Pinecone's relevance order rather than the database's."""
+    rank = {uuid: i for i, uuid in enumerate(uuids)}
+    products = sorted(products, key=lambda p: rank.get(p.uuid, len(rank)))
+    return [ProductResponse.model_validate(p) for p in products]
 
 
 class RecommendationService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
-        self.embedding_service = OpenAIService()
-        self.pinecone_service = PineconeService()
+        self.embedding_service = get_openai_service()
+        self.pinecone_service = get_pinecone_service()
 
-    def recommend_products(
+    async def recommend_products(
         self,
         product: Product,
         top_k: int,
@@ -24,14 +33,14 @@ class RecommendationService:
         name_text = product.name or ""
         desc_text = product.description or ""
         combined_text = f"{name_text} {desc_text}"
-        vector = self.embedding_service.get_embeddings(combined_text)
+        vector = await embedding_cache.get_embeddings(self.embedding_service, combined_text)
 
         metadata_filter = {}
         if brand_filter:
             metadata_filter = {"brand": {"$eq": brand_filter}}
 
         keyword_filter = keywords if keywords else None
-        response = self.pinecone_service.query_pinecone_data(
+        response = await self.pinecone_service.query_pinecone_data(
             vector=vector,
             top_k=top_k,
             metadata_filter=metadata_filter,
@@ -43,49 +52,31 @@ class RecommendationService:
         if not uuids:
             return []
 
-        products = self.db.query(Product).filter(
-            Product.active == True,
-            Product.uuid.in_(uuids),
-            Product.id != product.id
-        ).all()
-
-        results = []
-        for p in products:
-            result_item = ProductResponse(
-                id=p.id,
-                uuid=p.uuid,
-                brand_id=p.brand_id,
-                brand=p.brand,
-                category_id=p.category_id,
-                category=p.category,
-                name=p.name,
-                description=p.description,
-                active=p.active,
-                image_url=p.image_url,
-                model_3d_url=p.model_3d_url,
-                ar_url=p.ar_url,
-                technical_specifications=p.technical_specifications,
-                warranty=p.warranty
+        products = (await self.db.scalars(
+            select(Product).options(*product_detail_options()).where(
+                Product.active == True,
+                Product.uuid.in_(uuids),
+                Product.id != product.id
             )
-            results.append(result_item)
+        )).all()
 
-        return results
+        return ranked_responses(products, uuids)
 
-    def recommend_products_by_text(
+    async def recommend_products_by_text(
         self,
         input_text: str,
         top_k: int,
         brand_filter: Optional[str],
         keywords: Optional[List[str]]
     ) -> List[ProductResponse]:
-        vector = self.embedding_service.get_embeddings(input_text)
+        vector = await embedding_cache.get_embeddings(self.embedding_service, input_text)
 
         metadata_filter = {}
         if brand_filter:
             metadata_filter = {"brand": {"$eq": brand_filter}}
 
         keyword_filter = keywords if keywords else None
-        response = self.pinecone_service.query_pinecone_data(
+        response = await self.pinecone_service.query_pinecone_data(
             vector=vector,
             top_k=top_k,
             metadata_filter=metadata_filter,
@@ -97,29 +88,11 @@ class RecommendationService:
         if not uuids:
             return []
 
-        products = self.db.query(Product).filter(
-            Product.active == True,
-            Product.uuid.in_(uuids)
-        ).all()
-
-        results = []
-        for p in products:
-            result_item = ProductResponse(
-                id=p.id,
-                uuid=p.uuid,
-                brand_id=p.brand_id,
-                brand=p.brand,
-                category_id=p.category_id,
-                category=p.category,
-                name=p.name,
-                description=p.description,
-                active=p.active,
-                image_url=p.image_url,
-                model_3d_url=p.model_3d_url,
-                ar_url=p.ar_url,
-                technical_specifications=p.technical_specifications,
-                warranty=p.warranty
+        products = (await self.db.scalars(
+            select(Product).options(*product_detail_options()).where(
+                Product.active == True,
+                Product.uuid.in_(uuids)
             )
-            results.append(result_item)
+        )).all()
 
-        return results
\ No newline at end of file
+        return ranked_responses(products, uuids)
\ No newline at end of file
@@ -0,0 +1,122 @@
+"""
+Before/after benchmark for alembic/versions/0001_query_indexes.py.
+
+Builds the schema in a scratch Postgres schema, drops the indexes the
+migration adds, seeds it with generate_series, then runs EXPLAIN ANALYZE on
+the queries those indexes are meant for. The indexes are created and the
+same queries run again. Needs a Postgres DATABASE_URL; the scratch schema
+is dropped at the end.
+
+    python -m benchmarks.index_migration [--users 20000] [--runs 5]
+"""
+import argparse
+import statistics
+from sqlalchemy import create_engine, text
+from app.core.config import settings
+from app.models.base_class import Base
+from app.modules.authentication.models.user import User
+from app.modules.chatbot.models import *
+from app.modules.orders.models import *
+from app.modules.products.models import *
+from app.modules.promotions.models import *
+
+SCHEMA = "bench_query_indexes"
+
+SEED = [
+    """INSERT INTO users (id, email, password, first_name, last_name, role, active, created_at, updated_at)
+       SELECT g, 'User' || g || '@Example.com', 'x', 'f', 'l', 'customer', g % 20 <> 0, now(), now()
+       FROM generate_series(1, :users) g""",
+    """INSERT INTO brands (id, name, active, created_at, updated_at)
+       SELECT g, 'brand ' || g, true, now(), now() FROM generate_series(1, 50) g""",
+    """INSERT INTO product_categories (id, name, active, created_at, updated_at)
+       SELECT g, 'category ' || g, true, now(), now() FROM generate_series(1, 30) g""",
+    """INSERT INTO products (id, uuid, brand_id, category_id, name, active, created_at, updated_at)
+       SELECT g, md5(g::text), 1 + g % 50, 1 + g % 30, 'product ' || g, g % 10 <> 0, now(), now()
+       FROM generate_series(1, :users / 4) g""",
+    """INSERT INTO inventory (id, product_id, stock, price_usd, price_bs, created_at, updated_at)
+       SELECT g, g, 10, 1, 7, now(), now() FROM generate_series(1, :users / 4) g""",
+    """INSERT INTO orders (id, user_id, total_amount, currency, status, payment_method, active, created_at, updated_at)
+       SELECT g, 1 + g % :users, 100, 'USD',
+              (ARRAY['pending', 'paid', 'shipped', 'delivered', 'cancelled'])[1 + g % 5],
+              'stripe', g % 25 <> 0, now(), now()
+       FROM generate_series(1, :users * 10) g""",
+    """INSERT INTO payments (id, order_id, amount, method, status, created_at, updated_at)
+       SELECT g, g, 100, 'stripe', 'completed', now(), now() FROM generate_series(1, :users * 10) g""",
+    """INSERT INTO feedback (id, order_id, user_id, rating, created_at, updated_at)
+       SELECT g, g * 2, 1 + (g * 2) % :users, 5, now(), now() FROM generate_series(1, :users * 5) g""",
+    """INSERT INTO chatbot_sessions (id, user_id, session_token, active, created_at, updated_at)
+       SELECT g, 1 + g % :users, md5(g::text), true, now(), now() FROM generate_series(1, :users * 2) g""",
+    """INSERT INTO chatbot_messages (id, session_id, sender, message, created_at, updated_at)
+       SELECT g, 1 + g % (:users * 2), 'user', 'hello', now(), now() FROM generate_series(1, :users * 20) g""",
+]
+
+QUERIES = {
+    "order history": "SELECT * FROM orders WHERE user_id = 42 AND active ORDER BY id LIMIT 10",
+    "orders by status": "SELECT * FROM orders WHERE status = 'shipped' AND active ORDER BY id LIMIT 10",
+    "payment by order": "SELECT * FROM payments WHERE order_id = 4242",
+    "feedback by user": "SELECT * FROM feedback WHERE user_id = 42 ORDER BY id LIMIT 10",
+    "chat history": "SELECT * FROM chatbot_messages WHERE session_id = 42 ORDER BY id",
+    "user chat sessions": "SELECT * FROM chatbot_sessions WHERE user_id = 42 AND active ORDER BY id LIMIT 10",
+    "inventory by product": "SELECT * FROM inventory WHERE product_id = 4242",
+    "products by brand": "SELECT * FROM products WHERE brand_id = 7 AND active ORDER BY id LIMIT 10",
+    "login by email": "SELECT * FROM users WHERE lower(email) = lower('user4242@example.com') AND active",
+}
+
+def migration_indexes():
+    # Everything declared in __table_args__, i.e. not generated by Column(index=True).
+    return [
+        index
+        for table in Base.metadata.tables.values()
+        for index in table.indexes
+        if not any(column.index for column in index.columns)
+    ]
+
+def explain(conn, sql: str, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        plan = conn.execute(text("EXPLAIN (ANALYZE, FORMAT JSON) " + sql)).scalar()
+        timings.append(plan[0]["Execution Time"])
+    return statistics.median(timings)
+
+def measure(conn, runs: int) -> dict:
+    for table in Base.metadata.tables:
+        conn.execute(text(f"ANALYZE {table}"))
+    return {name: explain(conn, sql, runs) for name, sql in QUERIES.items()}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine(settings.DATABASE_URL)
+    indexes = migration_indexes()
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+            conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+            Base.metadata.create_all(conn.execution_options(schema_translate_map={None: SCHEMA}))
+            conn.execute(text(f"SET LOCAL search_path TO {SCHEMA}"))
+            for index in indexes:
+                conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+            for statement in SEED:
+                conn.execute(text(statement), {"users": args.users})
+
+            before = measure(conn, args.runs)
+            scoped = conn.execution_options(schema_translate_map={None: SCHEMA})
+            for index in indexes:
+                index.create(scoped)
+            after = measure(conn, args.runs)
+
+        print(f"{args.users} users, median of {args.runs} runs, execution time in ms")
+        print(f"{'query':<24}{'before':>10}{'after':>10}{'speedup':>10}")
+        for name in QUERIES:
+            speedup = before[name] / after[name] if after[name] else float("inf")
+            print(f"{name:<24}{before[name]:>10.3f}{after[name]:>10.3f}{speedup:>9.1f}x")
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
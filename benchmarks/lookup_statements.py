@@ -0,0 +1,61 @@
+"""
+Micro-benchmark for the prebuilt lookups in app.core.lookups.
+
+Measures the per-call Python overhead of getting from an ORM lookup to
+compiled SQL, without a database: building the statement, generating its
+cache key and fetching the compiled form from a compiled cache. That is
+the work Connection.execute does before it talks to the driver.
+
+    python -m benchmarks.lookup_statements
+"""
+import timeit
+from sqlalchemy import lambda_stmt, select
+from sqlalchemy.dialects.postgresql.asyncpg import dialect as asyncpg_dialect
+from app.core import lookups
+from app.modules.authentication.models.user import User
+from app.modules.products.models import Product
+from app.modules.products.loaders import product_detail_options
+
+ITERATIONS = 20000
+DIALECT = asyncpg_dialect()
+
+def compile_cached(stmt, cache):
+    cache_key = stmt._generate_cache_key()
+    compiled = cache.get(cache_key.key)
+    if compiled is None:
+        compiled = cache[cache_key.key] = stmt.compile(dialect=DIALECT)
+    return compiled
+
+def adhoc_user(user_id, cache):
+    return compile_cached(select(User).where(User.id == user_id, User.active == True), cache)
+
+def lambda_user(user_id, cache):
+    return compile_cached(lambda_stmt(lambda: select(User).where(User.id == user_id, User.active == True)), cache)
+
+def prebuilt_user(user_id, cache):
+    return compile_cached(lookups._ACTIVE_USER_BY_ID, cache)
+
+def adhoc_product(product_id, cache):
+    stmt = select(Product).options(*product_detail_options()).where(Product.id == product_id, Product.active == True)
+    return compile_cached(stmt, cache)
+
+def prebuilt_product(product_id, cache):
+    return compile_cached(lookups._ACTIVE_PRODUCT_FOR_RESPONSE_BY_ID, cache)
+
+def run(name, fn):
+    cache = {}
+    fn(1, cache)
+    seconds = timeit.timeit(lambda: fn(42, cache), number=ITERATIONS)
+    per_call_us = seconds / ITERATIONS * 1e6
+    print(f"{name:<28} {per_call_us:8.2f} us/call")
+    return per_call_us
+
+if __name__ == "__main__":
+    user_adhoc = run("User by id, ad hoc", adhoc_user)
+    run("User by id, lambda_stmt", lambda_user)
+    user_prebuilt = run("User by id, prebuilt", prebuilt_user)
+    product_adhoc = run("Product by id, ad hoc", adhoc_product)
+    product_prebuilt = run("Product by id, prebuilt", prebuilt_product)
+    print()
+    print(f"User lookup saves    {user_adhoc - user_prebuilt:8.2f} us/call")
+    print(f"Product lookup saves {product_adhoc - product_prebuilt:8.2f} us/call")
@@ -0,0 +1,75 @@
+"""
+Serialisation cost of a 100-item ProductResponse page.
+
+"fastapi default" reproduces what FastAPI does when a handler returns an
+unvalidated PagedResponse for a response_model of PagedResponse[ProductResponse]:
+dump the returned model, validate it against the response model, run the result
+through jsonable_encoder and encode it with json.dumps (JSONResponse) or
+orjson (ORJSONResponse). "single pass" is app.core.serialization.json_response:
+one from_attributes validation against a cached TypeAdapter, JSON written by
+pydantic-core. The rows are plain objects shaped like loaded ORM rows, so no
+database is needed.
+
+    python -m benchmarks.paged_serialization
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from app.core.pagination import PagedResponse
+from app.core.serialization import json_response
+from app.modules.products.schemas.product_schema import ProductResponse
+
+try:
+    from fastapi.utils import create_model_field as create_field
+except ImportError:
+    from fastapi.utils import create_response_field as create_field
+
+ITERATIONS = 300
+PAGE_SIZE = 100
+
+def make_page():
+    brand = SimpleNamespace(id=1, name="Acme", active=True)
+    category = SimpleNamespace(id=2, name="Laptops", active=True)
+    warranty = SimpleNamespace(id=3, name="Standard", description="Two years", duration_months=24, brand_id=1, brand=brand)
+    items = [
+        SimpleNamespace(
+            id=i, uuid=f"00000000-0000-0000-0000-{i:012d}", brand_id=1, brand=brand, category_id=2,
+            category=category, name=f"Product {i}", description="A fairly ordinary product description. " * 5,
+            active=True, image_url=f"https://cdn.example.com/{i}.png", model_3d_url=None, ar_url=None,
+            technical_specifications="cpu: 8 cores\nram: 16 GB\n" * 20, warranty=warranty,
+        )
+        for i in range(PAGE_SIZE)
+    ]
+    return dict(
+        items=items, total=5000, page=1, page_size=PAGE_SIZE, pages=50,
+        has_next=True, has_prev=False, next_cursor=None, count_strategy="window",
+    )
+
+async def fastapi_default(page, field, response_class):
+    content = await serialize_response(field=field, response_content=PagedResponse(**page))
+    return response_class(content).body
+
+async def single_pass(page):
+    return json_response(page, PagedResponse[ProductResponse]).body
+
+async def measure(name, fn):
+    await fn()
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        body = await fn()
+    per_call_ms = (time.perf_counter() - start) / ITERATIONS * 1000
+    print(f"{name:<32} {per_call_ms:8.3f} ms/page  {len(body):>7} bytes")
+    return per_call_ms
+
+async def main():
+    page = make_page()
+    field = create_field(name="response", type_=PagedResponse[ProductResponse], mode="serialization")
+    before = await measure("fastapi default, json", lambda: fastapi_default(page, field, JSONResponse))
+    await measure("fastapi default, orjson", lambda: fastapi_default(page, field, ORJSONResponse))
+    after = await measure("single pass, pydantic-core", lambda: single_pass(page))
+    print(f"\n{before / after:.1f}x faster than the default path")
+
+if __name__ == "__main__":
+    asyncio.run(main())
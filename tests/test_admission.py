@@ -0,0 +1,27 @@
+"""
+Per-client admission keys: only a verified bearer token earns its own quota,
+anything else is keyed on the client address.
+"""
+from app.core.admission import _client_key
+from app.modules.authentication.security import create_access_token
+
+def _scope(authorization=None, client=("203.0.113.7", 51000)):
+    headers = [(b"authorization", authorization.encode())] if authorization else []
+    return {"type": "http", "client": client, "headers": headers}
+
+def test_verified_token_keys_on_user():
+    token = create_access_token({"sub": "42"})
+    assert _client_key(_scope(f"Bearer {token}")) == "user:42"
+
+def test_tokens_of_one_user_share_a_key():
+    first = create_access_token({"sub": "42", "email": "a@example.com"})
+    second = create_access_token({"sub": "42", "email": "b@example.com"})
+    assert _client_key(_scope(f"Bearer {first}")) == _client_key(_scope(f"Bearer {second}"))
+
+def test_made_up_tokens_fall_back_to_address():
+    assert _client_key(_scope("Bearer xyz")) == "203.0.113.7"
+    assert _client_key(_scope("Bearer abc")) == "203.0.113.7"
+    assert _client_key(_scope("Basic dXNlcjpwYXNz")) == "203.0.113.7"
+
+def test_anonymous_keys_on_address():
+    assert _client_key(_scope()) == "203.0.113.7"
@@ -0,0 +1,37 @@
+"""
+Chat reply pipeline pieces that need neither OpenAI nor Postgres.
+"""
+import asyncio
+import time
+from app.services.ml.chat_service import stream_reply, valid_summary
+
+def test_summary_with_its_message_is_used():
+    assert valid_summary("Asked about laptops.", 12) == "Asked about laptops."
+
+def test_summary_whose_message_was_deleted_is_ignored():
+    assert valid_summary("Asked about laptops.", None) is None
+
+class _EmptyStream:
+    """A completion stream that ends without content, like a filtered response."""
+
+    def __init__(self):
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        raise StopAsyncIteration
+
+    async def close(self):
+        self.closed = True
+
+def test_empty_reply_is_an_error_and_not_stored():
+    stream = _EmptyStream()
+
+    async def collect():
+        return [frame async for frame in stream_reply(stream, 1, "Hello", time.perf_counter())]
+
+    frames = asyncio.run(collect())
+    assert stream.closed
+    assert len(frames) == 1 and frames[0].startswith("event: error\n")
@@ -0,0 +1,30 @@
+"""
+CSV export columns come from the response schema, so a first row with a
+missing relation cannot drop that relation's columns from the file.
+"""
+import csv
+import io
+from app.core.export import _csv_chunk, _flatten, csv_fieldnames
+from app.modules.products.schemas.product_schema import ProductResponse
+from app.modules.products.schemas.warranty_schema import WarrantyResponse
+
+def test_fieldnames_include_nested_models():
+    fieldnames = csv_fieldnames(ProductResponse)
+    assert "id" in fieldnames
+    assert "brand" not in fieldnames and "warranty" not in fieldnames
+    assert "warranty.id" in fieldnames and "warranty.name" in fieldnames
+    assert "warranty.brand.id" in fieldnames
+
+def test_missing_relation_in_first_row_keeps_columns():
+    fieldnames = csv_fieldnames(ProductResponse)
+    without = {name: None for name in ProductResponse.model_fields}
+    with_warranty = dict(without, warranty={name: None for name in WarrantyResponse.model_fields})
+    with_warranty["warranty"]["name"] = "Two years"
+    text = _csv_chunk([], fieldnames, True) + _csv_chunk([_flatten(without), _flatten(with_warranty)], fieldnames, False)
+    rows = list(csv.DictReader(io.StringIO(text)))
+    assert rows[0]["warranty.name"] == ""
+    assert rows[1]["warranty.name"] == "Two years"
+
+def test_empty_export_has_header():
+    fieldnames = csv_fieldnames(ProductResponse)
+    assert next(csv.reader(io.StringIO(_csv_chunk([], fieldnames, True)))) == fieldnames
@@ -0,0 +1,91 @@
+"""
+Regression test for N+1 loading on product pages: the number of statements a
+products page issues must not depend on its size. Always runs against an
+in-memory SQLite database; with a scratch Postgres database in
+TEST_DATABASE_URL it runs there too (tables are created and the seeded rows
+removed afterwards).
+"""
+import asyncio
+import os
+import uuid
+import pytest
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+from app.core.pagination import COUNT_WINDOW, PaginationParams, paginate
+from app.core.query_metrics import RequestQueryStats, _current_stats, install_query_instrumentation
+from app.models.base_class import Base
+from app.modules.products.models import Brand, Product, ProductCategory, Warranty
+from app.modules.products.routers.product_router import PRODUCT_SORT_KEYS, products_query
+from app.modules.products.schemas.product_schema import ProductResponse
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+PRODUCTS = 12
+
+async def _seed(session_factory, prefix: str):
+    async with session_factory() as db:
+        # A brand, category and warranty per product, so any per-row lazy load shows up as extra statements.
+        for i in range(PRODUCTS):
+            brand = Brand(name=f"{prefix}b{i}", active=True)
+            category = ProductCategory(name=f"{prefix}c{i}", active=True)
+            warranty = Warranty(name=f"{prefix}w{i}", duration_months=12, brand=brand)
+            db.add(Product(name=f"{prefix}p{i}", brand=brand, category=category, warranty=warranty, active=True))
+        await db.commit()
+
+async def _cleanup(session_factory, prefix: str):
+    async with session_factory() as db:
+        await db.execute(delete(Product).where(Product.name.startswith(prefix)))
+        await db.execute(delete(Warranty).where(Warranty.name.startswith(prefix)))
+        await db.execute(delete(ProductCategory).where(ProductCategory.name.startswith(prefix)))
+        await db.execute(delete(Brand).where(Brand.name.startswith(prefix)))
+        await db.commit()
+
+async def _page_statements(session_factory, prefix: str, page_size: int) -> int:
+    stats = RequestQueryStats({"type": "http", "path": "/products/", "method": "GET"})
+    token = _current_stats.set(stats)
+    try:
+        async with session_factory() as db:
+            pagination = PaginationParams(1, page_size, None, "asc", None, True, None)
+            response = await paginate(
+                db, products_query(None, None, prefix), pagination, ProductResponse,
+                PRODUCT_SORT_KEYS, count_strategy=COUNT_WINDOW
+            )
+    finally:
+        _current_stats.reset(token)
+    assert response.status_code == 200
+    return stats.statements
+
+async def _statements_per_page_size(session_factory, prefix: str):
+    await _seed(session_factory, prefix)
+    try:
+        return (
+            await _page_statements(session_factory, prefix, 1),
+            await _page_statements(session_factory, prefix, PRODUCTS),
+        )
+    finally:
+        await _cleanup(session_factory, prefix)
+
+def test_products_page_query_count_is_constant_sqlite():
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        install_query_instrumentation(engine.sync_engine)
+        tables = [model.__table__ for model in (Brand, ProductCategory, Warranty, Product)]
+        try:
+            async with engine.begin() as connection:
+                await connection.run_sync(Base.metadata.create_all, tables=tables)
+            return await _statements_per_page_size(async_sessionmaker(engine, expire_on_commit=False), "qc-")
+        finally:
+            await engine.dispose()
+
+    single, full = asyncio.run(run())
+    assert single > 0
+    assert single == full
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+def test_products_page_query_count_is_constant_postgres():
+    from app.core.db import AsyncSessionLocal, init_db
+
+    init_db()
+    single, full = asyncio.run(_statements_per_page_size(AsyncSessionLocal, f"qc{uuid.uuid4().hex[:8]}-"))
+    assert single == full
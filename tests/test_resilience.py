@@ -0,0 +1,43 @@
+"""
+Circuit breaker probe handling: a half-open probe that is cancelled must give
+the probe slot back, or the breaker short-circuits every call from then on.
+"""
+import asyncio
+import time
+import pytest
+
+from app.core.resilience import CLOSED, CircuitBreaker, CircuitOpenError, acall_with_retries
+
+def _half_open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    return breaker
+
+def test_cancelled_probe_releases_breaker():
+    breaker = _half_open_breaker()
+
+    async def hang():
+        await asyncio.Event().wait()
+
+    async def ok():
+        return "ok"
+
+    async def scenario():
+        probe = asyncio.create_task(acall_with_retries(breaker, hang))
+        await asyncio.sleep(0)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        return await acall_with_retries(breaker, ok)
+
+    assert asyncio.run(scenario()) == "ok"
+    assert breaker.state == CLOSED
+
+def test_second_call_during_probe_is_short_circuited():
+    breaker = _half_open_breaker()
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.abandon_call()
+    breaker.before_call()
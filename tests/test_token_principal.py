@@ -0,0 +1,52 @@
+"""
+Claims-only authentication: trusted without a user lookup only with
+"postgres" invalidation, otherwise resolved from the active user.
+"""
+import asyncio
+from types import SimpleNamespace
+import pytest
+from fastapi import HTTPException
+from app.core.config import settings
+from app.modules.authentication import dependencies
+from app.modules.authentication.security import create_access_token, denied_tokens
+
+@pytest.fixture
+def loads(monkeypatch):
+    calls = []
+
+    async def load_active_user(db, user_id):
+        calls.append(user_id)
+        return SimpleNamespace(id=user_id, email="db@example.com", role="customer") if user_id != 404 else None
+
+    monkeypatch.setattr(dependencies, "load_active_user", load_active_user)
+    return calls
+
+def _principal(user_id: int):
+    token = create_access_token({"sub": str(user_id), "email": "token@example.com", "role": "customer"})
+    return asyncio.run(dependencies.get_token_principal(token, None))
+
+def test_postgres_invalidation_trusts_claims(monkeypatch, loads):
+    monkeypatch.setattr(settings, "AUTH_USER_CACHE_INVALIDATION", "postgres")
+    principal = _principal(7)
+    assert principal.id == 7 and principal.email == "token@example.com"
+    assert loads == []
+
+def test_postgres_invalidation_checks_revoked_users(monkeypatch, loads):
+    monkeypatch.setattr(settings, "AUTH_USER_CACHE_INVALIDATION", "postgres")
+    token = create_access_token({"sub": "8"})
+    denied_tokens.revoke(8)
+    principal = asyncio.run(dependencies.get_token_principal(token, None))
+    assert principal.email == "db@example.com"
+    assert loads == [8]
+
+def test_local_invalidation_loads_the_user(monkeypatch, loads):
+    monkeypatch.setattr(settings, "AUTH_USER_CACHE_INVALIDATION", "local")
+    principal = _principal(9)
+    assert principal.email == "db@example.com"
+    assert loads == [9]
+
+def test_local_invalidation_rejects_inactive_users(monkeypatch, loads):
+    monkeypatch.setattr(settings, "AUTH_USER_CACHE_INVALIDATION", "local")
+    with pytest.raises(HTTPException) as error:
+        _principal(404)
+    assert error.value.status_code == 401